@@ -0,0 +1,56 @@
+import calendar
+from datetime import date
+import numpy as np
+import pandas as pd
+
+# ספי התראה ברירת מחדל, כחלק מהתקציב: אזהרה ב-80% וחריגה ב-100%
+DEFAULT_THRESHOLDS = (0.8, 1.0)
+
+
+# הסף הגבוה ביותר שההוצאה הגיעה אליו (None - אף סף, או קטגוריה ללא תקציב)
+def crossed_threshold(spent, budget, thresholds=DEFAULT_THRESHOLDS):
+    if budget <= 0:
+        return None
+    reached = [threshold for threshold in sorted(thresholds) if spent >= budget * threshold]
+    return reached[-1] if reached else None
+
+
+# החלק מהחודש שעבר עד היום: 1 לחודש שהסתיים, 0 לחודש עתידי
+def elapsed_fraction(year, month, today=None):
+    today = today or date.today()
+    days_in_month = calendar.monthrange(year, month)[1]
+    if (year, month) < (today.year, today.month):
+        return 1.0
+    if (year, month) > (today.year, today.month):
+        return 0.0
+    return today.day / days_in_month
+
+
+# תחזית להוצאה בסוף החודש בקצב ההוצאה עד היום
+def projected_spend(spent, elapsed):
+    return spent / elapsed if elapsed > 0 else spent
+
+
+# התראות לכל הקטגוריות של חודש בחישוב אחד: סכום שהוצא (מהמונים של טבלת הסיכומים), התקציב,
+# אחוז הניצול, הסף הגבוה שנחצה (NaN - אין) והתחזית לסוף החודש. רק קטגוריות עם תקציב
+def budget_alerts(spent_by_category, budgets, thresholds=DEFAULT_THRESHOLDS, elapsed=1.0):
+    budgets = pd.Series(budgets, dtype='float64')
+    budgets = budgets[budgets > 0]
+    spent = pd.Series(spent_by_category, dtype='float64').reindex(budgets.index, fill_value=0)
+
+    used = (spent / budgets).to_numpy()
+    thresholds = np.sort(np.asarray(thresholds, dtype='float64'))
+    # מספר הספים שנחצו לכל קטגוריה, והסף הגבוה מביניהם
+    reached = np.searchsorted(thresholds, used, side='right')
+    level = np.where(reached > 0, thresholds[np.maximum(reached - 1, 0)], np.nan)
+
+    projected = spent.to_numpy() / elapsed if elapsed > 0 else spent.to_numpy()
+    return pd.DataFrame({
+        'category': budgets.index,
+        'budget': budgets.to_numpy(),
+        'spent': spent.to_numpy(),
+        'used': used,
+        'level': level,
+        'projected': projected,
+        'projected_overrun': np.maximum(projected - budgets.to_numpy(), 0)
+    })
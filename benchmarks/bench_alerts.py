@@ -0,0 +1,86 @@
+import os
+import sys
+import tempfile
+import time
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from store import TransactionStore, parse_period, to_shekels
+from alerts import crossed_threshold
+
+# בדיקת תקציב אחרי הוספת הוצאה: המונה של (חודש, קטגוריה) בטבלת הסיכומים מול סריקת עסקאות החודש,
+# כשמספר העסקאות בחודש גדל. בשתי הדרכים כל הוספה נכתבת לבסיס הנתונים (flush) לפני הבדיקה,
+# כך שעלות הכתיבה זהה ונמדדת בנפרד מזמן הבדיקה
+MONTH_ROWS = [1_000, 10_000, 100_000]
+INSERTS = 200
+MONTH = '2024-06'
+CATEGORIES = ['מזון', 'דיור', 'חשבונות', 'תחבורה', 'בילויים', 'קניות']
+BUDGET = 5_000
+
+
+# עסקאות לדוגמה בחודש אחד
+def make_frame(n):
+    rng = np.random.default_rng(0)
+    return pd.DataFrame({
+        'date': pd.Timestamp(f'{MONTH}-01') + pd.to_timedelta(rng.integers(0, 30, n), unit='D'),
+        'amount': rng.integers(10, 500, n).astype('float64'),
+        'category': rng.choice(CATEGORIES, n),
+        'description': 'עסקה',
+        'type': 'expense'
+    })
+
+
+def new_expense(i):
+    return {'date': f'{MONTH}-15', 'amount': 25.0, 'category': CATEGORIES[i % len(CATEGORIES)], 'description': 'חדשה', 'type': 'expense'}
+
+
+# הבדיקה הקודמת: טעינת החודש וסכום הקטגוריה
+def rescan(store, category):
+    transactions = store.query(month=parse_period(MONTH))
+    return to_shekels(transactions.loc[
+        (transactions['type'] == 'expense') & (transactions['category'] == category), 'amount'
+    ].sum())
+
+
+def counter(store, category):
+    return to_shekels(store.category_total(MONTH, category))
+
+
+# זמן ממוצע להוספה וכתיבה של הוצאה אחת ולבדיקת התקציב אחריה
+def measure(store, spent_of):
+    write_time = check_time = 0.0
+    for i in range(INSERTS):
+        expense = new_expense(i)
+        start = time.perf_counter()
+        store.add([expense])
+        store.flush()
+        written = time.perf_counter()
+        crossed_threshold(spent_of(store, expense['category']), BUDGET)
+        write_time += written - start
+        check_time += time.perf_counter() - written
+    return write_time / INSERTS, check_time / INSERTS
+
+
+def main():
+    print(f"{'month rows':>10} {'write ms':>9} {'rescan ms':>10} {'counter ms':>11} {'speedup':>8}")
+    for n in MONTH_ROWS:
+        write_times = []
+        results = []
+        for spent_of in [rescan, counter]:
+            with tempfile.TemporaryDirectory() as directory:
+                store = TransactionStore(os.path.join(directory, 'transactions.db'))
+                store.add_frame(make_frame(n))
+                store.flush()
+                write_time, check_time = measure(store, spent_of)
+                write_times.append(write_time)
+                results.append(check_time)
+                # שתי הדרכים מחזירות את אותו סכום
+                assert rescan(store, CATEGORIES[0]) == counter(store, CATEGORIES[0])
+                store.close()
+        print(f"{n:>10,} {np.mean(write_times) * 1000:9.2f} {results[0] * 1000:10.2f} {results[1] * 1000:11.3f} {results[0] / results[1]:7.1f}x")
+
+
+if __name__ == '__main__':
+    main()
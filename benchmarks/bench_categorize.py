@@ -0,0 +1,84 @@
+import os
+import sys
+import time
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from categorize import Categorizer
+
+# קצב סיווג לכל 100 אלף שורות: ביטוי משולב אחד מול str.contains לכל כלל.
+# תיאורים חוזרים (אותם בתי עסק) ותיאורים ייחודיים (עם מספר אסמכתא בכל שורה)
+ROWS = 100_000
+RULES = [10, 100, 1_000]
+MERCHANTS = 2_000
+REPEATS = 3
+
+
+# כללים לדוגמה: כינויים של בתי עסק ומילות מפתח
+def make_rules(n):
+    kinds = np.where(np.arange(n) % 2 == 0, 'alias', 'keyword')
+    patterns = [
+        f'בית עסק {i}, merchant {i} ltd' if kind == 'alias' else f'בית עסק {i} '
+        for i, kind in enumerate(kinds)
+    ]
+    return pd.DataFrame({
+        'id': np.arange(n),
+        'kind': kinds,
+        'pattern': patterns,
+        'category': [f'קטגוריה {i % 12}' for i in range(n)],
+        'type': None
+    })
+
+
+# תיאורי עסקאות: בתי עסק אקראיים, חלקם ללא כלל מתאים
+def make_descriptions(unique):
+    rng = np.random.default_rng(0)
+    merchants = rng.integers(0, MERCHANTS, ROWS)
+    descriptions = pd.Series([f'בית עסק {m} סניף {m % 7}' for m in merchants])
+    if unique:
+        descriptions = descriptions + ' אסמכתא ' + pd.Series(np.arange(ROWS)).astype(str)
+    return descriptions
+
+
+# לולאה על הכללים: str.contains על כל הטבלה לכל כלל, הכלל הראשון שהתאים קובע
+def loop_categorize(rules, descriptions):
+    result = pd.Series(np.nan, index=descriptions.index, dtype=object)
+    for kind, pattern, category in zip(rules['kind'], rules['pattern'], rules['category']):
+        terms = [term.strip() for term in pattern.split(',')] if kind == 'alias' else [pattern.strip()]
+        missing = result.isna()
+        matched = descriptions[missing].str.contains('|'.join(terms), case=False, regex=False if len(terms) == 1 else True)
+        result[matched[matched].index] = category
+    return result
+
+
+def combined_categorize(rules, descriptions):
+    return Categorizer(rules).categorize(descriptions, np.full(len(descriptions), 'expense'))
+
+
+def best_of(func, *args):
+    best = float('inf')
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        func(*args)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    print(f"{'descriptions':>12} {'rules':>6} {'loop ms/100k':>13} {'combined ms/100k':>17} {'rows/s':>12} {'speedup':>8}")
+    for unique in [False, True]:
+        descriptions = make_descriptions(unique)
+        for n in RULES:
+            rules = make_rules(n)
+            loop_seconds = best_of(loop_categorize, rules, descriptions)
+            combined_seconds = best_of(combined_categorize, rules, descriptions)
+            scale = 100_000 / ROWS
+            print(f"{'unique' if unique else 'repeated':>12} {n:>6,} {loop_seconds * 1000 * scale:13.0f} "
+                  f"{combined_seconds * 1000 * scale:17.0f} {ROWS / combined_seconds:12,.0f} "
+                  f"{loop_seconds / combined_seconds:7.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,69 @@
+import os
+import sys
+import time
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from reports import period_comparisons
+
+# השוואות חודש קודם, אותו חודש בשנה שעברה ו-12 חודשים מול 12 לכל קטגוריה ולכל חודש:
+# מעבר וקטורי אחד על מטריצת הסיכומים מול לולאה לכל קטגוריה עם shift ו-rolling
+CATEGORIES = [10, 50, 200]
+YEARS = [10, 30]
+END_PERIOD = 2025 * 12
+REPEATS = 5
+
+
+# טבלת סיכומים לדוגמה: כל קטגוריה בכל חודש
+def make_aggregates(n, years):
+    rng = np.random.default_rng(0)
+    months = years * 12
+    periods = np.arange(END_PERIOD - months, END_PERIOD)
+    return pd.DataFrame({
+        'period': np.tile(periods, n),
+        'type': np.repeat(np.where(np.arange(n) % 5 == 0, 'income', 'expense'), months),
+        'category': np.repeat([f'קטגוריה {i}' for i in range(n)], months),
+        'total': rng.integers(10_000, 1_000_000, n * months),
+        'count': 1
+    })
+
+
+# לולאה לכל קטגוריה: סדרה חודשית ושלוש השוואות בפונקציות של pandas
+def loop_comparisons(aggregates):
+    periods = range(aggregates['period'].min(), aggregates['period'].max() + 1)
+    comparisons = {}
+    for key, group in aggregates.groupby(['type', 'category']):
+        series = group.set_index('period')['total'].reindex(periods, fill_value=0).astype('float64')
+        trailing = series.rolling(12).sum()
+        comparisons[key] = {
+            'mom': series.pct_change(1),
+            'same_month_last_year': series.pct_change(12),
+            'yoy': trailing.pct_change(12)
+        }
+    return comparisons
+
+
+def best_of(func, *args):
+    best = float('inf')
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        func(*args)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    print(f"{'years':>5} {'categories':>10} {'loop ms':>9} {'vectorized ms':>14} {'speedup':>8}")
+    for years in YEARS:
+        for n in CATEGORIES:
+            aggregates = make_aggregates(n, years)
+            loop_seconds = best_of(loop_comparisons, aggregates)
+            vectorized_seconds = best_of(period_comparisons, aggregates)
+            print(f"{years:>5} {n:>10,} {loop_seconds * 1000:9.1f} {vectorized_seconds * 1000:14.2f} "
+                  f"{loop_seconds / vectorized_seconds:7.1f}x")
+
+
+if __name__ == '__main__':
+    main()
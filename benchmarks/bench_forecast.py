@@ -0,0 +1,81 @@
+import os
+import sys
+import time
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from forecast import MODELS, history_matrix, fit, predict
+
+# התאמה ותחזית ל-12 חודשים על טבלת הסיכומים: כל הקטגוריות בבת אחת מול לולאה לכל קטגוריה
+CATEGORIES = [10, 100, 500]
+MONTHS = 120
+HORIZON = 12
+REPEATS = 5
+END_PERIOD = 2025 * 12
+
+
+# טבלת סיכומים לדוגמה: כל קטגוריה בכל חודש
+def make_aggregates(n):
+    rng = np.random.default_rng(0)
+    periods = np.arange(END_PERIOD - MONTHS, END_PERIOD)
+    return pd.DataFrame({
+        'period': np.tile(periods, n),
+        'type': np.repeat(np.where(np.arange(n) % 5 == 0, 'income', 'expense'), MONTHS),
+        'category': np.repeat([f'קטגוריה {i}' for i in range(n)], MONTHS),
+        'total': rng.integers(10_000, 1_000_000, n * MONTHS),
+        'count': 1
+    })
+
+
+# לולאה לכל קטגוריה: סדרה, np.polyfit ותחזית
+def loop_forecast(aggregates, model):
+    forecasts = {}
+    for key, group in aggregates.groupby(['type', 'category']):
+        series = group.set_index('period')['total'].reindex(range(END_PERIOD - MONTHS, END_PERIOD), fill_value=0)
+        values = series.to_numpy(dtype='float64')
+        if model == 'moving_average':
+            forecasts[key] = np.repeat(values[-3:].mean(), HORIZON)
+        elif model == 'seasonal_naive':
+            forecasts[key] = values[-12:][np.arange(HORIZON) % 12]
+        else:
+            slope, intercept = np.polyfit(np.arange(24), values[-24:], 1)
+            forecasts[key] = np.clip(intercept + slope * np.arange(24, 24 + HORIZON), 0, None)
+    return forecasts
+
+
+# כל הקטגוריות בבת אחת: בניית מטריצת ההיסטוריה, ואז התאמה ותחזית
+def vectorized_forecast(aggregates, model):
+    keys, first_period, matrix = history_matrix(aggregates, END_PERIOD)
+    return predict(fit(matrix, model), HORIZON)
+
+
+def fit_predict(matrix, model):
+    return predict(fit(matrix, model), HORIZON)
+
+
+def best_of(func, *args):
+    best = float('inf')
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        func(*args)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    print(f"{'categories':>10} {'model':>16} {'loop ms':>9} {'vectorized ms':>14} {'speedup':>8} {'fit+predict ms':>15}")
+    for n in CATEGORIES:
+        aggregates = make_aggregates(n)
+        matrix = history_matrix(aggregates, END_PERIOD)[2]
+        for model in MODELS:
+            loop_seconds = best_of(loop_forecast, aggregates, model)
+            vectorized_seconds = best_of(vectorized_forecast, aggregates, model)
+            model_seconds = best_of(fit_predict, matrix, model)
+            print(f"{n:>10,} {model:>16} {loop_seconds * 1000:9.1f} {vectorized_seconds * 1000:14.2f} "
+                  f"{loop_seconds / vectorized_seconds:7.1f}x {model_seconds * 1000:15.3f}")
+
+
+if __name__ == '__main__':
+    main()
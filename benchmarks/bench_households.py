@@ -0,0 +1,65 @@
+import os
+import sys
+import tempfile
+import time
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from households import open_household
+
+# זמן פתיחה ושאילתות של משק בית אחד כשמשקי הבית האחרים באותה פריסה גדלים.
+# כל משק בית הוא קובץ נפרד, ולכן הזמנים צריכים להישאר קבועים
+HOUSEHOLD_ROWS = 20_000
+OTHER_HOUSEHOLDS = 10
+OTHER_ROWS = [0, 100_000, 1_000_000]
+MONTH = '2024-06'
+
+
+# עסקאות לדוגמה על פני שנתיים
+def make_frame(n, seed):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        'date': pd.Timestamp('2023-01-01') + pd.to_timedelta(rng.integers(0, 730, n), unit='D'),
+        'amount': rng.integers(10, 2000, n).astype('float64'),
+        'category': rng.choice(['מזון', 'דיור', 'חשבונות', 'תחבורה', 'משכורת'], n),
+        'description': 'עסקה',
+        'type': rng.choice(['income', 'expense'], n, p=[0.1, 0.9])
+    })
+
+
+# מילוי משק בית ושמירתו לדיסק
+def fill(directory, household, n, seed):
+    store = open_household(directory, household)
+    if n > 0:
+        store.add_frame(make_frame(n, seed))
+    store.close()
+
+
+# פתיחה קרה של משק הבית ושאילתות של דף הסקירה
+def measure(directory):
+    start = time.perf_counter()
+    store = open_household(directory, 'family-0')
+    opened = time.perf_counter()
+    store.query(month=MONTH)
+    store.aggregates(month=MONTH)
+    queried = time.perf_counter()
+    store.close()
+    return opened - start, queried - opened
+
+
+def main():
+    print(f"{'other rows':>12} {'open ms':>9} {'query ms':>9}")
+    for other_rows in OTHER_ROWS:
+        with tempfile.TemporaryDirectory() as directory:
+            fill(directory, 'family-0', HOUSEHOLD_ROWS, 0)
+            for i in range(1, OTHER_HOUSEHOLDS + 1):
+                fill(directory, f'family-{i}', other_rows // OTHER_HOUSEHOLDS, i)
+
+            open_seconds, query_seconds = measure(directory)
+            print(f"{other_rows:>12,} {open_seconds * 1000:9.1f} {query_seconds * 1000:9.1f}")
+
+
+if __name__ == '__main__':
+    main()
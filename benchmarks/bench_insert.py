@@ -0,0 +1,73 @@
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from store import TransactionStore
+
+# השוואת עלות הוספה: pd.concat לכל הוספה מול המאגר. הוספה בודדת נבדקת ונכנסת לחוצץ, והחוצץ
+# נכתב לבסיס הנתונים בטרנזקציה אחת בקריאה הבאה (או כל FLUSH_SIZE הוספות, בתוך זמן ההוספה)
+SIZES = [1_000, 10_000, 100_000, 1_000_000]
+CONCAT_MAX_SIZE = 10_000
+
+
+# יצירת עסקה לדוגמה
+def make_record(i):
+    return {
+        'id': i,
+        'date': datetime(2020, 1, 1) + timedelta(days=i % 3650),
+        'amount': float(i % 500 + 1),
+        'category': 'מזון',
+        'description': f'עסקה {i}',
+        'type': 'expense'
+    }
+
+
+# הוספה בשיטה הישנה - העתקת כל הטבלה בכל הוספה
+def bench_concat(n):
+    df = pd.DataFrame({'id': [], 'date': [], 'amount': [], 'category': [], 'description': [], 'type': []})
+    start = time.perf_counter()
+    for i in range(n):
+        df = pd.concat([df, pd.DataFrame([make_record(i)])], ignore_index=True)
+    return time.perf_counter() - start
+
+
+# הוספה למאגר (עסקה בכל פעם, או טבלה אחת כמו בייבוא) וכתיבה אחת של השארית בסוף
+def bench_store(n, single):
+    with tempfile.TemporaryDirectory() as directory:
+        store = TransactionStore(os.path.join(directory, 'bench.db'))
+        records = [make_record(i) for i in range(n)]
+        # מחיצות טעונות, כדי שהמיזוג יעבוד על הזיכרון כמו בתצוגה
+        store.query()
+
+        start = time.perf_counter()
+        if single:
+            for record in records:
+                store.add([record])
+        else:
+            store.add_frame(pd.DataFrame(records))
+        insert_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        store.flush()
+        flush_time = time.perf_counter() - start
+
+        assert len(store.query()) == n
+        store.close()
+    return insert_time, flush_time
+
+
+def main():
+    print(f"{'rows':>10} {'concat us/row':>14} {'add us/row':>11} {'flush us/row':>13} {'batch us/row':>13}")
+    for n in SIZES:
+        concat_cell = f"{bench_concat(n) / n * 1e6:14.2f}" if n <= CONCAT_MAX_SIZE else f"{'-':>14}"
+        add_time, flush_time = bench_store(n, single=True)
+        batch_time, _ = bench_store(n, single=False)
+        print(f"{n:>10,} {concat_cell} {add_time / n * 1e6:11.2f} {flush_time / n * 1e6:13.2f} {batch_time / n * 1e6:13.2f}")
+
+if __name__ == '__main__':
+    main()
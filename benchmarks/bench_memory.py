@@ -0,0 +1,61 @@
+import os
+import sys
+import tempfile
+from datetime import datetime, timedelta
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from store import TransactionStore, bytes_per_row
+
+# השוואת זיכרון לשורה: הטבלה הישנה (נבנית מרשימות ריקות, מחרוזות וסכומי float)
+# מול הטבלה הטיפוסית של המאגר (קטגוריות, int64 ואגורות)
+SIZES = [1_000, 10_000, 100_000]
+CATEGORIES = ['דיור', 'מזון', 'תחבורה', 'חשבונות', 'בילויים', 'קניות', 'בריאות', 'חינוך', 'אחר']
+
+
+# יצירת עסקה לדוגמה
+def make_record(i):
+    return {
+        'id': i,
+        'date': datetime(2020, 1, 1) + timedelta(days=i % 3650),
+        'amount': float(i % 500 + 1) + 0.5,
+        'category': CATEGORIES[i % len(CATEGORIES)],
+        'description': f'עסקה {i}',
+        'type': 'income' if i % 10 == 0 else 'expense'
+    }
+
+
+# הטבלה כפי שנבנתה לפני המאגר: עמודות ללא טיפוס מפורש
+def untyped_frame(records):
+    df = pd.DataFrame({'id': [], 'date': [], 'amount': [], 'category': [], 'description': [], 'type': []})
+    df = pd.concat([df, pd.DataFrame(records)], ignore_index=True)
+    df['year_month'] = df['date'].dt.strftime('%Y-%m')
+    return df
+
+
+# הטבלה כפי שהמאגר מחזיר אותה
+def typed_frame(records):
+    with tempfile.TemporaryDirectory() as directory:
+        store = TransactionStore(os.path.join(directory, 'bench.db'))
+        store.add(records)
+        df = store.query()
+        store.close()
+    return df
+
+
+def main():
+    print(f"{'rows':>10} {'untyped B/row':>14} {'typed B/row':>12} {'saving':>8}")
+    for n in SIZES:
+        records = [make_record(i) for i in range(n)]
+        before = bytes_per_row(untyped_frame(records))
+        after = bytes_per_row(typed_frame(records))
+        print(f"{n:>10,} {before:14.1f} {after:12.1f} {1 - after / before:8.1%}")
+
+    print()
+    print("untyped dtypes:", dict(untyped_frame(records[:10]).dtypes.astype(str)))
+    print("typed dtypes:  ", dict(typed_frame(records[:10]).dtypes.astype(str)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,96 @@
+import os
+import sys
+import tempfile
+import time
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from store import TransactionStore
+
+# הוצאות לפי קטגוריה לטווחי תאריכים (חודש, רבעון, שנה וכל ההיסטוריה): חיתוך עסקאות וקיבוץ
+# מול הפרש של סכומים מצטברים יומיים, כשההיסטוריה גדלה
+YEARS = [1, 5, 20]
+ROWS_PER_YEAR = 50_000
+CATEGORIES = 40
+END = pd.Timestamp('2025-12-31')
+REPEATS = 5
+UPDATES = 20
+
+
+# עסקאות לדוגמה לאורך years שנים
+def make_frame(years):
+    rng = np.random.default_rng(0)
+    n = years * ROWS_PER_YEAR
+    return pd.DataFrame({
+        'date': END - pd.to_timedelta(rng.integers(0, years * 365, n), unit='D'),
+        'amount': rng.integers(10, 2000, n).astype('float64'),
+        'category': np.array([f'קטגוריה {i}' for i in range(CATEGORIES)])[rng.integers(0, CATEGORIES, n)],
+        'description': 'עסקה',
+        'type': 'expense'
+    })
+
+
+# טווחי הדוח עד סוף ההיסטוריה
+def make_ranges(years):
+    return {
+        'month': (END - pd.DateOffset(months=1) + pd.Timedelta(days=1), END),
+        'quarter': (END - pd.DateOffset(months=3) + pd.Timedelta(days=1), END),
+        'year': (END - pd.DateOffset(years=1) + pd.Timedelta(days=1), END),
+        'all': (END - pd.DateOffset(years=years) + pd.Timedelta(days=1), END)
+    }
+
+
+def scan(store, start, end):
+    expenses = store.query_range(start, end, type='expense')
+    return expenses.groupby('category', observed=True)['amount'].agg(total='sum', count='count')
+
+
+def prefix(store, start, end):
+    return store.range_aggregates(start, end, type='expense')
+
+
+def best_of(func, *args):
+    best = float('inf')
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        func(*args)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    print(f"{'years':>5} {'range':>8} {'scan ms':>9} {'prefix ms':>10} {'speedup':>8} {'build ms':>9} {'update ms':>10}")
+    for years in YEARS:
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'transactions.db')
+            store = TransactionStore(path)
+            store.add_frame(make_frame(years))
+            store.close()
+
+            # בנייה קרה של הסכומים המצטברים מטבלת הסיכומים היומיים
+            store = TransactionStore(path)
+            start = time.perf_counter()
+            store.range_aggregates(END, END)
+            build_seconds = time.perf_counter() - start
+
+            # עדכון מצטבר: הוספת הוצאה אחת, כתיבה ושאילתת טווח (ממוצע על UPDATES הוספות)
+            start = time.perf_counter()
+            for _ in range(UPDATES):
+                store.add([{'date': END, 'amount': 10.0, 'category': 'קטגוריה 0', 'description': 'חדשה', 'type': 'expense'}])
+                store.range_aggregates(END, END)
+            update_seconds = (time.perf_counter() - start) / UPDATES
+
+            # טעינת כל המחיצות מראש, כדי שהסריקה לא תימדד עם קריאה מהדיסק
+            store.query()
+            for name, (range_start, range_end) in make_ranges(years).items():
+                scan_seconds = best_of(scan, store, range_start, range_end)
+                prefix_seconds = best_of(prefix, store, range_start, range_end)
+                print(f"{years:>5} {name:>8} {scan_seconds * 1000:9.2f} {prefix_seconds * 1000:10.3f} "
+                      f"{scan_seconds / prefix_seconds:7.1f}x {build_seconds * 1000:9.0f} {update_seconds * 1000:10.1f}")
+            store.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,70 @@
+import os
+import sys
+import time
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from recurring import expand_rules
+
+# פריסת כללי עסקאות קבועות לתחזית: פריסה וקטורית מול לולאה של pd.date_range לכל כלל
+RULES = [10, 100, 1_000]
+YEARS = [1, 10, 30]
+REPEATS = 3
+
+
+# כללים לדוגמה: רובם חודשיים, חלקם שבועיים ויומיים
+def make_rules(n):
+    rng = np.random.default_rng(0)
+    return pd.DataFrame({
+        'id': np.arange(n, dtype='int64'),
+        'description': 'כלל',
+        'amount': rng.integers(1_000, 500_000, n),
+        'category': 'אחר',
+        'type': rng.choice(['income', 'expense'], n),
+        'frequency': rng.choice(['monthly', 'weekly', 'daily'], n, p=[0.7, 0.2, 0.1]),
+        'interval': rng.integers(1, 4, n),
+        'start_date': pd.Timestamp('2020-01-01') + pd.to_timedelta(rng.integers(0, 1500, n), unit='D'),
+        'end_date': pd.NaT,
+        'posted_until': pd.NaT
+    })
+
+
+# לולאה לכל כלל: סדרת תאריכים מ-pandas וסינון לחלון
+def loop_expand(rules, start, end):
+    frames = []
+    for rule in rules.itertuples():
+        if rule.frequency == 'monthly':
+            dates = pd.date_range(rule.start_date, end, freq=pd.DateOffset(months=rule.interval))
+        else:
+            dates = pd.date_range(rule.start_date, end, freq=f"{rule.interval * (7 if rule.frequency == 'weekly' else 1)}D")
+        dates = dates[dates >= start]
+        frames.append(pd.DataFrame({'rule_id': rule.id, 'date': dates, 'amount': rule.amount}))
+    return pd.concat(frames, ignore_index=True)
+
+
+def best_of(func, *args):
+    best = float('inf')
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        result = func(*args)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    start = pd.Timestamp('2025-01-01')
+    print(f"{'rules':>6} {'years':>6} {'occurrences':>12} {'loop ms':>9} {'vectorized ms':>14} {'speedup':>8}")
+    for n in RULES:
+        rules = make_rules(n)
+        for years in YEARS:
+            end = start + pd.DateOffset(years=years)
+            loop_seconds, _ = best_of(loop_expand, rules, start, end)
+            vectorized_seconds, occurrences = best_of(expand_rules, rules, start, end)
+            print(f"{n:>6,} {years:>6} {len(occurrences):>12,} {loop_seconds * 1000:9.1f} "
+                  f"{vectorized_seconds * 1000:14.1f} {loop_seconds / vectorized_seconds:7.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,78 @@
+import os
+import sys
+import time
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from category_tree import CategoryTree
+
+# סכומים לכל רמות עץ הקטגוריות (שלוש רמות) לחודש אחד: גלגול הסיכום לפי קטגוריה עם מיפוי האבות
+# המחושב מראש, מול סכום העסקאות של כל תת-עץ (כמו בפירוט שמחושב מחדש מהעסקאות)
+ROOTS = [10, 30, 100]
+CHILDREN = 5
+ROWS = 50_000
+REPEATS = 5
+
+
+# עץ לדוגמה: roots קטגוריות, לכל אחת CHILDREN תת-קטגוריות ולכל אחת מהן CHILDREN נוספות
+def make_tree(roots):
+    nodes = []
+    parents = {}
+    for root in range(roots):
+        nodes.append(f'{root}')
+        for child in range(CHILDREN):
+            nodes.append(f'{root}.{child}')
+            parents[f'{root}.{child}'] = f'{root}'
+            for leaf in range(CHILDREN):
+                nodes.append(f'{root}.{child}.{leaf}')
+                parents[f'{root}.{child}.{leaf}'] = f'{root}.{child}'
+    return CategoryTree(nodes, parents)
+
+
+# עסקאות החודש, בכל רמות העץ
+def make_transactions(tree):
+    rng = np.random.default_rng(0)
+    return pd.DataFrame({
+        'category': np.array(tree.nodes)[rng.integers(0, len(tree.nodes), ROWS)],
+        'amount': rng.integers(1_000, 100_000, ROWS)
+    })
+
+
+# סכום העסקאות של כל תת-עץ
+def subtree_sums(tree, transactions):
+    return pd.Series({node: transactions.loc[transactions['category'].isin(tree.subtree(node)), 'amount'].sum() for node in tree.nodes})
+
+
+# קיבוץ אחד לפי קטגוריה וגלגול לכל הרמות
+def rollup(tree, transactions):
+    return tree.rollup(transactions.groupby('category')['amount'].sum())
+
+
+def best_of(func, *args):
+    best = float('inf')
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        func(*args)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    print(f"{'categories':>10} {'subtrees ms':>12} {'rollup ms':>10} {'speedup':>8} {'rollup only ms':>15}")
+    for roots in ROOTS:
+        tree = make_tree(roots)
+        transactions = make_transactions(tree)
+        totals = transactions.groupby('category')['amount'].sum()
+        assert np.allclose(subtree_sums(tree, transactions)[tree.nodes], rollup(tree, transactions)[tree.nodes])
+
+        subtree_seconds = best_of(subtree_sums, tree, transactions)
+        rollup_seconds = best_of(rollup, tree, transactions)
+        only_seconds = best_of(tree.rollup, totals)
+        print(f"{len(tree.nodes):>10,} {subtree_seconds * 1000:12.1f} {rollup_seconds * 1000:10.2f} "
+              f"{subtree_seconds / rollup_seconds:7.1f}x {only_seconds * 1000:15.3f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,68 @@
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+import warnings
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from households import DEFAULT_HOUSEHOLD, open_household
+
+# עלות של כל סשן נוסף של אותו משק בית: זמן הרינדור הראשון והזיכרון שהוקצה בו.
+# המאגר, הסיכומים והתרשימים משותפים לתהליך, ולכן סשן נוסף צריך לעלות מעט מאוד
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SESSIONS = 5
+VIEW = 'עסקאות'
+ROWS = 300_000
+
+
+# מילוי משק הבית הראשי בשנתיים של עסקאות עד היום
+def fill(directory):
+    rng = np.random.default_rng(0)
+    end = pd.Timestamp.now().normalize()
+    store = open_household(directory, DEFAULT_HOUSEHOLD)
+    store.add_frame(pd.DataFrame({
+        'date': end - pd.to_timedelta(rng.integers(0, 730, ROWS), unit='D'),
+        'amount': rng.integers(10, 2000, ROWS).astype('float64'),
+        'category': rng.choice(['מזון', 'דיור', 'חשבונות', 'תחבורה', 'משכורת'], ROWS),
+        'description': 'עסקה',
+        'type': rng.choice(['income', 'expense'], ROWS, p=[0.1, 0.9])
+    }))
+    store.close()
+
+
+# רינדור ראשון של סשן חדש בדף נתון
+def render_session():
+    from streamlit.testing.v1 import AppTest
+
+    app = AppTest.from_file(os.path.join(ROOT, 'budget.py'), default_timeout=120)
+    app.session_state['view'] = VIEW
+    app.run()
+    return app
+
+
+def main():
+    warnings.filterwarnings('ignore')
+    with tempfile.TemporaryDirectory() as directory:
+        os.environ['HOMEFINANCE_DATA_DIR'] = directory
+        fill(directory)
+
+        # הסשנים נשמרים ברשימה כדי שהזיכרון שלהם לא ישתחרר בין המדידות
+        sessions = []
+        tracemalloc.start()
+        print(f"{'session':>8} {'render ms':>10} {'allocated KB':>13}")
+        for i in range(SESSIONS):
+            before = tracemalloc.get_traced_memory()[0]
+            start = time.perf_counter()
+            sessions.append(render_session())
+            elapsed = time.perf_counter() - start
+            allocated = tracemalloc.get_traced_memory()[0] - before
+            print(f"{i + 1:>8} {elapsed * 1000:10.0f} {allocated / 1024:13,.0f}")
+        tracemalloc.stop()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,63 @@
+import os
+import subprocess
+import sys
+import tempfile
+from collections import defaultdict
+
+# זמן עד הרינדור הראשון של האפליקציה בתהליך חדש, ופירוט הייבואים שקרו בזמן הרינדור
+# (בפורמט של python -X importtime). כל דף נמדד בתהליך נפרד כדי שהמטמון של המודולים יהיה קר
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+VIEWS = ['סקירה', 'הכנסה חדשה', 'עסקאות', 'דוחות']
+CHART_LIBRARIES = ['plotly', 'matplotlib', 'altair']
+TOP_PACKAGES = 8
+MARKER = 'first-render-start'
+
+# הסקריפט שרץ בתהליך הנמדד: טעינת האפליקציה בדף נתון וריצה ראשונה אחת
+RENDER_SCRIPT = f"""
+import sys, time
+from streamlit.testing.v1 import AppTest
+app = AppTest.from_file({os.path.join(ROOT, 'budget.py')!r}, default_timeout=120)
+app.session_state['view'] = sys.argv[1]
+print({MARKER!r}, file=sys.stderr, flush=True)
+start = time.perf_counter()
+app.run()
+print(f"render {{time.perf_counter() - start:.6f}}")
+"""
+
+
+# הרצת דף אחד בתהליך חדש - מחזיר זמן רינדור בשניות וזמן ייבוא עצמי (מיקרו-שניות) לכל חבילה
+def measure(view):
+    with tempfile.TemporaryDirectory() as directory:
+        env = dict(os.environ, HOMEFINANCE_DATA_DIR=directory)
+        result = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', RENDER_SCRIPT, view],
+            capture_output=True, text=True, env=env, cwd=ROOT, check=True
+        )
+
+    render_seconds = float(result.stdout.split('render')[-1])
+
+    # רק ייבואים שקרו אחרי הסימון - כלומר בזמן הרינדור עצמו
+    packages = defaultdict(int)
+    stderr = result.stderr.split(MARKER, 1)[-1]
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, _, name = line[len('import time:'):].split('|')
+        packages[name.strip().split('.')[0]] += int(self_us)
+    return render_seconds, packages
+
+
+def main():
+    for view in VIEWS:
+        render_seconds, packages = measure(view)
+        imports_ms = sum(packages.values()) / 1000
+        loaded = [library for library in CHART_LIBRARIES if library in packages]
+
+        print(f"{view}: first render {render_seconds * 1000:,.0f} ms, imports during render {imports_ms:,.0f} ms")
+        print(f"  chart libraries imported: {', '.join(loaded) if loaded else 'none'}")
+        for name, self_us in sorted(packages.items(), key=lambda item: -item[1])[:TOP_PACKAGES]:
+            print(f"  {name:<24} {self_us / 1000:10.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,97 @@
+import os
+import sys
+import time
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from reports import monthly_trends
+from store import periods_of, to_agorot
+
+# דוח "מגמות לאורך זמן" על 10 שנים של עסקאות יומיות
+YEARS = 10
+TRANSACTIONS_PER_DAY = 10
+REPEATS = 5
+
+
+# יצירת עסקאות יומיות לדוגמה
+def make_transactions():
+    rng = np.random.default_rng(0)
+    days = pd.date_range('2015-01-01', periods=365 * YEARS, freq='D')
+    dates = np.repeat(days.to_numpy(), TRANSACTIONS_PER_DAY)
+    n = len(dates)
+    return pd.DataFrame({
+        'id': np.arange(n),
+        'date': dates,
+        'amount': rng.integers(10, 2000, n).astype('float64'),
+        'category': rng.choice(['מזון', 'דיור', 'חשבונות', 'תחבורה', 'בידור', 'משכורת'], n),
+        'description': 'עסקה',
+        'type': rng.choice(['income', 'expense'], n, p=[0.1, 0.9])
+    })
+
+
+# הלולאה הקודמת: מסכה על כל הטבלה לכל חודש
+def loop_trends(transactions):
+    transactions = transactions.copy()
+    transactions['year_month'] = transactions['date'].dt.strftime('%Y-%m')
+
+    monthly_summary = []
+    for ym in sorted(transactions['year_month'].unique()):
+        month_trans = transactions[transactions['year_month'] == ym]
+
+        income = month_trans[month_trans['type'] == 'income']['amount'].sum()
+        expenses = month_trans[month_trans['type'] == 'expense']['amount'].sum()
+        savings = income - expenses
+        savings_rate = (savings / income * 100) if income > 0 else 0
+
+        monthly_summary.append({
+            'year_month': ym,
+            'income': income,
+            'expenses': expenses,
+            'savings': savings,
+            'savings_rate': savings_rate
+        })
+
+    return pd.DataFrame(monthly_summary)
+
+
+# בניית טבלת סיכומים (כמו זו שהמאגר מתחזק, באגורות) מעסקאות גולמיות
+def build_aggregates(transactions):
+    return (
+        transactions
+        .assign(amount=to_agorot(transactions['amount']))
+        .groupby([periods_of(transactions['date']), 'type', 'category'])['amount']
+        .agg(total='sum', count='count')
+        .rename_axis(['period', 'type', 'category'])
+        .reset_index()
+    )
+
+
+# זמן ריצה ממוצע של פונקציה
+def timed(func, *args):
+    start = time.perf_counter()
+    for _ in range(REPEATS):
+        result = func(*args)
+    return (time.perf_counter() - start) / REPEATS, result
+
+
+def main():
+    transactions = make_transactions()
+    aggregates = build_aggregates(transactions)
+
+    loop_time, expected = timed(loop_trends, transactions)
+    raw_time, from_raw = timed(lambda df: monthly_trends(build_aggregates(df)), transactions)
+    cube_time, from_cube = timed(monthly_trends, aggregates)
+
+    pd.testing.assert_frame_equal(expected, from_raw, check_dtype=False)
+    pd.testing.assert_frame_equal(expected, from_cube, check_dtype=False)
+
+    print(f"{len(transactions):,} transactions, {len(expected)} months")
+    print(f"{'loop over months':<28} {loop_time * 1000:10.2f} ms")
+    print(f"{'groupby on transactions':<28} {raw_time * 1000:10.2f} ms  ({loop_time / raw_time:.0f}x)")
+    print(f"{'pivot on maintained cube':<28} {cube_time * 1000:10.2f} ms  ({loop_time / cube_time:.0f}x)")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,15 +1,67 @@
 import streamlit as st
 import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
-import altair as alt
 from datetime import datetime, timedelta
 import calendar
-import plotly.graph_objects as go
-import plotly.express as px
-import random
-import io
-import base64
+import os
+from store import EDITABLE_COLUMNS, parse_period, period_of, format_periods, to_shekels, with_shekels
+from importer import import_csv, known_categories
+from reports import COMPARISONS, monthly_trends, months_covered, period_comparisons, period_trends, lttb
+from memo import memoize
+from export import EXPORT_FORMATS, available_formats, export_file, store_chunks, frame_chunks
+from recurring import next_occurrences
+from forecast import history_matrix, fit, predict
+from households import DEFAULT_HOUSEHOLD, Household, list_households, validate_household
+from category_tree import CategoryTree
+from alerts import budget_alerts, crossed_threshold, elapsed_fraction, projected_spend
+
+# תיקיית קבצי הנתונים (קובץ לכל משק בית)
+DATA_DIR = os.environ.get('HOMEFINANCE_DATA_DIR', 'data')
+
+# מספר התוצאות השמורות לכל פונקציית חישוב
+MEMO_CACHE_SIZE = 32
+
+# מספר משקי הבית שהמצב שלהם (מאגר פתוח ומטמוני חישובים) נשמר בזיכרון התהליך
+MAX_OPEN_HOUSEHOLDS = 64
+
+# מספר העסקאות בכל עמוד בתצוגת העסקאות
+PAGE_SIZE = 50
+
+# מספר הנקודות המרבי לכל סדרה בתרשים שנשלח לדפדפן
+MAX_CHART_POINTS = 500
+
+# תדירויות העסקאות הקבועות לתצוגה, ויחידת המרווח של כל אחת
+FREQUENCY_LABELS = {'monthly': 'חודשית', 'weekly': 'שבועית', 'daily': 'כל מספר ימים'}
+FREQUENCY_UNITS = {'monthly': 'חודשים', 'weekly': 'שבועות', 'daily': 'ימים'}
+
+# מודלי התחזית לתצוגה
+FORECAST_MODELS = {
+    'moving_average': 'ממוצע נע (3 חודשים)',
+    'seasonal_naive': 'עונתי (אותו חודש בשנה שעברה)',
+    'linear_trend': 'מגמה לינארית'
+}
+
+# מספר חודשי ההיסטוריה שמוצגים לפני התחזית בתרשים
+FORECAST_HISTORY_MONTHS = 24
+
+# סוגי כללי הסיווג לתצוגה
+RULE_KIND_LABELS = {'keyword': 'מילת מפתח', 'alias': 'כינויי בית עסק (מופרדים בפסיק)', 'regex': 'ביטוי רגולרי'}
+
+# תקופות הדוחות: החודש הנבחר, טווח חופשי, רבעון, מתחילת השנה ו-N החודשים האחרונים
+REPORT_PERIODS = ['חודש נבחר', 'טווח תאריכים', 'רבעון', 'מתחילת השנה', 'חודשים אחרונים']
+
+# סוגי ההשוואה בין תקופות לתצוגה
+COMPARISON_LABELS = {
+    'mom': 'מול החודש הקודם',
+    'same_month_last_year': 'מול אותו חודש בשנה שעברה',
+    'yoy': '12 חודשים מול 12 החודשים שלפניהם'
+}
+
+# מספר החודשים במפת החום של ההשוואות (עד החודש הנבחר)
+COMPARISON_HEATMAP_MONTHS = 24
+
+# רזולוציות תרשים המגמות (None - חודשית, מטבלת הסיכומים)
+TREND_RESOLUTIONS = {'חודשית': None, 'שבועית': 'W', 'יומית': 'D'}
 
 # הגדרת מבנה האפליקציה
 st.set_page_config(
@@ -69,30 +121,58 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
+# הגדרות הקטגוריות - אובייקט אחד לכל התהליך, משותף לכל הסשנים.
+# הרשימות כוללות את כל הרמות (קטגוריות ותת-קטגוריות), לפי סדר התצוגה
+@st.cache_resource
+def get_categories():
+    return {
+        'income': ['משכורת', 'בונוס', 'מתנות', 'השקעות', 'שכר דירה', 'אחר'],
+        'expense': ['מזון', 'סופר', 'מסעדות', 'דיור', 'חשבונות', 'תחבורה', 'דלק', 'תחבורה ציבורית',
+                  'בידור', 'בריאות', 'ביגוד', 'חינוך', 'חיסכון', 'חופשות', 'קניות', 'אחר']
+    }
+
+# תת-קטגוריות: מיפוי מתת-קטגוריה לקטגוריית האב, לכל סוג עסקה
+CATEGORY_PARENTS = {
+    'income': {},
+    'expense': {'סופר': 'מזון', 'מסעדות': 'מזון', 'דלק': 'תחבורה', 'תחבורה ציבורית': 'תחבורה'}
+}
+
+# עץ הקטגוריות של כל סוג עסקה (משותף לכל הסשנים)
+@st.cache_resource
+def get_category_trees():
+    categories = get_categories()
+    return {type: CategoryTree(categories[type], CATEGORY_PARENTS[type]) for type in categories}
+
+# המצב המשותף של משק בית (מאגר ומטמוני חישובים) - אחד לכל התהליך, כך שסשנים של אותו משק בית
+# חולקים מחיצות, סיכומים, אינדקס חיפוש ותוצאות חישובים. התקציבים וההגדרות נשמרים בקובץ של
+# משק הבית, ולכן משק בית שנזרק מהמטמון (נסגר וכותב את החוצץ שלו) נפתח מחדש בלי לאבד אותם
+@st.cache_resource(max_entries=MAX_OPEN_HOUSEHOLDS, on_release=lambda household: household.close())
+def get_household(household):
+    return Household(DATA_DIR, household, {category: 0 for category in get_categories()['expense']}, MEMO_CACHE_SIZE)
+
+# המצב המשותף של משק הבית הנבחר
+def current_household():
+    return get_household(st.session_state.household)
+
 # אתחול משתני סשן
 def init_session_state():
-    if 'transactions' not in st.session_state:
-        # טבלת עסקאות
-        st.session_state.transactions = pd.DataFrame({
-            'id': [],
-            'date': [],
-            'amount': [],
-            'category': [],
-            'description': [],
-            'type': []  # 'income' או 'expense'
-        })
+    if 'household' not in st.session_state:
+        # משק הבית הנבחר - מהכתובת (?household=...) או משק הבית הראשי
+        try:
+            st.session_state.household = validate_household(st.query_params.get('household', DEFAULT_HOUSEHOLD))
+        except ValueError:
+            st.session_state.household = DEFAULT_HOUSEHOLD
+
+    # מאגר העסקאות ותקציב לפי קטגוריה של משק הבית (עמודת type היא 'income' או 'expense').
+    # מתרעננים בכל ריצה, כי המצב המשותף מתעדכן גם מסשנים אחרים
+    household = current_household()
+    st.session_state.store = household.store
+    st.session_state.budgets = household.budgets()
     
     if 'categories' not in st.session_state:
-        # קטגוריות הוצאות והכנסות
-        st.session_state.categories = {
-            'income': ['משכורת', 'בונוס', 'מתנות', 'השקעות', 'שכר דירה', 'אחר'],
-            'expense': ['מזון', 'דיור', 'חשבונות', 'תחבורה', 'בידור', 'בריאות', 
-                      'ביגוד', 'חינוך', 'חיסכון', 'חופשות', 'קניות', 'אחר']
-        }
-    
-    if 'budgets' not in st.session_state:
-        # תקציב לפי קטגוריה
-        st.session_state.budgets = {category: 0 for category in st.session_state.categories['expense']}
+        # קטגוריות הוצאות והכנסות (משותפות לכל הסשנים)
+        st.session_state.categories = get_categories()
+        st.session_state.category_trees = get_category_trees()
 
     if 'view' not in st.session_state:
         # דף נוכחי
@@ -103,21 +183,43 @@ def init_session_state():
         current_month = datetime.now().month
         current_year = datetime.now().year
         st.session_state.month_filter = f"{current_year}-{current_month:02d}"
-    
-    if 'show_sample_data' not in st.session_state:
-        # האם להציג נתונים לדוגמה
-        st.session_state.show_sample_data = False
 
-# יצירת מזהה ייחודי לכל עסקה
-def generate_id():
-    return random.randint(10000, 99999)
+# מעבר למשק בית אחר (המאגר של הקודם נשאר פתוח לסשנים אחרים)
+def switch_household(household):
+    household = validate_household(household)
+    if household == st.session_state.household:
+        return
+
+    st.session_state.pop('transactions_page', None)
+    st.session_state.household = household
+    st.query_params['household'] = household
+    init_session_state()
+
+# גרסת הנתונים: משתנה בכל שינוי בעסקאות, בתקציב או בהגדרות
+def data_version():
+    return st.session_state.store.version
+
+# מטמון החישובים המשותף של משק הבית לפי שם פונקציה - שמור על משק הבית עצמו, כך שהוא נזרק
+# יחד איתו ולא יכול לשרוד למופע חדש שהגרסאות שלו מתחילות שוב מאפס
+def get_memo_cache(name):
+    return current_household().caches.get(name, data_version())
+
+# קישוט לשמירת תוצאות חישובים ותרשימים כל עוד הנתונים לא השתנו
+memoized = memoize(get_memo_cache, data_version)
+
+# שמירת התקציבים במאגר של משק הבית (מקדם את גרסת הנתונים)
+def update_budgets(budgets):
+    household = current_household()
+    household.update_budgets(budgets)
+    st.session_state.budgets = household.budgets()
 
 # פונקציה לטעינת נתונים לדוגמה
 def load_sample_data():
-    if st.session_state.show_sample_data:
+    household = current_household()
+    if household.sample_data_loaded():
         return
     
-    st.session_state.show_sample_data = True
+    household.mark_sample_data_loaded()
     
     # יצירת תאריכים לחודש נוכחי
     current_month = datetime.now().month
@@ -127,7 +229,6 @@ def load_sample_data():
     # נתוני הכנסות לדוגמה
     income_data = [
         {
-            'id': generate_id(),
             'date': datetime(current_year, current_month, 10),
             'amount': 12000,
             'category': 'משכורת',
@@ -135,7 +236,6 @@ def load_sample_data():
             'type': 'income'
         },
         {
-            'id': generate_id(),
             'date': datetime(current_year, current_month, 15),
             'amount': 2500,
             'category': 'שכר דירה',
@@ -143,7 +243,6 @@ def load_sample_data():
             'type': 'income'
         },
         {
-            'id': generate_id(),
             'date': datetime(current_year, current_month, 20),
             'amount': 500,
             'category': 'השקעות',
@@ -155,7 +254,6 @@ def load_sample_data():
     # נתוני הוצאות לדוגמה
     expense_data = [
         {
-            'id': generate_id(),
             'date': datetime(current_year, current_month, 1),
             'amount': 3500,
             'category': 'דיור',
@@ -163,7 +261,6 @@ def load_sample_data():
             'type': 'expense'
         },
         {
-            'id': generate_id(),
             'date': datetime(current_year, current_month, 5),
             'amount': 800,
             'category': 'חשבונות',
@@ -171,7 +268,6 @@ def load_sample_data():
             'type': 'expense'
         },
         {
-            'id': generate_id(),
             'date': datetime(current_year, current_month, 8),
             'amount': 1200,
             'category': 'מזון',
@@ -179,7 +275,6 @@ def load_sample_data():
             'type': 'expense'
         },
         {
-            'id': generate_id(),
             'date': datetime(current_year, current_month, 12),
             'amount': 400,
             'category': 'תחבורה',
@@ -187,7 +282,6 @@ def load_sample_data():
             'type': 'expense'
         },
         {
-            'id': generate_id(),
             'date': datetime(current_year, current_month, 15),
             'amount': 350,
             'category': 'בידור',
@@ -195,7 +289,6 @@ def load_sample_data():
             'type': 'expense'
         },
         {
-            'id': generate_id(),
             'date': datetime(current_year, current_month, 18),
             'amount': 200,
             'category': 'בריאות',
@@ -203,7 +296,6 @@ def load_sample_data():
             'type': 'expense'
         },
         {
-            'id': generate_id(),
             'date': datetime(current_year, current_month, 22),
             'amount': 500,
             'category': 'קניות',
@@ -229,33 +321,23 @@ def load_sample_data():
     }
     
     # עדכון תקציבים
-    st.session_state.budgets = budgets
+    update_budgets(budgets)
     
-    # הוספת עסקאות לטבלה
-    sample_data = pd.DataFrame(income_data + expense_data)
-    st.session_state.transactions = pd.concat([st.session_state.transactions, sample_data], ignore_index=True)
+    # הוספת עסקאות למאגר
+    st.session_state.store.add(income_data + expense_data)
 
 # פונקציה לסינון עסקאות לפי חודש
 def filter_transactions_by_month(month_str):
-    transactions = st.session_state.transactions
-    
-    if len(transactions) == 0:
-        return pd.DataFrame({
-            'id': [],
-            'date': [],
-            'amount': [],
-            'category': [],
-            'description': [],
-            'type': []
-        })
-    
-    year, month = map(int, month_str.split('-'))
-    mask = (transactions['date'].dt.year == year) & (transactions['date'].dt.month == month)
-    return transactions[mask]
+    # טעינה של מחיצת החודש המבוקש בלבד, לפי מפתח חודש מספרי
+    return st.session_state.store.query(month=parse_period(month_str))
 
 # פונקציה לחישוב סיכומים חודשיים
-def calculate_monthly_summary(filtered_transactions):
-    if len(filtered_transactions) == 0:
+@memoized
+def calculate_monthly_summary(month_str):
+    # קריאה מטבלת הסיכומים - O(קטגוריות) במקום O(עסקאות)
+    aggregates = st.session_state.store.aggregates(month=month_str)
+    
+    if len(aggregates) == 0:
         return {
             'total_income': 0,
             'total_expenses': 0,
@@ -266,16 +348,16 @@ def calculate_monthly_summary(filtered_transactions):
         }
     
     # סיכום הכנסות והוצאות
-    income = filtered_transactions[filtered_transactions['type'] == 'income']
-    expenses = filtered_transactions[filtered_transactions['type'] == 'expense']
+    income = aggregates[aggregates['type'] == 'income']
+    expenses = aggregates[aggregates['type'] == 'expense']
     
-    total_income = income['amount'].sum() if len(income) > 0 else 0
-    total_expenses = expenses['amount'].sum() if len(expenses) > 0 else 0
+    total_income = to_shekels(income['total'].sum())
+    total_expenses = to_shekels(expenses['total'].sum())
     net_savings = total_income - total_expenses
     
     # חישוב לפי קטגוריה
-    income_by_category = income.groupby('category')['amount'].sum().to_dict() if len(income) > 0 else {}
-    expenses_by_category = expenses.groupby('category')['amount'].sum().to_dict() if len(expenses) > 0 else {}
+    income_by_category = dict(zip(income['category'], to_shekels(income['total'])))
+    expenses_by_category = dict(zip(expenses['category'], to_shekels(expenses['total'])))
     
     # אחוז חיסכון
     savings_rate = (net_savings / total_income * 100) if total_income > 0 else 0
@@ -289,26 +371,40 @@ def calculate_monthly_summary(filtered_transactions):
         'savings_rate': savings_rate
     }
 
-# פונקציה להשוואת תקציב מול הוצאות בפועל
-def calculate_budget_vs_actual(filtered_transactions):
-    if len(filtered_transactions) == 0:
-        return pd.DataFrame({
-            'category': st.session_state.categories['expense'],
-            'budget': [st.session_state.budgets.get(cat, 0) for cat in st.session_state.categories['expense']],
-            'actual': [0] * len(st.session_state.categories['expense']),
-            'diff': [0] * len(st.session_state.categories['expense']),
-            'perc_used': [0] * len(st.session_state.categories['expense'])
-        })
-    
-    # סינון רק הוצאות
-    expenses = filtered_transactions[filtered_transactions['type'] == 'expense']
-    expenses_by_category = expenses.groupby('category')['amount'].sum().to_dict() if len(expenses) > 0 else {}
+# סכום ומספר עסקאות (בשקלים) לכל קטגוריה בכל רמות העץ - קיבוץ אחד לפי קטגוריה מטבלת הסיכומים
+# (או מהסכומים המצטברים לטווח תאריכים) וגלגול לקטגוריות האב. כל פירוט לתת-קטגוריות נקרא מכאן
+@memoized
+def calculate_category_rollup(month_str, date_range=None, transaction_type='expense'):
+    if date_range is None:
+        totals = st.session_state.store.aggregates(month=month_str, type=transaction_type)
+    else:
+        totals = st.session_state.store.range_aggregates(*date_range, type=transaction_type)
+    totals = totals.groupby('category')[['total', 'count']].sum()
+    rollup = st.session_state.category_trees[transaction_type].rollup(totals)
+    return rollup.assign(total=to_shekels(rollup['total']), count=rollup['count'].astype('int64'))
+
+# תת-הקטגוריות להצגה בפירוט של parent (None - רמת השורש, כולל קטגוריות שאינן בעץ)
+def category_children(rollup, parent, transaction_type='expense'):
+    tree = st.session_state.category_trees[transaction_type]
+    if parent is None:
+        return [category for category in rollup.index if category not in tree.parents]
+    return tree.children(parent)
+
+# פונקציה להשוואת תקציב מול הוצאות בפועל - לחודש, או לטווח תאריכים מול התקציב החודשי
+# כפול מספר החודשים שהטווח מכסה. parent - פירוט לתת-הקטגוריות שלו (None - קטגוריות השורש).
+# הוצאה של קטגוריה כוללת את תת-הקטגוריות שלה, ותקציב שלא הוגדר הוא סכום תקציבי תת-הקטגוריות
+@memoized
+def calculate_budget_vs_actual(month_str, date_range=None, parent=None):
+    rollup = calculate_category_rollup(month_str, date_range)
+    months = 1 if date_range is None else months_covered(*date_range)
+    tree = st.session_state.category_trees['expense']
+    budgets = tree.effective_budgets(st.session_state.budgets)
     
     # יצירת טבלת השוואה
     comparison = []
-    for category in st.session_state.categories['expense']:
-        budget = st.session_state.budgets.get(category, 0)
-        actual = expenses_by_category.get(category, 0)
+    for category in (tree.children(parent) if parent is not None else tree.children()):
+        budget = budgets[category] * months
+        actual = rollup['total'].get(category, 0)
         diff = budget - actual
         perc_used = (actual / budget * 100) if budget > 0 else 0
         
@@ -322,24 +418,117 @@ def calculate_budget_vs_actual(filtered_transactions):
     
     return pd.DataFrame(comparison)
 
-# פונקציה ליצירת תרשים הוצאות לפי קטגוריה
-def create_expenses_by_category_chart(filtered_transactions):
-    if len(filtered_transactions) == 0:
-        return None
+# התראות תקציב לכל הקטגוריות בחודש - מהמונים של טבלת הסיכומים, בלי סריקת עסקאות
+# (בכל רמות העץ, עם ההוצאות והתקציבים המגולגלים). התחזית לסוף החודש תלויה בתאריך היום,
+# ולכן הוא חלק מהפרמטרים (ומהמפתח במטמון)
+@memoized
+def calculate_budget_alerts(month_str, today):
+    rollup = calculate_category_rollup(month_str)
+    year, month = map(int, month_str.split('-'))
+    alerts = budget_alerts(
+        rollup['total'],
+        st.session_state.category_trees['expense'].effective_budgets(st.session_state.budgets),
+        current_household().alert_thresholds(),
+        elapsed_fraction(year, month, today)
+    )
+    # רק קטגוריות שחצו סף, או שבקצב הנוכחי יחרגו עד סוף החודש
+    return alerts[alerts['level'].notna() | (alerts['projected_overrun'] > 0)].sort_values('used', ascending=False)
+
+# פונקציה לחישוב הוצאות לפי קטגוריה - מהגלגול לכל רמות העץ. parent - פירוט לתת-הקטגוריות
+# שלו, עם שורה נפרדת להוצאות שנרשמו ישירות עליו (None - קטגוריות השורש)
+@memoized
+def calculate_expenses_by_category(month_str, date_range=None, parent=None):
+    rollup = calculate_category_rollup(month_str, date_range)
+    children = category_children(rollup, parent)
+    expenses = rollup.loc[children]
+    if parent is not None:
+        direct = rollup.loc[parent] - expenses.sum()
+        expenses = pd.concat([expenses, pd.DataFrame([direct], index=[f'{parent} (ללא תת-קטגוריה)'])])
+    expenses = expenses[expenses['count'] > 0]
+    return expenses.rename_axis('category').reset_index()
+
+# תחזית העסקאות הקבועות לחודשים הבאים (מהיום שאחרי today): הכללים נפרסים לחלון בלבד,
+# בלי לשמור מופעים עתידיים
+@memoized
+def calculate_recurring_projection(months, today):
+    start = pd.Timestamp(today) + pd.Timedelta(days=1)
+    occurrences = st.session_state.store.recurring_occurrences(start, start + pd.DateOffset(months=months))
+    
+    projection = (
+        occurrences
+        .assign(month=occurrences['date'].dt.strftime('%Y-%m'), amount=to_shekels(occurrences['amount']))
+        .pivot_table(index='month', columns='type', values='amount', aggfunc='sum', fill_value=0)
+        .reindex(columns=['income', 'expense'], fill_value=0)
+    )
+    projection['net'] = projection['income'] - projection['expense']
+    return occurrences, projection.reset_index()
+
+# התאמת מודל תחזית לכל הקטגוריות על החודשים המלאים שלפני end_period.
+# הפרמטרים נשמרים לפי גרסת הנתונים, כך ששינוי טווח התחזית לא מתאים את המודל מחדש
+@memoized
+def fit_forecast(model, end_period):
+    keys, first_period, matrix = history_matrix(st.session_state.store.aggregates(), end_period)
+    return keys, first_period, matrix, fit(matrix, model)
+
+# תחזית לכל קטגוריה ולסך ההכנסות, ההוצאות והחיסכון (בשקלים) ל-horizon חודשים מ-end_period
+@memoized
+def calculate_forecast(model, horizon, end_period):
+    keys, first_period, matrix, params = fit_forecast(model, end_period)
+    
+    months = format_periods(np.arange(end_period, end_period + horizon)).to_numpy()
+    by_category = pd.DataFrame(to_shekels(predict(params, horizon)), index=keys, columns=months)
+    
+    # סכום לפי סוג בכל חודש - היסטוריה ותחזית
+    def totals(df):
+        by_type = df.groupby(level='type').sum().reindex(['income', 'expense'], fill_value=0).T
+        return by_type.assign(savings=by_type['income'] - by_type['expense'])
+    
+    history_months = format_periods(np.arange(first_period, end_period)).to_numpy()
+    history = totals(pd.DataFrame(to_shekels(matrix), index=keys, columns=history_months))
+    return by_category, history, totals(by_category)
+
+# תרשים תחזית: היסטוריה בקו מלא ותחזית בקו מקווקו
+@memoized
+def create_forecast_chart(model, horizon, end_period):
+    import plotly.graph_objects as go
+    by_category, history, projected = calculate_forecast(model, horizon, end_period)
+    history = history.tail(FORECAST_HISTORY_MONTHS)
     
-    expenses = filtered_transactions[filtered_transactions['type'] == 'expense']
-    if len(expenses) == 0:
-        return None
+    fig = go.Figure()
+    for column, name, color in [('income', 'הכנסות', '#2E7D32'), ('expense', 'הוצאות', '#C62828'), ('savings', 'חסכונות', '#1565C0')]:
+        fig.add_trace(go.Scatter(x=history.index, y=history[column], name=name, line=dict(color=color, width=3)))
+        # התחזית מתחברת לנקודת ההיסטוריה האחרונה
+        fig.add_trace(go.Scatter(
+            x=np.concatenate([history.index[-1:], projected.index]),
+            y=np.concatenate([history[column].to_numpy()[-1:], projected[column].to_numpy()]),
+            name=f'{name} (תחזית)',
+            line=dict(color=color, width=2, dash='dash')
+        ))
     
-    # חישוב סכום לפי קטגוריה
-    expenses_by_category = expenses.groupby('category')['amount'].sum().reset_index()
+    fig.update_layout(
+        title=f'תחזית ל-{horizon} חודשים - {FORECAST_MODELS[model]}',
+        xaxis_title='חודש',
+        yaxis_title='סכום (₪)',
+        hovermode="x unified",
+        legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="center", x=0.5)
+    )
+    return fig
+
+# פונקציה ליצירת תרשים הוצאות לפי קטגוריה
+@memoized
+def create_expenses_by_category_chart(month_str, date_range=None, parent=None):
+    # ספריית התרשימים נטענת רק כשתרשים נבנה בפועל
+    import plotly.express as px
+    expenses_by_category = calculate_expenses_by_category(month_str, date_range, parent)
+    if len(expenses_by_category) == 0:
+        return None
     
     # יצירת תרשים עוגה
     fig = px.pie(
         expenses_by_category, 
-        values='amount', 
+        values='total', 
         names='category',
-        title='התפלגות הוצאות לפי קטגוריה',
+        title='התפלגות הוצאות לפי קטגוריה' if parent is None else f'התפלגות הוצאות - {parent}',
         color_discrete_sequence=px.colors.qualitative.Pastel
     )
     fig.update_traces(textposition='inside', textinfo='percent+label')
@@ -348,29 +537,16 @@ def create_expenses_by_category_chart(filtered_transactions):
     return fig
 
 # פונקציה ליצירת תרשים מגמה חודשית
+@memoized
 def create_monthly_trend_chart():
-    transactions = st.session_state.transactions
+    import plotly.graph_objects as go
+    aggregates = st.session_state.store.aggregates()
     
-    if len(transactions) == 0:
+    if len(aggregates) == 0:
         return None
     
-    # הוספת עמודות שנה וחודש
-    transactions['year_month'] = transactions['date'].dt.strftime('%Y-%m')
-    
-    # סיכום לפי חודש וסוג עסקה
-    monthly_income = transactions[transactions['type'] == 'income'].groupby('year_month')['amount'].sum()
-    monthly_expenses = transactions[transactions['type'] == 'expense'].groupby('year_month')['amount'].sum()
-    monthly_savings = monthly_income.subtract(monthly_expenses, fill_value=0)
-    
-    # יצירת דאטאפריים מסוכם
-    summary_df = pd.DataFrame({
-        'income': monthly_income,
-        'expenses': monthly_expenses,
-        'savings': monthly_savings
-    }).reset_index()
-    
-    # מיון לפי תאריך
-    summary_df = summary_df.sort_values('year_month')
+    # סיכום לפי חודש וסוג עסקה מתוך טבלת הסיכומים (ממוין לפי חודש)
+    summary_df = monthly_trends(aggregates)
     
     if len(summary_df) == 0:
         return None
@@ -409,8 +585,97 @@ def create_monthly_trend_chart():
     
     return fig
 
+# פונקציה ליצירת תרשים מגמה יומית או שבועית מהסיכומים היומיים - כל סדרה מדוללת בשרת ל-MAX_CHART_POINTS נקודות
+@memoized
+def create_period_trend_chart(freq):
+    import plotly.graph_objects as go
+    trends = period_trends(st.session_state.store.daily_by_type(), freq)
+    if len(trends) < 2:
+        return None
+    
+    # תאריכים כמחרוזות קצרות במקום חותמות זמן מלאות
+    dates = trends['date'].to_numpy().astype('datetime64[D]')
+    
+    fig = go.Figure()
+    for column, name, color in [('income', 'הכנסות', '#2E7D32'), ('expenses', 'הוצאות', '#C62828')]:
+        selected = lttb(dates.astype('int64'), trends[column], MAX_CHART_POINTS)
+        fig.add_trace(go.Scatter(
+            x=dates[selected].astype(str),
+            y=trends[column].to_numpy()[selected].round(2),
+            name=name,
+            line=dict(color=color, width=2)
+        ))
+    
+    fig.update_layout(
+        title='מגמת הכנסות והוצאות ' + ('שבועית' if freq == 'W' else 'יומית'),
+        xaxis_title='תאריך',
+        yaxis_title='סכום (₪)',
+        hovermode="x unified",
+        legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="center", x=0.5)
+    )
+    
+    return fig
+
+# השוואות בין תקופות לכל הקטגוריות ולכל החודשים, מטבלת הסיכומים
+@memoized
+def calculate_period_comparisons():
+    return period_comparisons(st.session_state.store.aggregates())
+
+# טבלת ההשוואה של חודש אחד לכל קטגוריה מסוג transaction_type (בשקלים)
+@memoized
+def calculate_comparison_table(comparison, month_str, transaction_type):
+    keys, periods, comparisons = calculate_period_comparisons()
+    column = np.searchsorted(periods, parse_period(month_str))
+    rows = np.flatnonzero(keys.get_level_values('type') == transaction_type)
+    if column >= len(periods) or periods[column] != parse_period(month_str) or len(rows) == 0:
+        return None
+    
+    current, base, delta, change = (values[rows, column] for values in comparisons[comparison])
+    table = pd.DataFrame({
+        'category': keys.get_level_values('category')[rows],
+        'current': to_shekels(current),
+        'base': to_shekels(base),
+        'delta': to_shekels(delta),
+        'change': change * 100
+    })
+    return table[(table['current'] > 0) | (table['base'] > 0)].sort_values('delta', ascending=False)
+
+# מפת חום של השינוי היחסי לכל קטגוריה בכל חודש, עד החודש הנבחר
+@memoized
+def create_comparison_heatmap(comparison, month_str, transaction_type):
+    import plotly.graph_objects as go
+    keys, periods, comparisons = calculate_period_comparisons()
+    end = np.searchsorted(periods, parse_period(month_str), side='right')
+    start = max(end - COMPARISON_HEATMAP_MONTHS, 0)
+    rows = np.flatnonzero(keys.get_level_values('type') == transaction_type)
+    change = comparisons[comparison][3][rows, start:end] * 100
+    if change.size == 0 or np.isnan(change).all():
+        return None
+    
+    # עלייה בהוצאות באדום, עלייה בהכנסות בירוק
+    fig = go.Figure(go.Heatmap(
+        z=change.round(1),
+        x=format_periods(periods[start:end]).to_numpy(),
+        y=keys.get_level_values('category')[rows],
+        colorscale='RdYlGn' if transaction_type == 'income' else 'RdYlGn_r',
+        zmid=0,
+        zmin=-100,
+        zmax=100,
+        colorbar=dict(title='שינוי %'),
+        hovertemplate='%{y} • %{x}: %{z:+.1f}%<extra></extra>'
+    ))
+    fig.update_layout(
+        title=f"שינוי ב{'הכנסות' if transaction_type == 'income' else 'הוצאות'} {COMPARISON_LABELS[comparison]}",
+        xaxis_title='חודש',
+        height=max(400, 28 * len(rows))
+    )
+    return fig
+
 # פונקציה ליצירת תרשים השוואת תקציב מול ביצוע
-def create_budget_vs_actual_chart(budget_comparison):
+@memoized
+def create_budget_vs_actual_chart(month_str, date_range=None, parent=None):
+    import plotly.graph_objects as go
+    budget_comparison = calculate_budget_vs_actual(month_str, date_range, parent)
     if len(budget_comparison) == 0:
         return None
     
@@ -438,7 +703,7 @@ def create_budget_vs_actual_chart(budget_comparison):
     ))
     
     fig.update_layout(
-        title='השוואת תקציב מול ביצוע',
+        title='השוואת תקציב מול ביצוע' if parent is None else f'השוואת תקציב מול ביצוע - {parent}',
         xaxis_title='קטגוריה',
         yaxis_title='סכום (₪)',
         barmode='group',
@@ -447,25 +712,63 @@ def create_budget_vs_actual_chart(budget_comparison):
     
     return fig
 
-# פונקציה ליצירת קובץ CSV להורדה
-def download_csv(filtered_transactions):
-    if len(filtered_transactions) == 0:
+# בחירת קטגוריה לפירוט לתת-הקטגוריות שלה (None - כל הקטגוריות ברמת השורש)
+def category_drilldown(key, transaction_type='expense'):
+    tree = st.session_state.category_trees[transaction_type]
+    parents = [category for category in tree.nodes if tree.children(category)]
+    if len(parents) == 0:
         return None
-    
-    # עיבוד נתונים לפני הורדה
-    df = filtered_transactions.copy()
-    df['date'] = df['date'].dt.strftime('%Y-%m-%d')  # המרת תאריך לפורמט מתאים
-    
-    # יצירת קובץ CSV
-    csv = df.to_csv(index=False, encoding='utf-8-sig')
-    
-    # קידוד ב-Base64 לשימוש בקישור להורדה
-    b64 = base64.b64encode(csv.encode()).decode()
-    
-    # יצירת קישור להורדה
-    href = f'<a href="data:file/csv;base64,{b64}" download="transactions.csv" class="download-link">הורד נתונים כקובץ CSV</a>'
-    
-    return href
+    return st.selectbox(
+        "פירוט קטגוריה",
+        [None] + parents,
+        format_func=lambda category: 'כל הקטגוריות' if category is None else tree.label(category),
+        key=key
+    )
+
+# עיצוב וקטורי של סכומים (בשקלים) עם סימן לפי סוג העסקה
+def format_signed_amounts(amounts, types):
+    signs = pd.Series(np.where(types == 'income', '+', '-'), index=amounts.index)
+    return signs + amounts.map('{:,.0f} ₪'.format)
+
+# עמוד אחד מתוך טבלת עסקאות (page מתחיל ב-1)
+def page_of(df, page, page_size=PAGE_SIZE):
+    start = (page - 1) * page_size
+    return df.iloc[start:start + page_size]
+
+# גודל ה-JSON של תרשים ומספר הנקודות בו. נשמר לכל אובייקט תרשים, כך שתרשים שמגיע
+# ממטמון החישובים לא מסודר מחדש רק לצורך המדידה
+def chart_payload(fig):
+    cache = get_memo_cache('chart_payload')
+    cached = cache.get(id(fig))
+    if cached is not None and cached[0] is fig:
+        return cached[1]
+    
+    spec = fig.to_plotly_json()
+    points = sum(len(trace.get('x', trace.get('values', ()))) for trace in spec['data'])
+    payload = {'bytes': len(fig.to_json()), 'points': points}
+    cache.put(id(fig), (fig, payload))
+    return payload
+
+# הצגת תרשים ורישום גודל הנתונים שנשלחו לדפדפן בריצה הנוכחית
+def show_chart(fig):
+    st.plotly_chart(fig, use_container_width=True)
+    chart_payloads[fig.layout.title.text or 'תרשים'] = chart_payload(fig)
+
+# כפתור הורדה של עסקאות בפורמט לבחירה (CSV, Parquet, Excel). make_chunks() מחזיר את מקטעי
+# הייצוא; הקובץ נכתב מקטע אחרי מקטע לקובץ זמני רק כשלוחצים על הכפתור
+def download_transactions(make_chunks, key):
+    col1, col2 = st.columns([1, 3])
+    with col1:
+        export_format = st.selectbox("פורמט קובץ", available_formats(), key=f"{key}_format")
+    extension, mime, _ = EXPORT_FORMATS[export_format]
+    with col2:
+        st.download_button(
+            f"📥 הורד נתונים ({export_format})",
+            data=lambda: export_file(make_chunks(), export_format),
+            file_name=f"transactions.{extension}",
+            mime=mime,
+            key=key
+        )
 
 # אתחול מצב הסשן
 init_session_state()
@@ -475,6 +778,30 @@ with st.sidebar:
     st.markdown('<h1 class="main-header">RiseUp</h1>', unsafe_allow_html=True)
     st.markdown('<p style="text-align: center;">ניהול תקציב ביתי חכם</p>', unsafe_allow_html=True)
     
+    # בחירת משק בית
+    households = list_households(DATA_DIR)
+    if st.session_state.household not in households:
+        households.append(st.session_state.household)
+    selected_household = st.selectbox(
+        'משק בית',
+        households,
+        index=households.index(st.session_state.household)
+    )
+    if selected_household != st.session_state.household:
+        switch_household(selected_household)
+    
+    with st.expander('➕ משק בית חדש'):
+        new_household = st.text_input('מפתח משק הבית (אותיות, ספרות, מקף)')
+        if st.button('צור משק בית'):
+            try:
+                switch_household(new_household)
+            except ValueError as e:
+                st.error(str(e))
+            else:
+                st.rerun()
+    
+    st.markdown('---')
+    
     # כפתורי ניווט
     if st.button('🏠 סקירה'):
         st.session_state.view = 'סקירה'
@@ -494,6 +821,15 @@ with st.sidebar:
     if st.button('📝 עסקאות'):
         st.session_state.view = 'עסקאות'
     
+    if st.button('🔮 תחזית'):
+        st.session_state.view = 'תחזית'
+    
+    if st.button('🔁 עסקאות קבועות'):
+        st.session_state.view = 'עסקאות קבועות'
+    
+    if st.button('📥 ייבוא נתונים'):
+        st.session_state.view = 'ייבוא'
+    
     st.markdown('---')
     
     # בחירת חודש
@@ -510,19 +846,22 @@ with st.sidebar:
     st.markdown('---')
     
     # טעינת נתוני דוגמה
-    if not st.session_state.show_sample_data:
+    if not current_household().sample_data_loaded():
         if st.button('טען נתוני דוגמה'):
             load_sample_data()
             st.success('נתוני דוגמה נטענו בהצלחה!')
 
+# גודל התרשימים שנשלחו לדפדפן בריצה הנוכחית (כותרת -> בתים ונקודות)
+chart_payloads = {}
+
+# רישום מופעי העסקאות הקבועות שהגיע מועדם
+st.session_state.store.post_recurring(datetime.now())
+
 # סינון עסקאות לפי החודש הנבחר
 filtered_transactions = filter_transactions_by_month(st.session_state.month_filter)
 
 # חישוב סיכומים חודשיים
-monthly_summary = calculate_monthly_summary(filtered_transactions)
-
-# חישוב השוואת תקציב מול ביצוע
-budget_comparison = calculate_budget_vs_actual(filtered_transactions)
+monthly_summary = calculate_monthly_summary(st.session_state.month_filter)
 
 # דף סקירה
 if st.session_state.view == 'סקירה':
@@ -559,23 +898,37 @@ if st.session_state.view == 'סקירה':
         st.metric("אחוז חיסכון", f"{savings_rate:.1f}%")
         st.markdown('</div>', unsafe_allow_html=True)
     
+    # התראות תקציב
+    budget_alerts_table = calculate_budget_alerts(st.session_state.month_filter, datetime.now().date())
+    if len(budget_alerts_table) > 0:
+        st.markdown('<h2 class="sub-header">התראות תקציב</h2>', unsafe_allow_html=True)
+        over_threshold = current_household().alert_thresholds()[-1]
+        for alert in budget_alerts_table.itertuples():
+            message = f"{alert.category}: {alert.spent:,.0f} ₪ מתוך {alert.budget:,.0f} ₪ ({alert.used * 100:.0f}%)"
+            if alert.level >= over_threshold:
+                st.error(f"חריגה מהתקציב - {message}")
+            elif not np.isnan(alert.level):
+                st.warning(f"מתקרב לתקציב - {message}")
+            else:
+                st.info(f"בקצב הנוכחי צפויה חריגה - {message}, תחזית לסוף החודש: {alert.projected:,.0f} ₪")
+    
     # תרשימים
     col1, col2 = st.columns(2)
     
     with col1:
         st.markdown('<div class="chart-container">', unsafe_allow_html=True)
-        expenses_chart = create_expenses_by_category_chart(filtered_transactions)
+        expenses_chart = create_expenses_by_category_chart(st.session_state.month_filter)
         if expenses_chart:
-            st.plotly_chart(expenses_chart, use_container_width=True)
+            show_chart(expenses_chart)
         else:
             st.info("אין נתונים להצגת התפלגות הוצאות")
         st.markdown('</div>', unsafe_allow_html=True)
     
     with col2:
         st.markdown('<div class="chart-container">', unsafe_allow_html=True)
-        budget_chart = create_budget_vs_actual_chart(budget_comparison)
+        budget_chart = create_budget_vs_actual_chart(st.session_state.month_filter)
         if budget_chart:
-            st.plotly_chart(budget_chart, use_container_width=True)
+            show_chart(budget_chart)
         else:
             st.info("אין נתונים להשוואת תקציב מול ביצוע")
         st.markdown('</div>', unsafe_allow_html=True)
@@ -584,7 +937,7 @@ if st.session_state.view == 'סקירה':
     st.markdown('<div class="chart-container">', unsafe_allow_html=True)
     trend_chart = create_monthly_trend_chart()
     if trend_chart:
-        st.plotly_chart(trend_chart, use_container_width=True)
+        show_chart(trend_chart)
     else:
         st.info("אין מספיק נתונים להצגת מגמות חודשיות")
     st.markdown('</div>', unsafe_allow_html=True)
@@ -594,7 +947,7 @@ if st.session_state.view == 'סקירה':
     
     if len(filtered_transactions) > 0:
         # מיון לפי תאריך, מהחדש לישן
-        recent_transactions = filtered_transactions.sort_values('date', ascending=False).head(5)
+        recent_transactions = with_shekels(filtered_transactions.sort_values('date', ascending=False).head(5))
         
         for _, transaction in recent_transactions.iterrows():
             transaction_type = "income" if transaction['type'] == 'income' else "expense"
@@ -624,24 +977,64 @@ elif st.session_state.view == 'דוחות':
     month_name = calendar.month_name[month]
     st.markdown(f'<h2 class="sub-header">{month_name} {year}</h2>', unsafe_allow_html=True)
     
+    # תקופת הדוח: החודש הנבחר, או טווח שמחושב מהסכומים המצטברים היומיים
+    date_range = None
+    report_has_transactions = len(filtered_transactions) > 0
+    month_start = datetime(year, month, 1).date()
+    month_end = datetime(year, month, calendar.monthrange(year, month)[1]).date()
+    report_period = st.radio("תקופת הדוח:", REPORT_PERIODS, horizontal=True)
+    
+    if report_period == 'טווח תאריכים':
+        selected_range = st.date_input("טווח תאריכים", value=(month_start, month_end))
+        if len(selected_range) == 2:
+            date_range = tuple(selected_range)
+    elif report_period == 'רבעון':
+        quarter = st.selectbox("רבעון", [1, 2, 3, 4], index=(month - 1) // 3, format_func=lambda q: f"רבעון {q} {year}")
+        quarter_end = 3 * quarter
+        date_range = (datetime(year, quarter_end - 2, 1).date(), datetime(year, quarter_end, calendar.monthrange(year, quarter_end)[1]).date())
+    elif report_period == 'מתחילת השנה':
+        date_range = (datetime(year, 1, 1).date(), min(month_end, datetime.now().date()))
+    elif report_period == 'חודשים אחרונים':
+        months = st.slider("מספר חודשים", min_value=2, max_value=36, value=3)
+        first_year, first_month = divmod(year * 12 + month - 1 - (months - 1), 12)
+        date_range = (datetime(first_year, first_month + 1, 1).date(), month_end)
+    
+    if date_range is not None:
+        st.markdown(f'<h3 class="sub-header">{date_range[0]:%d/%m/%Y} - {date_range[1]:%d/%m/%Y}</h3>', unsafe_allow_html=True)
+        
+        # סיכום התקופה מהסכומים המצטברים
+        period_totals = st.session_state.store.range_aggregates(*date_range)
+        report_has_transactions = len(period_totals) > 0
+        totals = period_totals.groupby('type')['total'].sum()
+        period_income = to_shekels(totals.get('income', 0))
+        period_expenses = to_shekels(totals.get('expense', 0))
+        col1, col2, col3 = st.columns(3)
+        col1.metric("הכנסות בתקופה", f"{period_income:,.0f} ₪")
+        col2.metric("הוצאות בתקופה", f"{period_expenses:,.0f} ₪")
+        col3.metric("חיסכון בתקופה", f"{period_income - period_expenses:,.0f} ₪")
+    
     # בחירת סוג דוח
     report_type = st.radio(
         "בחר סוג דוח:",
-        ["השוואת תקציב מול ביצוע", "התפלגות הוצאות", "מגמות לאורך זמן", "ניתוח הכנסות"]
+        ["השוואת תקציב מול ביצוע", "התפלגות הוצאות", "מגמות לאורך זמן", "השוואה בין תקופות", "ניתוח הכנסות"]
     )
     
     if report_type == "השוואת תקציב מול ביצוע":
         st.markdown('<h3 class="sub-header">השוואת תקציב מול ביצוע</h3>', unsafe_allow_html=True)
         
+        # פירוט לתת-קטגוריות - מהגלגול שכבר חושב, בלי לחשב מחדש מהעסקאות
+        budget_parent = category_drilldown('budget_drilldown')
+        budget_comparison_report = calculate_budget_vs_actual(st.session_state.month_filter, date_range, budget_parent)
+        
         # תרשים השוואת תקציב
-        budget_chart = create_budget_vs_actual_chart(budget_comparison)
+        budget_chart = create_budget_vs_actual_chart(st.session_state.month_filter, date_range, budget_parent)
         if budget_chart:
-            st.plotly_chart(budget_chart, use_container_width=True)
+            show_chart(budget_chart)
         
         # טבלת השוואה
-        if len(budget_comparison) > 0:
+        if len(budget_comparison_report) > 0:
             # הוספת עמודת אחוז ניצול תקציב
-            styled_comparison = budget_comparison.copy()
+            styled_comparison = budget_comparison_report.copy()
             
             # הגדרת סגנון לטבלה עם צבעים
             def color_budget_status(val):
@@ -674,7 +1067,7 @@ elif st.session_state.view == 'דוחות':
             st.markdown('<h4>המלצות חיסכון</h4>', unsafe_allow_html=True)
             
             # איתור קטגוריות שחרגו מהתקציב
-            overspent = budget_comparison[budget_comparison['diff'] < 0].sort_values('diff')
+            overspent = budget_comparison_report[budget_comparison_report['diff'] < 0].sort_values('diff')
             if len(overspent) > 0:
                 st.warning(f"חרגת מהתקציב ב-{len(overspent)} קטגוריות:")
                 for idx, row in overspent.iterrows():
@@ -687,15 +1080,18 @@ elif st.session_state.view == 'דוחות':
     elif report_type == "התפלגות הוצאות":
         st.markdown('<h3 class="sub-header">התפלגות הוצאות לפי קטגוריה</h3>', unsafe_allow_html=True)
         
+        # פירוט לתת-קטגוריות
+        expenses_parent = category_drilldown('expenses_drilldown')
+        
         # תרשים עוגה של הוצאות
-        expenses_chart = create_expenses_by_category_chart(filtered_transactions)
+        expenses_chart = create_expenses_by_category_chart(st.session_state.month_filter, date_range, expenses_parent)
         if expenses_chart:
-            st.plotly_chart(expenses_chart, use_container_width=True)
+            show_chart(expenses_chart)
             
             # טבלת פירוט הוצאות
-            expenses = filtered_transactions[filtered_transactions['type'] == 'expense']
+            expenses = calculate_expenses_by_category(st.session_state.month_filter, date_range, expenses_parent)
             if len(expenses) > 0:
-                expenses_by_category = expenses.groupby('category')['amount'].agg(['sum', 'count']).reset_index()
+                expenses_by_category = expenses[['category', 'total', 'count']].copy()
                 expenses_by_category.columns = ['קטגוריה', 'סכום כולל', 'מספר עסקאות']
                 expenses_by_category['אחוז מסך ההוצאות'] = expenses_by_category['סכום כולל'] / expenses_by_category['סכום כולל'].sum() * 100
                 
@@ -722,38 +1118,21 @@ elif st.session_state.view == 'דוחות':
     elif report_type == "מגמות לאורך זמן":
         st.markdown('<h3 class="sub-header">מגמות לאורך זמן</h3>', unsafe_allow_html=True)
         
-        # תרשים מגמות
-        trend_chart = create_monthly_trend_chart()
+        # תרשים מגמות ברזולוציה חודשית, שבועית או יומית
+        resolution = st.radio("רזולוציה:", list(TREND_RESOLUTIONS), horizontal=True)
+        if TREND_RESOLUTIONS[resolution] is None:
+            trend_chart = create_monthly_trend_chart()
+        else:
+            trend_chart = create_period_trend_chart(TREND_RESOLUTIONS[resolution])
         if trend_chart:
-            st.plotly_chart(trend_chart, use_container_width=True)
+            show_chart(trend_chart)
             
             # ניתוח מגמות
-            transactions = st.session_state.transactions
+            aggregates = st.session_state.store.aggregates()
             
-            if len(transactions) > 0:
-                # הוספת עמודות שנה וחודש
-                transactions['year_month'] = transactions['date'].dt.strftime('%Y-%m')
-                
-                # סיכום לפי חודש וסוג עסקה
-                monthly_summary = []
-                for ym in sorted(transactions['year_month'].unique()):
-                    year, month = map(int, ym.split('-'))
-                    month_trans = transactions[transactions['year_month'] == ym]
-                    
-                    income = month_trans[month_trans['type'] == 'income']['amount'].sum()
-                    expenses = month_trans[month_trans['type'] == 'expense']['amount'].sum()
-                    savings = income - expenses
-                    savings_rate = (savings / income * 100) if income > 0 else 0
-                    
-                    monthly_summary.append({
-                        'year_month': ym,
-                        'income': income,
-                        'expenses': expenses,
-                        'savings': savings,
-                        'savings_rate': savings_rate
-                    })
-                
-                summary_df = pd.DataFrame(monthly_summary)
+            if len(aggregates) > 0:
+                # סיכום חודשי של כל החודשים בחישוב וקטורי אחד
+                summary_df = monthly_trends(aggregates)
                 
                 if len(summary_df) > 1:
                     # מדדי שינוי בהשוואה לחודש קודם
@@ -794,16 +1173,52 @@ elif st.session_state.view == 'דוחות':
         else:
             st.info("אין מספיק נתונים להצגת מגמות לאורך זמן")
     
+    elif report_type == "השוואה בין תקופות":
+        st.markdown('<h3 class="sub-header">השוואה בין תקופות</h3>', unsafe_allow_html=True)
+        
+        col1, col2 = st.columns(2)
+        with col1:
+            comparison = st.selectbox("השוואה", COMPARISONS, format_func=lambda c: COMPARISON_LABELS[c])
+        with col2:
+            comparison_type = st.radio("סוג", ['expense', 'income'], format_func=lambda t: 'הוצאות' if t == 'expense' else 'הכנסות', horizontal=True)
+        
+        # מפת חום לכל הקטגוריות, והפירוט של החודש הנבחר
+        heatmap = create_comparison_heatmap(comparison, st.session_state.month_filter, comparison_type)
+        if heatmap:
+            show_chart(heatmap)
+        
+        comparison_table = calculate_comparison_table(comparison, st.session_state.month_filter, comparison_type)
+        if comparison_table is not None and len(comparison_table) > 0 and comparison_table['base'].notna().any():
+            st.markdown(f"<h4>{month_name} {year} {COMPARISON_LABELS[comparison]}</h4>", unsafe_allow_html=True)
+            comparison_table = comparison_table.set_axis(['קטגוריה', 'נוכחי', 'בסיס להשוואה', 'הפרש', 'שינוי %'], axis=1)
+            st.dataframe(
+                comparison_table
+                .style
+                .format({
+                    'נוכחי': '{:,.0f} ₪',
+                    'בסיס להשוואה': '{:,.0f} ₪',
+                    'הפרש': '{:+,.0f} ₪',
+                    'שינוי %': '{:+.1f}%'
+                }, na_rep='-'),
+                hide_index=True
+            )
+        else:
+            st.info("אין מספיק היסטוריה להשוואה בחודש זה")
+    
     elif report_type == "ניתוח הכנסות":
         st.markdown('<h3 class="sub-header">ניתוח הכנסות</h3>', unsafe_allow_html=True)
         
-        # סינון רק הכנסות
-        incomes = filtered_transactions[filtered_transactions['type'] == 'income']
+        # סינון רק הכנסות (פירוט העסקאות נטען רק לדוח הזה)
+        if date_range is None:
+            incomes = with_shekels(filtered_transactions[filtered_transactions['type'] == 'income'])
+        else:
+            incomes = with_shekels(st.session_state.store.query_range(*date_range, type='income'))
         
         if len(incomes) > 0:
             # תרשים התפלגות הכנסות
-            income_by_category = incomes.groupby('category')['amount'].sum().reset_index()
+            income_by_category = incomes.groupby('category', observed=True)['amount'].sum().reset_index()
             
+            import plotly.express as px
             fig = px.pie(
                 income_by_category, 
                 values='amount', 
@@ -813,7 +1228,7 @@ elif st.session_state.view == 'דוחות':
             )
             fig.update_traces(textposition='inside', textinfo='percent+label')
             
-            st.plotly_chart(fig, use_container_width=True)
+            show_chart(fig)
             
             # טבלת פירוט הכנסות
             income_df = incomes[['date', 'amount', 'category', 'description']]
@@ -843,9 +1258,15 @@ elif st.session_state.view == 'דוחות':
     
     # קישור להורדת נתונים
     st.markdown('---')
-    if len(filtered_transactions) > 0:
-        download_href = download_csv(filtered_transactions)
-        st.markdown(download_href, unsafe_allow_html=True)
+    if report_has_transactions:
+        # ייצוא ישיר מהמאגר, חודש אחרי חודש, לטווח הדוח
+        store = st.session_state.store
+        if date_range is not None:
+            export_start, export_end = date_range
+        else:
+            export_start = datetime(year, month, 1).date()
+            export_end = datetime(year, month, calendar.monthrange(year, month)[1]).date()
+        download_transactions(lambda: store_chunks(store, export_start, export_end), key='report_download')
 
 # דף הכנסה חדשה
 elif st.session_state.view == 'הכנסה חדשה':
@@ -874,17 +1295,16 @@ elif st.session_state.view == 'הכנסה חדשה':
                 st.error("יש למלא תיאור")
             else:
                 # הוספת עסקה חדשה
-                new_transaction = pd.DataFrame({
-                    'id': [generate_id()],
-                    'date': [datetime.combine(date, datetime.min.time())],
-                    'amount': [amount],
-                    'category': [category],
-                    'description': [description],
-                    'type': ['income']
-                })
+                new_transaction = {
+                    'date': datetime.combine(date, datetime.min.time()),
+                    'amount': amount,
+                    'category': category,
+                    'description': description,
+                    'type': 'income'
+                }
                 
-                # הוספה לטבלת העסקאות
-                st.session_state.transactions = pd.concat([st.session_state.transactions, new_transaction], ignore_index=True)
+                # הוספה למאגר העסקאות
+                st.session_state.store.add([new_transaction])
                 
                 st.success(f"ההכנסה נוספה בהצלחה! סכום: {amount:,.0f} ₪")
                 st.balloons()
@@ -901,7 +1321,7 @@ elif st.session_state.view == 'הוצאה חדשה':
         amount = st.number_input("סכום (₪)", min_value=0.0, step=50.0)
         
         # קטגוריה
-        category = st.selectbox("קטגוריה", st.session_state.categories['expense'])
+        category = st.selectbox("קטגוריה", st.session_state.categories['expense'], format_func=st.session_state.category_trees['expense'].label)
         
         # תיאור
         description = st.text_input("תיאור", placeholder="למשל: קניות במרכול")
@@ -916,34 +1336,39 @@ elif st.session_state.view == 'הוצאה חדשה':
                 st.error("יש למלא תיאור")
             else:
                 # הוספת עסקה חדשה
-                new_transaction = pd.DataFrame({
-                    'id': [generate_id()],
-                    'date': [datetime.combine(date, datetime.min.time())],
-                    'amount': [amount],
-                    'category': [category],
-                    'description': [description],
-                    'type': ['expense']
-                })
-                
-                # הוספה לטבלת העסקאות
-                st.session_state.transactions = pd.concat([st.session_state.transactions, new_transaction], ignore_index=True)
+                new_transaction = {
+                    'date': datetime.combine(date, datetime.min.time()),
+                    'amount': amount,
+                    'category': category,
+                    'description': description,
+                    'type': 'expense'
+                }
                 
-                # בדיקת חריגה מתקציב
-                budget = st.session_state.budgets.get(category, 0)
+                # הוספה למאגר העסקאות
+                st.session_state.store.add([new_transaction])
                 
-                # סינון הוצאות מאותה קטגוריה בחודש הנוכחי
-                year, month = date.year, date.month
-                month_str = f"{year}-{month:02d}"
-                month_transactions = filter_transactions_by_month(month_str)
-                month_expenses = month_transactions[
-                    (month_transactions['type'] == 'expense') & 
-                    (month_transactions['category'] == category)
-                ]
+                # בדיקת חריגה מתקציב בקטגוריה ובקטגוריות האב שלה: ההוצאה המצטברת בחודש היא סכום
+                # המונים בטבלת הסיכומים של הקטגוריה ותת-הקטגוריות, כך שאין צורך לסרוק את עסקאות החודש
+                tree = st.session_state.category_trees['expense']
+                budgets = tree.effective_budgets(st.session_state.budgets)
+                thresholds = current_household().alert_thresholds()
+                month_str = f"{date.year}-{date.month:02d}"
                 
-                total_spent = month_expenses['amount'].sum()
-                
-                if budget > 0 and total_spent > budget:
-                    st.warning(f"שים לב! חרגת מהתקציב בקטגוריה {category}. תקציב: {budget:,.0f} ₪, הוצאה מצטברת: {total_spent:,.0f} ₪")
+                for checked in [category] + tree.ancestors(category):
+                    budget = budgets[checked]
+                    total_spent = to_shekels(sum(st.session_state.store.category_total(month_str, node) for node in tree.subtree(checked)))
+                    
+                    level = crossed_threshold(total_spent, budget, thresholds)
+                    if level is not None:
+                        if level >= thresholds[-1]:
+                            st.error(f"שים לב! חרגת מהתקציב בקטגוריה {checked}. תקציב: {budget:,.0f} ₪, הוצאה מצטברת: {total_spent:,.0f} ₪")
+                        else:
+                            st.warning(f"ניצלת {total_spent / budget * 100:.0f}% מהתקציב בקטגוריה {checked}. תקציב: {budget:,.0f} ₪, הוצאה מצטברת: {total_spent:,.0f} ₪")
+                    
+                    # תחזית לסוף החודש בקצב ההוצאה הנוכחי (לחודש הנוכחי בלבד)
+                    projected = projected_spend(total_spent, elapsed_fraction(date.year, date.month))
+                    if budget > 0 and total_spent < budget < projected and (date.year, date.month) == (datetime.now().year, datetime.now().month):
+                        st.info(f"בקצב הנוכחי ההוצאה בקטגוריה {checked} צפויה להגיע ל-{projected:,.0f} ₪ עד סוף החודש - חריגה של {projected - budget:,.0f} ₪")
                 
                 st.success(f"ההוצאה נוספה בהצלחה! סכום: {amount:,.0f} ₪")
 
@@ -958,31 +1383,48 @@ elif st.session_state.view == 'הגדרות תקציב':
     
     # יצירת מסגרת לעדכון תקציב
     with st.form("budget_form"):
-        # יצירת שדות עבור כל קטגוריית הוצאה
+        # יצירת שדות עבור כל קטגוריית הוצאה, בכל רמות העץ
         budget_values = {}
+        tree = st.session_state.category_trees['expense']
+        st.caption("קטגוריה עם תת-קטגוריות שהתקציב שלה 0 מקבלת את סכום התקציבים של תת-הקטגוריות")
         
         for category in st.session_state.categories['expense']:
             current_budget = st.session_state.budgets.get(category, 0)
             budget_values[category] = st.number_input(
-                f"תקציב עבור {category} (₪)",
+                f"תקציב עבור {tree.label(category)} (₪)",
                 min_value=0.0,
                 value=float(current_budget),
                 step=100.0
             )
         
+        # ספי התראות התקציב
+        warning_threshold, over_threshold = current_household().alert_thresholds()
+        col1, col2 = st.columns(2)
+        with col1:
+            warning_percent = st.number_input("התראת אזהרה ב-% מהתקציב", min_value=1, max_value=500, value=int(round(warning_threshold * 100)), step=5)
+        with col2:
+            over_percent = st.number_input("התראת חריגה ב-% מהתקציב", min_value=1, max_value=500, value=int(round(over_threshold * 100)), step=5)
+        
         # כפתור שמירה
         submitted = st.form_submit_button("שמור תקציב")
         
         if submitted:
-            # עדכון התקציבים
-            st.session_state.budgets = budget_values
-            st.success("התקציב עודכן בהצלחה!")
+            if warning_percent >= over_percent:
+                st.error("סף האזהרה חייב להיות נמוך מסף החריגה")
+            else:
+                # עדכון התקציבים
+                update_budgets(budget_values)
+                if (warning_percent / 100, over_percent / 100) != current_household().alert_thresholds():
+                    current_household().update_alert_thresholds((warning_percent / 100, over_percent / 100))
+                st.success("התקציב עודכן בהצלחה!")
     
     # הצגת תרשים התפלגות תקציב
     st.markdown('<h3 class="sub-header">התפלגות התקציב</h3>', unsafe_allow_html=True)
     
-    # סינון קטגוריות עם תקציב
-    budget_data = {k: v for k, v in st.session_state.budgets.items() if v > 0}
+    # סינון קטגוריות עם תקציב - ברמת השורש, עם התקציבים המגולגלים של תת-הקטגוריות
+    tree = st.session_state.category_trees['expense']
+    effective_budgets = tree.effective_budgets(st.session_state.budgets)[tree.children()]
+    budget_data = effective_budgets[effective_budgets > 0].to_dict()
     
     if len(budget_data) > 0:
         budget_df = pd.DataFrame({
@@ -991,6 +1433,7 @@ elif st.session_state.view == 'הגדרות תקציב':
         })
         
         # יצירת תרשים עוגה
+        import plotly.express as px
         fig = px.pie(
             budget_df, 
             values='amount', 
@@ -1000,7 +1443,7 @@ elif st.session_state.view == 'הגדרות תקציב':
         )
         fig.update_traces(textposition='inside', textinfo='percent+label')
         
-        st.plotly_chart(fig, use_container_width=True)
+        show_chart(fig)
         
         # סך כל התקציב
         total_budget = sum(budget_data.values())
@@ -1017,82 +1460,431 @@ elif st.session_state.view == 'עסקאות':
     month_name = calendar.month_name[month]
     st.markdown(f'<h2 class="sub-header">עסקאות לחודש {month_name} {year}</h2>', unsafe_allow_html=True)
     
-    if len(filtered_transactions) > 0:
+    if len(st.session_state.store) > 0:
         # בחירת סוג עסקאות להצגה
         transaction_type = st.radio(
             "סוג עסקאות:",
             ["הכל", "הכנסות", "הוצאות"],
             horizontal=True
         )
+        selected_type = {'הכנסות': 'income', 'הוצאות': 'expense'}.get(transaction_type)
+        
+        # חיפוש באינדקס המילים של התיאורים והקטגוריות
+        search = st.text_input("חיפוש עסקאות", placeholder="תיאור או קטגוריה")
+        
+        # מסננים משולבים: טווח תאריכים, טווח סכומים וקטגוריות
+        with st.expander("סינון מתקדם"):
+            month_start = datetime(year, month, 1).date()
+            month_end = datetime(year, month, calendar.monthrange(year, month)[1]).date()
+            search_all = st.checkbox("כל התקופות")
+            selected_range = st.date_input("טווח תאריכים", value=(month_start, month_end), disabled=search_all)
+            
+            col1, col2 = st.columns(2)
+            with col1:
+                min_amount = st.number_input("סכום מינימלי (₪)", min_value=0.0, step=50.0)
+            with col2:
+                max_amount = st.number_input("סכום מקסימלי (₪)", min_value=0.0, step=50.0, help="0 - ללא הגבלה")
+            
+            if selected_type is None:
+                category_options = st.session_state.categories['income'] + st.session_state.categories['expense']
+            else:
+                category_options = st.session_state.categories[selected_type]
+            selected_categories = st.multiselect("קטגוריות", category_options)
         
-        # סינון לפי סוג
-        if transaction_type == "הכנסות":
-            display_transactions = filtered_transactions[filtered_transactions['type'] == 'income']
-        elif transaction_type == "הוצאות":
-            display_transactions = filtered_transactions[filtered_transactions['type'] == 'expense']
+        # ללא טווח שלם - החודש הנבחר
+        if search_all:
+            start, end = None, None
+        elif len(selected_range) == 2:
+            start, end = selected_range
         else:
-            display_transactions = filtered_transactions
+            start, end = month_start, month_end
+        
+        display_transactions = st.session_state.store.search(
+            search,
+            start=start,
+            end=end,
+            categories=selected_categories,
+            type=selected_type,
+            min_amount=min_amount if min_amount > 0 else None,
+            max_amount=max_amount if max_amount > 0 else None
+        )
+        
+        if len(display_transactions) == 0:
+            st.info("לא נמצאו עסקאות מתאימות")
+        else:
+            # המחיצה ממוינת לפי תאריך - היפוך במקום מיון, מהחדש לישן
+            display_transactions = display_transactions.iloc[::-1]
+            
+            # עימוד בצד השרת: רק העמוד הנוכחי מעובד ונשלח לדפדפן
+            total_pages = max(1, -(-len(display_transactions) // PAGE_SIZE))
+            if st.session_state.get('transactions_page', 1) > total_pages:
+                st.session_state.transactions_page = total_pages
+            page = st.number_input(f"עמוד (מתוך {total_pages})", min_value=1, max_value=total_pages, step=1, key='transactions_page')
+            page_transactions = with_shekels(page_of(display_transactions, page))
+            st.caption(f"{len(display_transactions):,} עסקאות")
+            
+            # יצירת טבלה להצגה - עיצוב וקטורי של העמוד בלבד
+            display_df = pd.DataFrame({
+                'date': page_transactions['date'].dt.strftime('%d/%m/%Y'),
+                'formatted_amount': format_signed_amounts(page_transactions['amount'], page_transactions['type']),
+                'category': page_transactions['category'],
+                'description': page_transactions['description'],
+                'type_hebrew': np.where(page_transactions['type'] == 'income', 'הכנסה', 'הוצאה')
+            })
+            
+            # עיצוב הטבלה
+            st.dataframe(
+                display_df
+                .style
+                .apply(lambda column: np.where(column == 'הכנסה', 'color: #2E7D32', 'color: #C62828'), subset=['type_hebrew'])
+                .set_properties(**{'text-align': 'center'})
+                .set_table_styles([
+                    {'selector': 'th', 'props': [('text-align', 'center'), ('font-weight', 'bold')]},
+                ]),
+                height=400
+            )
+            
+            # קישור להורדת נתונים
+            download_transactions(lambda: frame_chunks(display_transactions), key='transactions_download')
+            
+            # אפשרות למחיקת עסקאות
+            with st.expander("מחיקת עסקאות"):
+                st.warning("שים לב! מחיקת עסקאות היא פעולה בלתי הפיכה")
+            
+                # בחירת עסקאות למחיקה מתוך העמוד המוצג בלבד (תיבת הבחירה תומכת בחיפוש)
+                option_texts = dict(zip(
+                    page_transactions['id'],
+                    display_df['date'] + ' | ' + display_df['formatted_amount'] + ' | ' + display_df['description']
+                ))
+            
+                selected_ids = st.multiselect("בחר עסקאות למחיקה:", list(option_texts), format_func=lambda i: option_texts[i])
+                delete_all = st.checkbox(f"מחק את כל העסקאות המסוננות ({len(display_transactions):,})")
+            
+                if st.button("מחק עסקאות"):
+                    # מחיקה כפעולה אחת מול המאגר
+                    ids = display_transactions['id'].to_numpy() if delete_all else selected_ids
+                    if len(ids) == 0:
+                        st.error("לא נבחרו עסקאות למחיקה")
+                    else:
+                        deleted = st.session_state.store.delete(ids)
+                        st.success(f"נמחקו {deleted:,} עסקאות בהצלחה!")
+                        st.rerun()
+            
+            # עריכת העסקאות שבעמוד הנוכחי
+            with st.expander("עריכת עסקאות"):
+                edit_df = page_transactions[['id', 'date', 'amount', 'category', 'description', 'type']].reset_index(drop=True)
+                edit_df[['category', 'type']] = edit_df[['category', 'type']].astype(str)
+                all_categories = st.session_state.categories['income'] + st.session_state.categories['expense']
+            
+                edited_df = st.data_editor(
+                    edit_df,
+                    column_config={
+                        'id': None,
+                        'date': st.column_config.DateColumn("תאריך", format="DD/MM/YYYY", required=True),
+                        'amount': st.column_config.NumberColumn("סכום (₪)", min_value=0.01, step=1.0, required=True),
+                        'category': st.column_config.SelectboxColumn("קטגוריה", options=all_categories, required=True),
+                        'description': st.column_config.TextColumn("תיאור", required=True),
+                        'type': st.column_config.TextColumn("סוג", disabled=True)
+                    },
+                    hide_index=True,
+                    key=f"edit_transactions_{page}"
+                )
+            
+                if st.button("שמור שינויים"):
+                    # השוואה וקטורית מול העמוד המקורי - רק שורות ששונו נשלחות למאגר
+                    edited_df['date'] = pd.to_datetime(edited_df['date'])
+                    changed = (edited_df[EDITABLE_COLUMNS] != edit_df[EDITABLE_COLUMNS]).any(axis=1)
+                
+                    # קטגוריה חייבת להתאים לסוג העסקה
+                    income_rows = edited_df['type'] == 'income'
+                    valid = np.where(
+                        income_rows,
+                        edited_df['category'].isin(st.session_state.categories['income']),
+                        edited_df['category'].isin(st.session_state.categories['expense'])
+                    )
+                
+                    if not changed.any():
+                        st.info("לא בוצעו שינויים")
+                    elif not valid[changed.to_numpy()].all():
+                        st.error("יש לבחור קטגוריה שמתאימה לסוג העסקה")
+                    else:
+                        try:
+                            updated = st.session_state.store.update(
+                                edited_df.loc[changed, ['id'] + EDITABLE_COLUMNS].to_dict('records')
+                            )
+                        except ValueError as e:
+                            st.error(str(e))
+                        else:
+                            st.success(f"עודכנו {updated:,} עסקאות בהצלחה!")
+                            st.rerun()
+    else:
+        st.info("אין עסקאות להצגה")
+
+# דף תחזית
+elif st.session_state.view == 'תחזית':
+    st.markdown('<h1 class="main-header">תחזית תזרים</h1>', unsafe_allow_html=True)
+    
+    now = datetime.now()
+    end_period = period_of(now.year, now.month)
+    
+    col1, col2 = st.columns(2)
+    with col1:
+        forecast_model = st.radio("מודל:", list(FORECAST_MODELS), format_func=lambda model: FORECAST_MODELS[model])
+    with col2:
+        horizon = st.slider("חודשים קדימה", min_value=1, max_value=24, value=12)
+    
+    by_category, history, projected = calculate_forecast(forecast_model, horizon, end_period)
+    
+    if len(history) == 0:
+        st.info("אין מספיק נתונים לתחזית - נדרש לפחות חודש מלא אחד של עסקאות")
+    else:
+        st.caption(f"המודל מותאם על {len(history)} חודשים מלאים (עד החודש הקודם); החודש הנוכחי הוא הראשון בתחזית")
         
-        # מיון לפי תאריך
-        display_transactions = display_transactions.sort_values('date', ascending=False)
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            st.metric("הכנסות צפויות", f"{projected['income'].sum():,.0f} ₪")
+        with col2:
+            st.metric("הוצאות צפויות", f"{projected['expense'].sum():,.0f} ₪")
+        with col3:
+            st.metric("חיסכון צפוי", f"{projected['savings'].sum():,.0f} ₪")
         
-        # יצירת טבלה להצגה
-        display_df = display_transactions[['date', 'amount', 'category', 'description', 'type']].copy()
+        show_chart(create_forecast_chart(forecast_model, horizon, end_period))
         
-        # הוספת עמודה לפורמט מספרי
-        display_df['formatted_amount'] = display_df.apply(
-            lambda row: f"+{row['amount']:,.0f} ₪" if row['type'] == 'income' else f"-{row['amount']:,.0f} ₪",
-            axis=1
+        # תחזית לפי קטגוריה מול ממוצע 12 החודשים האחרונים
+        st.markdown('<h3 class="sub-header">תחזית לפי קטגוריה</h3>', unsafe_allow_html=True)
+        category_history = fit_forecast(forecast_model, end_period)[2][:, -12:]
+        category_df = pd.DataFrame({
+            'סוג': np.where(by_category.index.get_level_values('type') == 'income', 'הכנסה', 'הוצאה'),
+            'קטגוריה': by_category.index.get_level_values('category'),
+            'ממוצע חודשי בשנה האחרונה': to_shekels(category_history.mean(axis=1)),
+            'ממוצע חודשי צפוי': by_category.mean(axis=1).to_numpy(),
+            'סה"כ צפוי': by_category.sum(axis=1).to_numpy()
+        }).sort_values('סה"כ צפוי', ascending=False)
+        st.dataframe(
+            category_df.style.format({
+                'ממוצע חודשי בשנה האחרונה': '{:,.0f} ₪',
+                'ממוצע חודשי צפוי': '{:,.0f} ₪',
+                'סה"כ צפוי': '{:,.0f} ₪'
+            }),
+            use_container_width=True,
+            hide_index=True
         )
+
+# דף עסקאות קבועות
+elif st.session_state.view == 'עסקאות קבועות':
+    st.markdown('<h1 class="main-header">עסקאות קבועות</h1>', unsafe_allow_html=True)
+    
+    st.markdown("""
+    משכורת, שכר דירה וחשבונות נרשמים אוטומטית לפי כללים. רק הכללים נשמרים - 
+    מופע שהגיע מועדו נרשם כעסקה, ומופעים עתידיים מחושבים רק לתחזית.
+    """)
+    
+    # סוג הכלל מחוץ לטופס, כדי שרשימת הקטגוריות תתעדכן לפיו
+    rule_type = st.radio("סוג:", ["הוצאה", "הכנסה"], horizontal=True)
+    rule_type = 'income' if rule_type == 'הכנסה' else 'expense'
+    
+    with st.form("recurring_form"):
+        col1, col2 = st.columns(2)
+        with col1:
+            description = st.text_input("תיאור", placeholder="למשל: שכר דירה")
+            amount = st.number_input("סכום (₪)", min_value=0.0, step=50.0)
+            category = st.selectbox("קטגוריה", st.session_state.categories[rule_type])
+        with col2:
+            frequency = st.selectbox("תדירות", list(FREQUENCY_LABELS), format_func=FREQUENCY_LABELS.get)
+            interval = st.number_input("מרווח (כל כמה חודשים / שבועות / ימים)", min_value=1, value=1, step=1)
+            start_date = st.date_input("תאריך התחלה", value=datetime.now())
+            has_end = st.checkbox("עם תאריך סיום")
+            end_date = st.date_input("תאריך סיום", value=datetime.now() + timedelta(days=365))
         
-        # הוספת עמודה לסוג בעברית
-        display_df['type_hebrew'] = display_df['type'].map({'income': 'הכנסה', 'expense': 'הוצאה'})
+        submitted = st.form_submit_button("הוסף כלל")
+        
+        if submitted:
+            if amount <= 0:
+                st.error("הסכום חייב להיות גדול מאפס")
+            elif not description:
+                st.error("יש למלא תיאור")
+            else:
+                try:
+                    st.session_state.store.add_rule({
+                        'description': description,
+                        'amount': amount,
+                        'category': category,
+                        'type': rule_type,
+                        'frequency': frequency,
+                        'interval': int(interval),
+                        'start_date': start_date,
+                        'end_date': end_date if has_end else None
+                    })
+                except ValueError as e:
+                    st.error(str(e))
+                else:
+                    posted = st.session_state.store.post_recurring(datetime.now())
+                    st.success(f"הכלל נוסף בהצלחה! נרשמו {posted:,} עסקאות שמועדן כבר הגיע")
+    
+    rules = st.session_state.store.rules()
+    
+    if len(rules) == 0:
+        st.info("לא הוגדרו עסקאות קבועות")
+    else:
+        st.markdown('<h3 class="sub-header">כללים</h3>', unsafe_allow_html=True)
+        
+        rules_df = pd.DataFrame({
+            'תיאור': rules['description'],
+            'סוג': np.where(rules['type'] == 'income', 'הכנסה', 'הוצאה'),
+            'קטגוריה': rules['category'],
+            'סכום': to_shekels(rules['amount']).map('{:,.0f} ₪'.format),
+            'תדירות': [
+                FREQUENCY_LABELS[frequency] if interval == 1 else f"כל {interval} {FREQUENCY_UNITS[frequency]}"
+                for frequency, interval in zip(rules['frequency'], rules['interval'])
+            ],
+            'התחלה': rules['start_date'].dt.strftime('%d/%m/%Y'),
+            'סיום': rules['end_date'].dt.strftime('%d/%m/%Y').fillna('-'),
+            'המופע הבא': next_occurrences(rules, pd.Timestamp.now().normalize() + pd.Timedelta(days=1)).dt.strftime('%d/%m/%Y').fillna('הסתיים')
+        })
+        st.dataframe(rules_df, use_container_width=True, hide_index=True)
+        
+        with st.expander("מחיקת כללים"):
+            rule_labels = dict(zip(rules['id'].tolist(), rules['description']))
+            rules_to_delete = st.multiselect(
+                "בחר כללים למחיקה (עסקאות שכבר נרשמו נשארות):",
+                list(rule_labels),
+                format_func=lambda i: rule_labels[i]
+            )
+            if rules_to_delete and st.button("מחק כללים"):
+                deleted = st.session_state.store.delete_rules(rules_to_delete)
+                st.success(f"נמחקו {deleted:,} כללים")
+                st.rerun()
+        
+        # תחזית: פריסת הכללים לחלון המבוקש בלבד
+        st.markdown('<h3 class="sub-header">תחזית עסקאות קבועות</h3>', unsafe_allow_html=True)
+        months = st.slider("חודשים קדימה", min_value=1, max_value=60, value=12)
+        occurrences, projection = calculate_recurring_projection(months, datetime.now().date())
+        
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            st.metric("הכנסות צפויות", f"{projection['income'].sum():,.0f} ₪")
+        with col2:
+            st.metric("הוצאות צפויות", f"{projection['expense'].sum():,.0f} ₪")
+        with col3:
+            st.metric("מופעים", f"{len(occurrences):,}")
         
-        # עיצוב הטבלה
         st.dataframe(
-            display_df[['date', 'formatted_amount', 'category', 'description', 'type_hebrew']]
-            .style
-            .format({'date': lambda x: x.strftime('%d/%m/%Y')})
-            .applymap(lambda x: 'color: #2E7D32' if 'הכנסה' in str(x) else 'color: #C62828', subset=['type_hebrew'])
-            .set_properties(**{'text-align': 'center'})
-            .set_table_styles([
-                {'selector': 'th', 'props': [('text-align', 'center'), ('font-weight', 'bold')]},
-            ]),
-            height=400
+            projection.rename(columns={'month': 'חודש', 'income': 'הכנסות', 'expense': 'הוצאות', 'net': 'נטו'})
+            .style.format({'הכנסות': '{:,.0f} ₪', 'הוצאות': '{:,.0f} ₪', 'נטו': '{:,.0f} ₪'}),
+            use_container_width=True,
+            hide_index=True
         )
+
+# דף ייבוא נתונים
+elif st.session_state.view == 'ייבוא':
+    st.markdown('<h1 class="main-header">ייבוא עסקאות מקובץ</h1>', unsafe_allow_html=True)
+    
+    st.markdown("""
+    ניתן לייבא קובץ CSV שיוצא מהאפליקציה או מהבנק. נדרשות לפחות עמודות תאריך וסכום.
+    עסקאות שכבר קיימות (אותו תאריך, סכום, תיאור וסוג) לא ייובאו שוב.
+    סכום חיוב של כרטיס אשראי נרשם כהוצאה, ועמודות חובה וזכות כהוצאה וכהכנסה.
+    """)
+    
+    uploaded_file = st.file_uploader("בחר קובץ CSV", type=['csv'])
+    # מוסכמת הסימן של עמודת סכום כללית, כשאין בקובץ עמודת סוג
+    positive_types = {'הכנסות (הוצאות במינוס)': 'income', 'הוצאות (זיכויים במינוס)': 'expense'}
+    positive_type = positive_types[st.radio(
+        "סכומים חיוביים בעמודת הסכום הם:", list(positive_types), horizontal=True,
+        help="רלוונטי רק לקובץ עם עמודת סכום כללית וללא עמודת סוג"
+    )]
+    
+    if uploaded_file is not None and st.button("ייבא עסקאות"):
+        try:
+            with st.spinner("מייבא עסקאות..."):
+                stats = import_csv(
+                    st.session_state.store, uploaded_file, st.session_state.categories, positive_type=positive_type
+                )
+        except ValueError as e:
+            st.error(f"שגיאה בייבוא הקובץ: {e}")
+        else:
+            st.success(f"יובאו {stats['imported']:,} עסקאות מתוך {stats['rows_read']:,} שורות")
+            st.markdown(f"""
+            * **כפילויות שדולגו:** {stats['duplicates']:,}
+            * **שורות לא תקינות:** {stats['invalid']:,}
+            * **סווגו לפי כללים:** {stats['categorized']:,}
+            * **זמן ייבוא:** {stats['seconds']:.2f} שניות ({stats['rows_per_second']:,.0f} שורות לשנייה)
+            """)
+    
+    # כללי סיווג: עסקאות ללא קטגוריה מוכרת מסווגות לפי התיאור
+    st.markdown('<h3 class="sub-header">כללי סיווג אוטומטי</h3>', unsafe_allow_html=True)
+    st.caption("שורות בקובץ ללא קטגוריה מוכרת מסווגות לפי הכלל הראשון שמתאים לתיאור. ללא התאמה - 'אחר'.")
+    
+    with st.form("category_rule_form"):
+        col1, col2 = st.columns(2)
+        with col1:
+            rule_kind = st.selectbox("סוג כלל", list(RULE_KIND_LABELS), format_func=lambda kind: RULE_KIND_LABELS[kind])
+            rule_text = st.text_input("טקסט לחיפוש בתיאור", placeholder="למשל: שופרסל, shufersal")
+        with col2:
+            rule_types = {'הכל': None, 'הוצאות': 'expense', 'הכנסות': 'income'}
+            rule_type = rule_types[st.selectbox("חל על", list(rule_types))]
+            all_categories = list(dict.fromkeys(st.session_state.categories['expense'] + st.session_state.categories['income']))
+            rule_category = st.selectbox("קטגוריה", all_categories)
         
-        # קישור להורדת נתונים
-        download_href = download_csv(display_transactions)
-        st.markdown(download_href, unsafe_allow_html=True)
+        if st.form_submit_button("הוסף כלל סיווג"):
+            allowed = st.session_state.categories[rule_type] if rule_type else all_categories
+            if rule_category not in allowed:
+                st.error(f"הקטגוריה {rule_category} אינה קטגוריה של {'הכנסות' if rule_type == 'income' else 'הוצאות'}")
+            else:
+                try:
+                    st.session_state.store.add_category_rule({
+                        'kind': rule_kind,
+                        'pattern': rule_text,
+                        'category': rule_category,
+                        'type': rule_type
+                    })
+                except ValueError as e:
+                    st.error(str(e))
+                else:
+                    st.success("כלל הסיווג נוסף")
+    
+    category_rules = st.session_state.store.category_rules()
+    if len(category_rules) > 0:
+        st.dataframe(
+            pd.DataFrame({
+                'סוג כלל': category_rules['kind'].map(RULE_KIND_LABELS),
+                'טקסט': category_rules['pattern'],
+                'קטגוריה': category_rules['category'],
+                'חל על': category_rules['type'].map({'income': 'הכנסות', 'expense': 'הוצאות'}).fillna('הכל')
+            }),
+            use_container_width=True,
+            hide_index=True
+        )
         
-        # אפשרות למחיקת עסקאות
-        with st.expander("מחיקת עסקאות"):
-            st.warning("שים לב! מחיקת עסקאות היא פעולה בלתי הפיכה")
-            
-            # בחירת עסקה למחיקה
-            transaction_options = []
-            for _, row in display_transactions.iterrows():
-                amount_text = f"+{row['amount']:,.0f}" if row['type'] == 'income' else f"-{row['amount']:,.0f}"
-                option_text = f"{row['date'].strftime('%d/%m/%Y')} | {amount_text} ₪ | {row['description']}"
-                transaction_options.append((option_text, row['id']))
-            
-            # יצירת אפשרויות בחירה
-            option_texts = [t[0] for t in transaction_options]
-            option_ids = [t[1] for t in transaction_options]
-            
-            selected_idx = st.selectbox("בחר עסקה למחיקה:", range(len(option_texts)), format_func=lambda i: option_texts[i])
-            selected_id = option_ids[selected_idx]
-            
-            if st.button("מחק עסקה"):
-                # מחיקת העסקה מהמסד
-                st.session_state.transactions = st.session_state.transactions[st.session_state.transactions['id'] != selected_id]
-                st.success("העסקה נמחקה בהצלחה!")
+        col1, col2 = st.columns(2)
+        with col1:
+            rule_labels = dict(zip(category_rules['id'].tolist(), category_rules['pattern'] + ' → ' + category_rules['category']))
+            rules_to_delete = st.multiselect("מחיקת כללים:", list(rule_labels), format_func=lambda i: rule_labels[i])
+            if rules_to_delete and st.button("מחק כללי סיווג"):
+                st.session_state.store.delete_category_rules(rules_to_delete)
                 st.rerun()
-    else:
-        st.info("אין עסקאות להצגה בחודש זה")
+        with col2:
+            # סיווג מחדש של עסקאות קיימות שנשארו ב'אחר', בעדכון אחד מול המאגר
+            if st.button("סווג עסקאות קיימות בקטגוריה 'אחר'"):
+                others = st.session_state.store.query(category='אחר')
+                start = datetime.now()
+                matched = st.session_state.store.categorizer().categorize(others['description'], others['type'].astype(str))
+                matched = matched.where(known_categories(matched, others['type'], st.session_state.categories))
+                matched = matched[matched.notna() & (matched != 'אחר')]
+                if len(matched) > 0:
+                    st.session_state.store.update([
+                        {'id': int(id), 'category': category}
+                        for id, category in zip(others.loc[matched.index, 'id'], matched)
+                    ])
+                st.success(f"סווגו {len(matched):,} מתוך {len(others):,} עסקאות ({(datetime.now() - start).total_seconds():.2f} שניות)")
+
+# דוח גודל התרשימים שנשלחו בריצה הנוכחית
+if chart_payloads:
+    with st.sidebar.expander("📦 גודל תרשימים"):
+        for title, payload in chart_payloads.items():
+            st.caption(f"{title}: {payload['bytes'] / 1024:,.1f} KB • {payload['points']:,} נקודות")
 
-# ריצה ראשונית - טעינת נתוני דוגמה אוטומטית
-if len(st.session_state.transactions) == 0 and 'show_welcome' not in st.session_state:
+# ריצה ראשונית - טעינת נתוני דוגמה אוטומטית (רק במשק הבית הראשי, לא בנתונים של משפחה)
+if len(st.session_state.store) == 0 and st.session_state.household == DEFAULT_HOUSEHOLD and 'show_welcome' not in st.session_state:
     st.session_state.show_welcome = True
     load_sample_data()
     
@@ -0,0 +1,116 @@
+import re
+import numpy as np
+import pandas as pd
+
+# סוגי כללי סיווג: מילת מפתח (טקסט מדויק), כינויים של בית עסק (רשימה מופרדת בפסיקים)
+# וביטוי רגולרי חופשי
+RULE_KINDS = ['keyword', 'alias', 'regex']
+
+# עמודות טבלת הכללים (type ריק - הכלל חל על הכנסות ועל הוצאות)
+CATEGORY_RULE_COLUMNS = ['id', 'kind', 'pattern', 'category', 'type']
+
+
+# הפניה מספרית לקבוצה בביטוי של משתמש: \1 או (?(1)...). מדלג על מחלקות תווים ועל תווים
+# מוברחים, ו-\123 (שלוש ספרות) הוא קוד אוקטלי ולא הפניה
+GROUP_NUMBER_REFERENCE = re.compile(
+    r'\[\^?\]?(?:\\.|[^\]\\])*\]|\\(?:[1-7][0-7]{2}|([1-9]\d?)|.)|\(\?\((\d+)\)',
+    re.DOTALL
+)
+
+
+# טבלת כללי סיווג ריקה
+def empty_category_rules():
+    return pd.DataFrame({
+        'id': pd.Series(dtype='int64'),
+        'kind': pd.Series(dtype='object'),
+        'pattern': pd.Series(dtype='object'),
+        'category': pd.Series(dtype='object'),
+        'type': pd.Series(dtype='object')
+    })
+
+
+# הביטוי הרגולרי של כלל בודד. זורק ValueError לכלל ריק או לביטוי לא תקין
+def rule_pattern(kind, pattern):
+    if kind == 'keyword':
+        terms = [str(pattern).strip()]
+    elif kind == 'alias':
+        terms = [alias.strip() for alias in str(pattern).split(',')]
+    elif kind == 'regex':
+        try:
+            compiled = re.compile(pattern)
+        except re.error as e:
+            raise ValueError(f"ביטוי רגולרי לא תקין: {e}") from e
+        # כל הכללים מחוברים לביטוי אחד, ומספרי הקבוצות בו שונים מאלה של הכלל - הפניה
+        # מספרית הייתה מצביעה על קבוצה של כלל אחר. הפניה לפי שם, (?P=name), נשארת תקינה
+        if any(number or condition for number, condition in GROUP_NUMBER_REFERENCE.findall(pattern)):
+            raise ValueError("הפניה מספרית לקבוצה (כמו \\1) אינה נתמכת - יש לתת לקבוצה שם, (?P<name>...), ולהפנות אליה עם (?P=name)")
+        if compiled.match(''):
+            raise ValueError("הביטוי מתאים לכל טקסט")
+        return pattern
+    else:
+        raise ValueError(f"סוג כלל לא מוכר: {kind}")
+
+    terms = [term for term in terms if term]
+    if len(terms) == 0:
+        raise ValueError("הכלל ריק")
+    # כינוי ארוך קודם, כדי ש"שופרסל דיל" יתאים לפני "שופרסל"
+    return '|'.join(re.escape(term) for term in sorted(terms, key=len, reverse=True))
+
+
+# הידור כל הכללים לביטוי אחד: כל כלל עטוף בקבוצה, והקבוצה שנסגרה אחרונה בהתאמה
+# (lastindex) היא הקבוצה החיצונית של הכלל שהתאים. מחזיר את הביטוי ואת הקטגוריה של כל קבוצה
+def compile_rules(rules):
+    if len(rules) == 0:
+        return None, []
+
+    parts = []
+    group_categories = [None]
+    for kind, pattern, category in zip(rules['kind'], rules['pattern'], rules['category']):
+        pattern = rule_pattern(kind, pattern)
+        parts.append(f'({pattern})')
+        # קבוצות פנימיות של ביטוי המשתמש לא מסמנות כלל
+        group_categories.extend([category] + [None] * re.compile(pattern).groups)
+    try:
+        return re.compile('|'.join(parts), re.IGNORECASE), group_categories
+    except re.error as e:
+        # למשל שם קבוצה שחוזר בשני כללים
+        raise ValueError(f"הכללים לא מתחברים לביטוי אחד: {e}") from e
+
+
+# מסווג אצוות: ביטוי משולב אחד לכל סוג עסקה, על הכללים של הסוג ועל הכללים הכלליים.
+# התאמה ראשונה בטקסט קובעת; בהתאמות באותו מיקום - הכלל הראשון ברשימה
+class Categorizer:
+    def __init__(self, rules):
+        self._rules = rules
+        self._matchers = {}
+
+    # הביטוי המשולב של סוג עסקה (נבנה בשימוש הראשון)
+    def _matcher(self, type):
+        if type not in self._matchers:
+            applicable = self._rules[self._rules['type'].isna() | (self._rules['type'] == type)]
+            self._matchers[type] = compile_rules(applicable)
+        return self._matchers[type]
+
+    # קטגוריה לכל שורה לפי התיאור והסוג (NaN - אף כלל לא התאים).
+    # תיאורים חוזרים (אותו בית עסק) נבדקים פעם אחת ומשויכים לשורות לפי קוד
+    def categorize(self, descriptions, types):
+        descriptions = pd.Series(descriptions).fillna('').astype(str)
+        types = pd.Series(np.asarray(types), index=descriptions.index)
+        result = np.full(len(descriptions), np.nan, dtype=object)
+
+        for type in pd.unique(types):
+            regex, group_categories = self._matcher(type)
+            if regex is None:
+                continue
+            positions = np.flatnonzero((types == type).to_numpy())
+            codes, uniques = pd.factorize(descriptions.to_numpy()[positions])
+            matches = [regex.search(text) for text in uniques]
+            categories = np.array(
+                [group_categories[match.lastindex] if match else np.nan for match in matches],
+                dtype=object
+            )
+            result[positions] = categories[codes]
+        return pd.Series(result, index=descriptions.index)
+
+    def __len__(self):
+        return len(self._rules)
@@ -0,0 +1,87 @@
+import numpy as np
+import pandas as pd
+
+# מפריד בין רמות בשם המלא של קטגוריה (למשל "מזון › סופר")
+PATH_SEPARATOR = ' › '
+
+
+# עץ קטגוריות: כל קטגוריה יכולה להיות אב של תת-קטגוריות, ועסקאות ותקציבים אפשריים בכל רמה.
+# nodes - כל הקטגוריות לפי סדר התצוגה, parents - מיפוי מתת-קטגוריה לקטגוריית האב.
+# זוגות (קטגוריה, קטגוריה או אחד מאבותיה) מחושבים מראש, כך שגלגול סכומים לכל הרמות
+# הוא חיבור אחד (bincount) על הסכומים לפי קטגוריה
+class CategoryTree:
+    def __init__(self, nodes, parents=None):
+        parents = dict(parents or {})
+        unknown = (set(parents) | set(parents.values())) - set(nodes)
+        if unknown:
+            raise ValueError(f"קטגוריות לא מוכרות בעץ: {', '.join(sorted(unknown))}")
+
+        self.nodes = list(nodes)
+        self.parents = parents
+        self._index = pd.Index(self.nodes)
+        self._children = {node: [] for node in self.nodes}
+        for node in self.nodes:
+            if node in parents:
+                self._children[parents[node]].append(node)
+
+        # האבות של כל קטגוריה, מהאב הישיר ועד השורש
+        self._ancestors = {}
+        for node in self.nodes:
+            ancestors = []
+            parent = parents.get(node)
+            while parent is not None:
+                if parent == node or parent in ancestors:
+                    raise ValueError(f"מעגל בעץ הקטגוריות: {node}")
+                ancestors.append(parent)
+                parent = parents.get(parent)
+            self._ancestors[node] = ancestors
+
+        pairs = [(node, target) for node in self.nodes for target in [node] + self._ancestors[node]]
+        self._pair_nodes = self._index.get_indexer([node for node, _ in pairs])
+        self._pair_targets = self._index.get_indexer([target for _, target in pairs])
+
+    # תת-הקטגוריות הישירות (None - קטגוריות השורש)
+    def children(self, node=None):
+        if node is None:
+            return [node for node in self.nodes if node not in self.parents]
+        return list(self._children.get(node, []))
+
+    # האבות של קטגוריה, מהאב הישיר ועד השורש
+    def ancestors(self, node):
+        return list(self._ancestors.get(node, []))
+
+    # הקטגוריה וכל צאצאיה
+    def subtree(self, node):
+        nodes = [node]
+        for child in self._children.get(node, []):
+            nodes.extend(self.subtree(child))
+        return nodes
+
+    # שם מלא לתצוגה, מהשורש לקטגוריה
+    def label(self, node):
+        return PATH_SEPARATOR.join(reversed([node] + self.ancestors(node)))
+
+    # גלגול ערכים לפי קטגוריה (Series, או DataFrame לכמה עמודות) לכל הרמות: הערך של כל קטגוריה
+    # הוא הערך שלה ושל כל צאצאיה. קטגוריות שאינן בעץ נשארות כקטגוריות שורש עם הערך שלהן
+    def rollup(self, values):
+        if isinstance(values, pd.DataFrame):
+            return pd.DataFrame({column: self.rollup(values[column]) for column in values.columns})
+
+        codes = self._index.get_indexer(values.index)
+        known = codes >= 0
+        weights = values.to_numpy(dtype='float64')
+        own = np.bincount(codes[known], weights=weights[known], minlength=len(self.nodes))
+        rolled = np.bincount(self._pair_targets, weights=own[self._pair_nodes], minlength=len(self.nodes))
+        result = pd.Series(rolled, index=self._index, name=values.name)
+        if not known.all():
+            result = pd.concat([result, pd.Series(weights[~known], index=values.index[~known], name=values.name)])
+        return result
+
+    # התקציב האפקטיבי של כל קטגוריה: התקציב שהוגדר לה, או (אם לא הוגדר) סכום התקציבים
+    # האפקטיביים של תת-הקטגוריות שלה
+    def effective_budgets(self, budgets):
+        effective = {}
+        for node in sorted(self.nodes, key=lambda node: len(self._ancestors[node]), reverse=True):
+            own = budgets.get(node, 0)
+            effective[node] = own if own > 0 else sum(effective[child] for child in self._children[node])
+        return pd.Series(effective, dtype='float64').reindex(self.nodes)
@@ -0,0 +1,108 @@
+import calendar
+import importlib.util
+import tempfile
+from datetime import date
+from store import COLUMNS, format_period, slice_dates, with_shekels
+
+# פורמטי ייצוא: סיומת, סוג MIME והחבילה שנדרשת לכתיבה (None - ללא תלות)
+EXPORT_FORMATS = {
+    'CSV': ('csv', 'text/csv', None),
+    'Parquet': ('parquet', 'application/vnd.apache.parquet', 'pyarrow'),
+    'Excel': ('xlsx', 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet', 'openpyxl')
+}
+
+# מספר השורות בכל מקטע כשמייצאים טבלה שכבר בזיכרון
+EXPORT_CHUNK_SIZE = 50_000
+
+
+# פורמטים שהחבילות שלהם מותקנות
+def available_formats():
+    return [
+        name for name, (_, _, package) in EXPORT_FORMATS.items()
+        if package is None or importlib.util.find_spec(package) is not None
+    ]
+
+
+# המרת מקטע עסקאות לצורת הייצוא: סכום בשקלים ותאריך YYYY-MM-DD
+def export_frame(df):
+    df = with_shekels(df[COLUMNS])
+    return df.assign(
+        date=df['date'].to_numpy().astype('datetime64[D]').astype(str),
+        category=df['category'].astype(str),
+        type=df['type'].astype(str)
+    )
+
+
+# מקטעים מהמאגר לטווח תאריכים - חודש אחד בכל פעם, כך שרק מחיצה אחת מעובדת בכל שלב
+def store_chunks(store, start=None, end=None):
+    for period in store.periods():
+        year, month = map(int, format_period(period).split('-'))
+        month_start = date(year, month, 1)
+        month_end = date(year, month, calendar.monthrange(year, month)[1])
+        if (start is not None and month_end < start) or (end is not None and month_start > end):
+            continue
+
+        chunk = store.query(month=period)
+        if start is not None or end is not None:
+            chunk = slice_dates(chunk, start or month_start, end or month_end)
+        if len(chunk) > 0:
+            yield export_frame(chunk)
+
+
+# מקטעים מטבלה שכבר בזיכרון (למשל תוצאות חיפוש)
+def frame_chunks(df, chunk_size=EXPORT_CHUNK_SIZE):
+    for start in range(0, len(df), chunk_size):
+        yield export_frame(df.iloc[start:start + chunk_size])
+
+
+# כתיבת CSV מקטע אחרי מקטע (BOM בתחילת הקובץ כדי ש-Excel יזהה עברית)
+def write_csv(chunks, file):
+    file.write('\ufeff'.encode('utf-8'))
+    header = True
+    for chunk in chunks:
+        file.write(chunk.to_csv(index=False, header=header).encode('utf-8'))
+        header = False
+    if header:
+        file.write((','.join(COLUMNS) + '\n').encode('utf-8'))
+
+
+# כתיבת Parquet: קבוצת שורות לכל מקטע
+def write_parquet(chunks, file):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = pa.schema([
+        ('id', pa.int64()),
+        ('date', pa.string()),
+        ('amount', pa.float64()),
+        ('category', pa.string()),
+        ('description', pa.string()),
+        ('type', pa.string())
+    ])
+    with pq.ParquetWriter(file, schema) as writer:
+        for chunk in chunks:
+            writer.write_table(pa.Table.from_pandas(chunk, schema=schema, preserve_index=False))
+
+
+# כתיבת Excel במצב כתיבה בלבד - השורות נכתבות ברצף בלי להחזיק את כל הגיליון בזיכרון
+def write_xlsx(chunks, file):
+    from openpyxl import Workbook
+
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet('transactions')
+    sheet.append(COLUMNS)
+    for chunk in chunks:
+        for row in chunk.itertuples(index=False, name=None):
+            sheet.append(row)
+    workbook.save(file)
+
+
+WRITERS = {'CSV': write_csv, 'Parquet': write_parquet, 'Excel': write_xlsx}
+
+
+# ייצוא המקטעים לקובץ זמני בפורמט המבוקש. מחזיר את הקובץ הפתוח, ממוקם בתחילתו
+def export_file(chunks, export_format):
+    file = tempfile.TemporaryFile()
+    WRITERS[export_format](chunks, file)
+    file.seek(0)
+    return file
@@ -0,0 +1,70 @@
+import numpy as np
+import pandas as pd
+
+# מודלי התחזית
+MODELS = ['moving_average', 'seasonal_naive', 'linear_trend']
+
+# מספר החודשים האחרונים בממוצע הנע
+MOVING_AVERAGE_WINDOW = 3
+
+# אורך העונה בחודשים (עונתיות שנתית)
+SEASON_LENGTH = 12
+
+# מספר החודשים האחרונים שעליהם מותאמת המגמה הלינארית
+TREND_WINDOW = 24
+
+
+# מטריצת היסטוריה מטבלת הסיכומים: שורה לכל (סוג, קטגוריה), עמודה לכל חודש עד end_period
+# (לא כולל - החודש הנוכחי עוד לא הסתיים), וחודשים ללא עסקאות כאפס.
+# מחזיר את מפתחות השורות, מפתח החודש של העמודה הראשונה והמטריצה (באגורות)
+def history_matrix(aggregates, end_period):
+    cube = aggregates[aggregates['period'] < end_period]
+    if len(cube) == 0:
+        return pd.MultiIndex.from_arrays([[], []], names=['type', 'category']), end_period, np.zeros((0, 0))
+
+    groups = cube.groupby(['type', 'category'], observed=True)
+    rows = groups.ngroup().to_numpy()
+    keys = groups.size().index
+    periods = cube['period'].to_numpy()
+    first_period = int(periods.min())
+
+    matrix = np.zeros((len(keys), end_period - first_period))
+    np.add.at(matrix, (rows, periods - first_period), cube['total'].to_numpy(dtype='float64'))
+    return keys, first_period, matrix
+
+
+# התאמת מודל לכל השורות בבת אחת. מחזיר את הפרמטרים שנדרשים לתחזית
+def fit(matrix, model):
+    if model not in MODELS:
+        raise ValueError(f"מודל תחזית לא מוכר: {model}")
+
+    months = matrix.shape[1]
+    if months == 0:
+        return {'model': 'moving_average', 'level': np.zeros(len(matrix))}
+
+    # תחזית עונתית דורשת שנה מלאה של היסטוריה - עם פחות, ממוצע נע
+    if model == 'moving_average' or (model == 'seasonal_naive' and months < SEASON_LENGTH):
+        return {'model': 'moving_average', 'level': matrix[:, -MOVING_AVERAGE_WINDOW:].mean(axis=1)}
+
+    if model == 'seasonal_naive':
+        return {'model': model, 'season': matrix[:, -SEASON_LENGTH:].copy()}
+
+    # ריבועים פחותים לכל השורות בכפל מטריצות אחד: שיפוע ורמה בחודש האחרון
+    y = matrix[:, -TREND_WINDOW:]
+    x = np.arange(y.shape[1]) - (y.shape[1] - 1) / 2
+    denominator = (x ** 2).sum()
+    slope = (y - y.mean(axis=1, keepdims=True)) @ x / denominator if denominator > 0 else np.zeros(len(y))
+    level = y.mean(axis=1) + slope * x[-1]
+    return {'model': model, 'slope': slope, 'level': level}
+
+
+# תחזית ל-horizon החודשים שאחרי ההיסטוריה: מטריצה של שורה לכל (סוג, קטגוריה)
+def predict(params, horizon):
+    if params['model'] == 'moving_average':
+        return np.repeat(params['level'][:, None], horizon, axis=1)
+
+    if params['model'] == 'seasonal_naive':
+        return params['season'][:, np.arange(horizon) % SEASON_LENGTH]
+
+    steps = np.arange(1, horizon + 1)
+    return np.clip(params['level'][:, None] + params['slope'][:, None] * steps, 0, None)
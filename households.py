@@ -0,0 +1,88 @@
+import os
+import re
+from store import TransactionStore
+from memo import CacheGroup
+from alerts import DEFAULT_THRESHOLDS
+
+# משק הבית שנפתח כשלא נבחר אחר - נשמר בקובץ הנתונים המקורי, כך שנתונים קיימים נשארים שלו
+DEFAULT_HOUSEHOLD = 'default'
+
+# מפתח משק בית: אותיות (גם עבריות), ספרות, קו תחתון ומקף - משמש כשם קובץ וכפרמטר בכתובת
+HOUSEHOLD_KEY = re.compile(r'[\w-]{1,40}')
+
+# תיקיית הקבצים של שאר משקי הבית, קובץ SQLite נפרד לכל אחד
+HOUSEHOLDS_DIR = 'households'
+
+
+# בדיקת תקינות מפתח משק בית
+def validate_household(household):
+    household = str(household).strip()
+    if not HOUSEHOLD_KEY.fullmatch(household):
+        raise ValueError(f"מפתח משק בית לא תקין: {household!r}")
+    return household
+
+
+# נתיב קובץ הנתונים של משק בית
+def household_path(data_dir, household):
+    household = validate_household(household)
+    if household == DEFAULT_HOUSEHOLD:
+        return os.path.join(data_dir, 'transactions.db')
+    return os.path.join(data_dir, HOUSEHOLDS_DIR, f'{household}.db')
+
+
+# משקי הבית הקיימים (משק הבית הראשי תמיד ראשון)
+def list_households(data_dir):
+    directory = os.path.join(data_dir, HOUSEHOLDS_DIR)
+    names = os.listdir(directory) if os.path.isdir(directory) else []
+    households = sorted(
+        name[:-len('.db')] for name in names
+        if name.endswith('.db') and HOUSEHOLD_KEY.fullmatch(name[:-len('.db')])
+    )
+    return [DEFAULT_HOUSEHOLD] + [household for household in households if household != DEFAULT_HOUSEHOLD]
+
+
+# פתיחת המאגר של משק בית. כל משק בית הוא מחיצה נפרדת - קובץ, נעילת כתיבה, מחיצות חודשיות
+# וטבלת סיכומים משלו - כך ששאילתות וכתיבות של משק בית אחד לא נוגעות בנתונים של אחר
+def open_household(data_dir, household):
+    household = validate_household(household)
+    return TransactionStore(household_path(data_dir, household), household=household)
+
+
+# המצב של משק בית שמשותף לכל הסשנים שלו: המאגר (כולל התקציבים וההגדרות שנשמרים בו)
+# ומטמוני החישובים
+class Household:
+    def __init__(self, data_dir, household, default_budgets, cache_size=32):
+        self.household = validate_household(household)
+        self.store = open_household(data_dir, self.household)
+        # תקציב לקטגוריות שלא נשמר להן תקציב
+        self.default_budgets = default_budgets
+        # מטמוני החישובים והתרשימים, לפי גרסת המאגר של האובייקט הזה. נשמרים עליו, כך שמשק
+        # בית שנסגר ונפתח מחדש (והגרסה שלו מתחילה מאפס) מתחיל גם עם מטמון ריק
+        self.caches = CacheGroup(cache_size)
+
+    # התקציב לפי קטגוריה: התקציבים שנשמרו, ו-default_budgets לשאר הקטגוריות
+    def budgets(self):
+        return {**self.default_budgets, **self.store.budgets()}
+
+    # ספי התראות התקציב (חלק מהתקציב של כל קטגוריה)
+    def alert_thresholds(self):
+        return tuple(self.store.setting('alert_thresholds', DEFAULT_THRESHOLDS))
+
+    # שמירת התקציבים (משנה את גרסת המאגר, כמו כל כתיבה)
+    def update_budgets(self, budgets):
+        self.store.set_budgets(budgets)
+
+    # שמירת ספי ההתראות
+    def update_alert_thresholds(self, thresholds):
+        self.store.set_setting('alert_thresholds', sorted(thresholds))
+
+    # האם נטענו נתוני דוגמה - נשמר במאגר, כמו העסקאות עצמן, כדי שלא ייטענו פעמיים
+    def sample_data_loaded(self):
+        return bool(self.store.setting('sample_data_loaded', False))
+
+    def mark_sample_data_loaded(self):
+        self.store.set_setting('sample_data_loaded', True)
+
+    # סגירת המאגר (אחרי כתיבת החוצץ)
+    def close(self):
+        self.store.close()
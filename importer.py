@@ -0,0 +1,210 @@
+import time
+from collections import Counter
+import numpy as np
+import pandas as pd
+from store import periods_of, to_agorot
+
+# שמות עמודות אפשריים בקבצי ייצוא של האפליקציה ושל הבנקים. עמודות הסכום לפי מוסכמת הסימן:
+# amount - סכום עם סימן (או עם עמודת סוג), charge - חיוב בכרטיס אשראי (חיובי הוא הוצאה),
+# debit ו-credit - עמודות חובה וזכות נפרדות בדף חשבון
+COLUMN_ALIASES = {
+    'date': ['date', 'תאריך', 'תאריך עסקה', 'תאריך רכישה', 'תאריך ערך'],
+    'amount': ['amount', 'סכום', 'סכום עסקה', 'סכום בש"ח'],
+    'charge': ['סכום חיוב', 'סכום החיוב'],
+    'debit': ['debit', 'חובה'],
+    'credit': ['credit', 'זכות'],
+    'description': ['description', 'תיאור', 'פרטים', 'שם בית העסק', 'תיאור תנועה'],
+    'category': ['category', 'קטגוריה', 'ענף'],
+    'type': ['type', 'סוג', 'סוג עסקה']
+}
+
+# המרת סוג עסקה בעברית לערכים הפנימיים
+TYPE_ALIASES = {
+    'income': 'income',
+    'expense': 'expense',
+    'הכנסה': 'income',
+    'הוצאה': 'expense',
+    'זיכוי': 'income',
+    'חיוב': 'expense'
+}
+
+# עמודות שמרכיבות את מפתח הכפילות
+DEDUP_COLUMNS = ['date', 'amount', 'description', 'type']
+
+DEFAULT_CHUNK_SIZE = 50_000
+
+
+# מיפוי שמות העמודות בקובץ לשמות הפנימיים
+def resolve_columns(columns):
+    mapping = {}
+    normalized = {str(column).strip(): column for column in columns}
+    for target, aliases in COLUMN_ALIASES.items():
+        for alias in aliases:
+            if alias in normalized:
+                mapping[normalized[alias]] = target
+                break
+
+    targets = set(mapping.values())
+    if 'date' not in targets:
+        raise ValueError("עמודות חסרות בקובץ: date")
+    if not targets & {'amount', 'charge', 'debit', 'credit'}:
+        raise ValueError("עמודות חסרות בקובץ: amount")
+    return mapping
+
+
+# פורמטי תאריך נפוצים, לפי סדר הניסיון
+DATE_FORMATS = ['%Y-%m-%d', '%d/%m/%Y', '%d.%m.%Y', '%d-%m-%Y', '%d/%m/%y']
+
+
+# נרמול תאריכים: כל פורמט מוכר מנוסה על השורות שטרם פוענחו, ורק השארית עוברת פענוח כללי
+def normalize_dates(values):
+    values = values.astype(str).str.strip().str.slice(0, 10)
+    dates = pd.Series(pd.NaT, index=values.index, dtype='datetime64[ns]')
+    for date_format in DATE_FORMATS:
+        missing = dates.isna()
+        if not missing.any():
+            break
+        dates[missing] = pd.to_datetime(values[missing], format=date_format, errors='coerce')
+
+    missing = dates.isna()
+    if missing.any():
+        dates[missing] = pd.to_datetime(values[missing], dayfirst=True, errors='coerce')
+    return dates.dt.normalize()
+
+
+# נרמול סכומים: הסרת סימני מטבע ופסיקים
+def normalize_amounts(values):
+    if pd.api.types.is_numeric_dtype(values):
+        return values.astype('float64')
+
+    cleaned = values.astype(str).str.replace(r'[₪,\s]', '', regex=True)
+    return pd.to_numeric(cleaned, errors='coerce').astype('float64')
+
+
+# סכומים עם סימן (הכנסה חיובית) לפי עמודות הסכום שבקובץ: חיוב בכרטיס הוא הוצאה, חובה וזכות
+# מחושבים כזכות פחות חובה, וסכום כללי לפי positive_type - הסוג של סכום חיובי בקובץ
+def signed_amounts(chunk, positive_type='income'):
+    if 'charge' in chunk.columns:
+        return -normalize_amounts(chunk['charge'])
+    if 'debit' in chunk.columns or 'credit' in chunk.columns:
+        debit = normalize_amounts(chunk['debit']) if 'debit' in chunk.columns else pd.Series(np.nan, index=chunk.index)
+        credit = normalize_amounts(chunk['credit']) if 'credit' in chunk.columns else pd.Series(np.nan, index=chunk.index)
+        return (credit.fillna(0) - debit.fillna(0)).where(credit.notna() | debit.notna())
+
+    amounts = normalize_amounts(chunk['amount'])
+    return amounts if positive_type == 'income' else -amounts
+
+
+# נרמול מקטע אחד מהקובץ לטבלת עסקאות. מחזיר את הטבלה, מספר השורות הלא תקינות
+# ומספר השורות שסווגו לפי כללי הסיווג
+def normalize_chunk(chunk, mapping, categories, categorizer=None, positive_type='income'):
+    chunk = chunk.rename(columns=mapping)
+
+    df = pd.DataFrame(index=chunk.index)
+    df['date'] = normalize_dates(chunk['date'])
+    amounts = signed_amounts(chunk, positive_type)
+
+    # סוג העסקה: מעמודה מפורשת, ואם אין - לפי סימן הסכום
+    sign_types = pd.Series('income', index=chunk.index).where(amounts >= 0, 'expense')
+    if 'type' in chunk.columns:
+        df['type'] = chunk['type'].astype(str).str.strip().map(TYPE_ALIASES).fillna(sign_types)
+    else:
+        df['type'] = sign_types
+    df['amount'] = amounts.abs().round(2)
+
+    if 'description' in chunk.columns:
+        df['description'] = chunk['description'].fillna('').astype(str).str.strip()
+    else:
+        df['description'] = ''
+
+    # קטגוריה מהקובץ נשמרת אם היא מוכרת לסוג העסקה
+    if 'category' in chunk.columns:
+        raw = chunk['category'].fillna('').astype(str).str.strip()
+    else:
+        raw = pd.Series('', index=chunk.index)
+    known = known_categories(raw, df['type'], categories)
+    df['category'] = raw.where(known)
+    valid = df['date'].notna() & df['amount'].notna() & (df['amount'] > 0)
+
+    # קטגוריה חסרה או לא מוכרת - לפי כללי הסיווג, ואם אף כלל לא התאים - 'אחר'
+    categorized = 0
+    missing = ~known & valid
+    if categorizer is not None and len(categorizer) > 0 and missing.any():
+        matched = categorizer.categorize(df.loc[missing, 'description'], df.loc[missing, 'type'])
+        matched = matched.where(known_categories(matched, df.loc[missing, 'type'], categories))
+        df.loc[missing, 'category'] = matched
+        categorized = int(matched.notna().sum())
+    df['category'] = df['category'].fillna('אחר')
+
+    return df[valid], int((~valid).sum()), categorized
+
+
+# האם הקטגוריה מוכרת לסוג העסקה של השורה
+def known_categories(values, types, categories):
+    known_income = values.isin(categories['income'])
+    known_expense = values.isin(categories['expense'])
+    return ((types == 'income') & known_income) | ((types == 'expense') & known_expense)
+
+
+# מפתחות כפילות (hash) לשורות
+def dedup_keys(df):
+    if len(df) == 0:
+        return pd.Series([], dtype='uint64')
+    return pd.util.hash_pandas_object(df[DEDUP_COLUMNS], index=False)
+
+
+# ייבוא קובץ CSV במקטעים אל המאגר, ללא טעינת כל הקובץ לזיכרון.
+# שורות ללא קטגוריה מוכרת מסווגות לפי כללי הסיווג של המאגר. positive_type - הסוג של סכום
+# חיובי בעמודת סכום כללית, כשאין בקובץ עמודת סוג
+def import_csv(store, source, categories, chunksize=DEFAULT_CHUNK_SIZE, positive_type='income'):
+    start = time.perf_counter()
+    stats = {'rows_read': 0, 'imported': 0, 'duplicates': 0, 'invalid': 0, 'categorized': 0}
+    categorizer = store.categorizer()
+
+    # מספר המופעים של כל מפתח במאגר לפני הייבוא, לפי מפתח חודש - נטען רק עבור חודשים שמופיעים
+    # בקובץ. occurrences - מספר המופעים של כל מפתח בקובץ עד כה
+    existing = {}
+    occurrences = {}
+    mapping = None
+
+    reader = pd.read_csv(source, chunksize=chunksize, encoding='utf-8-sig', dtype=str, skipinitialspace=True)
+    for chunk in reader:
+        stats['rows_read'] += len(chunk)
+        if mapping is None:
+            mapping = resolve_columns(chunk.columns)
+
+        df, invalid, categorized = normalize_chunk(chunk, mapping, categories, categorizer, positive_type)
+        stats['invalid'] += invalid
+        stats['categorized'] += categorized
+        if len(df) == 0:
+            continue
+
+        periods = periods_of(df['date'])
+        # הסכומים במאגר באגורות, לכן גם מפתחות הקובץ מחושבים באגורות
+        keys = dedup_keys(df.assign(amount=to_agorot(df['amount']))).to_numpy()
+        keep = np.ones(len(df), dtype=bool)
+
+        for period, positions in df.groupby(periods.to_numpy()).indices.items():
+            if period not in existing:
+                existing[period] = Counter(dedup_keys(store.query(month=period)).tolist())
+                occurrences[period] = Counter()
+            month_hashes = pd.Series(keys[positions])
+
+            # המופע ה-k של מפתח בקובץ הוא כפילות רק אם במאגר היו כבר יותר מ-k מופעים שלו, כך
+            # ששורות זהות באותו קובץ (שני קפה באותו יום) נשמרות, וייבוא חוזר של הקובץ לא מוסיף דבר
+            occurrence = month_hashes.map(occurrences[period]).fillna(0) + month_hashes.groupby(month_hashes).cumcount()
+            duplicate = (occurrence < month_hashes.map(existing[period]).fillna(0)).to_numpy()
+            keep[positions] = ~duplicate
+            occurrences[period].update(month_hashes.tolist())
+
+        new_rows = df[keep]
+        stats['duplicates'] += int((~keep).sum())
+        if len(new_rows) == 0:
+            continue
+
+        store.add_frame(new_rows)
+        stats['imported'] += len(new_rows)
+
+    stats['seconds'] = time.perf_counter() - start
+    stats['rows_per_second'] = stats['rows_read'] / stats['seconds'] if stats['seconds'] > 0 else 0
+    return stats
@@ -0,0 +1,78 @@
+import functools
+import threading
+from collections import OrderedDict
+
+# ערך חסר במטמון (None הוא תוצאה חוקית, למשל תרשים ללא נתונים)
+_MISSING = object()
+
+
+# מטמון LRU מוגבל בגודלו - הפריט שלא נעשה בו שימוש הכי הרבה זמן נזרק ראשון.
+# מוגן בנעילה, כי מטמון משותף נקרא מכמה סשנים במקביל
+class LRUCache:
+    def __init__(self, maxsize=32):
+        self.maxsize = maxsize
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, default=None):
+        with self._lock:
+            if key in self._items:
+                self._items.move_to_end(key)
+                self.hits += 1
+                return self._items[key]
+            self.misses += 1
+            return default
+
+    def put(self, key, value):
+        with self._lock:
+            self._items[key] = value
+            self._items.move_to_end(key)
+            while len(self._items) > self.maxsize:
+                self._items.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+
+    def __len__(self):
+        return len(self._items)
+
+
+# קבוצת מטמוני LRU לפי שם, שמתרוקנת כשגרסת הנתונים משתנה - תוצאות של גרסה קודמת
+# לא יתאימו שוב, ולכן כתיבה לנתונים משחררת אותן מיד במקום לחכות שיידחקו
+class CacheGroup:
+    def __init__(self, maxsize=32):
+        self.maxsize = maxsize
+        self._caches = {}
+        self._version = None
+        self._lock = threading.Lock()
+
+    def get(self, name, version):
+        with self._lock:
+            if version != self._version:
+                self._caches = {}
+                self._version = version
+            if name not in self._caches:
+                self._caches[name] = LRUCache(self.maxsize)
+            return self._caches[name]
+
+
+# קישוט פונקציה כך שתוצאתה נשמרת לפי גרסת הנתונים והפרמטרים.
+# get_cache(name) מחזיר את המטמון של הפונקציה ו-get_version() את גרסת הנתונים הנוכחית -
+# שניהם נקראים בכל קריאה, כי Streamlit מגדיר מחדש את הפונקציות בכל ריצה
+def memoize(get_cache, get_version):
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            cache = get_cache(func.__name__)
+            key = (get_version(), args, tuple(sorted(kwargs.items())))
+
+            result = cache.get(key, _MISSING)
+            if result is _MISSING:
+                result = func(*args, **kwargs)
+                cache.put(key, result)
+            return result
+        return wrapper
+    return decorator
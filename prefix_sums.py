@@ -0,0 +1,94 @@
+import numpy as np
+import pandas as pd
+
+
+# סכומים מצטברים יומיים לכל (סוג, קטגוריה): שורה לכל מפתח ועמודה לכל יום, עם עמודת אפס בהתחלה.
+# סכום של כל טווח תאריכים הוא הפרש של שתי עמודות - O(1) לכל קטגוריה, בלי קשר לאורך ההיסטוריה.
+# daily: טבלת date, type, category, total, count (סיכום יומי)
+class DailyPrefixSums:
+    def __init__(self, daily):
+        self.keys = pd.MultiIndex.from_arrays([[], []], names=['type', 'category'])
+        self.first_day = None
+        self.totals = np.zeros((0, 1), dtype='int64')
+        self.counts = np.zeros((0, 1), dtype='int64')
+        self.add(daily)
+
+    # עדכון מצטבר בסיכומים יומיים חדשים (או שליליים, במחיקה): מפתחות וימים חדשים מרחיבים את
+    # המטריצה, והשינוי נצבר מהיום שלו והלאה
+    def add(self, daily):
+        if len(daily) == 0:
+            return
+
+        # מיפוי המפתחות של הסיכום (מעטים) לשורות, ושורה חדשה לכל מפתח שלא היה
+        groups = daily.groupby(['type', 'category'], sort=False)
+        keys = groups.size().index
+        new_keys = keys[self.keys.get_indexer(keys) < 0]
+        if len(new_keys) > 0:
+            self.keys = self.keys.append(new_keys)
+            padding = np.zeros((len(new_keys), self.totals.shape[1]), dtype='int64')
+            self.totals = np.vstack([self.totals, padding])
+            self.counts = np.vstack([self.counts, padding])
+        rows = self.keys.get_indexer(keys)[groups.ngroup().to_numpy()]
+
+        days = daily['date'].to_numpy().astype('datetime64[D]')
+        first_day = days.min()
+        if self.first_day is None:
+            self.first_day = first_day
+        elif first_day < self.first_day:
+            # ימים לפני תחילת ההיסטוריה - עמודות אפס בהתחלה
+            padding = np.zeros((len(self.keys), int((self.first_day - first_day).astype('int64'))), dtype='int64')
+            self.totals = np.hstack([self.totals[:, :1], padding, self.totals[:, 1:]])
+            self.counts = np.hstack([self.counts[:, :1], padding, self.counts[:, 1:]])
+            self.first_day = first_day
+
+        columns = (days - self.first_day).astype('int64') + 1
+        missing = int(columns.max()) + 1 - self.totals.shape[1]
+        if missing > 0:
+            # ימים אחרי סוף ההיסטוריה - הסכום המצטבר האחרון נמשך
+            self.totals = np.hstack([self.totals, np.repeat(self.totals[:, -1:], missing, axis=1)])
+            self.counts = np.hstack([self.counts, np.repeat(self.counts[:, -1:], missing, axis=1)])
+
+        # השינוי נצבר רק בשורות שהשתנו ומהיום המוקדם שבסיכום והלאה - הוספה של היום נוגעת בעמודה
+        # אחת, ורק בנייה מלאה (או שינוי בעבר הרחוק) עוברת על כל ההיסטוריה
+        touched, positions = np.unique(rows, return_inverse=True)
+        start = int(columns.min())
+        for matrix, values in [(self.totals, daily['total']), (self.counts, daily['count'])]:
+            delta = np.zeros((len(touched), matrix.shape[1] - start), dtype='int64')
+            np.add.at(delta, (positions, columns - start), values.to_numpy(dtype='int64'))
+            matrix[touched, start:] += np.cumsum(delta, axis=1)
+
+    # מיקום העמודה המצטברת עד סוף היום (כולל), חסום לטווח ההיסטוריה
+    def _column(self, day):
+        if self.first_day is None:
+            return 0
+        offset = (np.datetime64(pd.Timestamp(day).date(), 'D') - self.first_day).astype('int64') + 1
+        return int(np.clip(offset, 0, self.totals.shape[1] - 1))
+
+    # סכום (באגורות) ומספר עסקאות לכל (סוג, קטגוריה) בין start ל-end (כולל), רק מפתחות עם עסקאות
+    def range(self, start, end, type=None):
+        lo = self._column(pd.Timestamp(start) - pd.Timedelta(days=1))
+        hi = max(self._column(end), lo)
+
+        df = pd.DataFrame({
+            'total': self.totals[:, hi] - self.totals[:, lo],
+            'count': self.counts[:, hi] - self.counts[:, lo]
+        }, index=self.keys).reset_index()
+        df = df[df['count'] > 0]
+        if type is not None:
+            df = df[df['type'] == type]
+        return df.reset_index(drop=True)
+
+    # סכום יומי (באגורות) לכל סוג: שורה לכל יום מהיום הראשון עם עסקאות ועד האחרון (כולל ימים
+    # ללא עסקאות) ועמודה לכל סוג - הפרשים של העמודות המצטברות, בלי לטעון עסקאות
+    def by_day(self):
+        types = self.keys.get_level_values('type')
+        counts = np.diff(self.counts.sum(axis=0))
+        active = np.flatnonzero(counts)
+        if len(active) == 0:
+            return pd.DataFrame(index=pd.DatetimeIndex([], name='date'))
+
+        days = slice(active[0], active[-1] + 1)
+        return pd.DataFrame(
+            {type: np.diff(self.totals[types == type].sum(axis=0))[days] for type in pd.unique(types)},
+            index=pd.date_range(self.first_day + active[0], periods=days.stop - days.start, freq='D', name='date')
+        )
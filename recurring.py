@@ -0,0 +1,108 @@
+import numpy as np
+import pandas as pd
+
+# תדירויות כללים: יחידת הצעד (חודשים או ימים) ומספר היחידות בצעד בודד.
+# מרווח הכלל (interval) מכפיל את הצעד - למשל כל 3 חודשים או כל 10 ימים
+FREQUENCIES = {'monthly': ('M', 1), 'weekly': ('D', 7), 'daily': ('D', 1)}
+
+# עמודות טבלת הכללים בזיכרון (סכום באגורות, end_date ו-posted_until ריקים - NaT)
+RULE_COLUMNS = ['id', 'description', 'amount', 'category', 'type', 'frequency', 'interval',
+                'start_date', 'end_date', 'posted_until']
+
+# עמודות המופעים שנוצרים מהכללים
+OCCURRENCE_COLUMNS = ['rule_id', 'date', 'amount', 'category', 'description', 'type']
+
+
+# טבלת כללים ריקה עם טיפוסים תקינים
+def empty_rules():
+    return pd.DataFrame({
+        'id': pd.Series(dtype='int64'),
+        'description': pd.Series(dtype='object'),
+        'amount': pd.Series(dtype='int64'),
+        'category': pd.Series(dtype='object'),
+        'type': pd.Series(dtype='object'),
+        'frequency': pd.Series(dtype='object'),
+        'interval': pd.Series(dtype='int64'),
+        'start_date': pd.Series(dtype='datetime64[ns]'),
+        'end_date': pd.Series(dtype='datetime64[ns]'),
+        'posted_until': pd.Series(dtype='datetime64[ns]')
+    })
+
+
+# חלוקה שלמה מעוגלת למעלה (גם למספרים שליליים)
+def _ceil_div(a, b):
+    return -(-a // b)
+
+
+# פריסת הכללים לעסקאות בחלון התאריכים [start, end] (כולל), בלי לולאה על מופעים.
+# start יכול להיות תאריך אחד או מערך תאריכים - אחד לכל כלל (למשל היום שאחרי הרישום האחרון).
+# לכל כלל מחושבים מספרי המופע הראשון והאחרון שנופלים בחלון, כל המופעים נפרסים במערך אחד,
+# והתאריכים מחושבים בבת אחת: צעד קבוע בימים, או חודשים עם היום בחודש של תאריך ההתחלה
+# (מוגבל לאורך החודש - כלל שמתחיל ב-31 יחול ביום האחרון של חודשים קצרים)
+def expand_rules(rules, start, end):
+    if len(rules) == 0:
+        return pd.DataFrame({
+            'rule_id': pd.Series(dtype='int64'),
+            'date': pd.Series(dtype='datetime64[ns]'),
+            'amount': pd.Series(dtype='int64'),
+            'category': pd.Series(dtype='object'),
+            'description': pd.Series(dtype='object'),
+            'type': pd.Series(dtype='object')
+        })
+
+    starts = rules['start_date'].to_numpy().astype('datetime64[D]')
+    ends = rules['end_date'].to_numpy().astype('datetime64[D]')
+    end = np.datetime64(pd.Timestamp(end).date(), 'D')
+    window_start = np.maximum(starts, np.asarray(pd.to_datetime(start)).astype('datetime64[D]'))
+    window_end = np.where(np.isnat(ends), end, np.minimum(ends, end))
+
+    interval = rules['interval'].to_numpy().astype('int64')
+    monthly = (rules['frequency'] == 'monthly').to_numpy()
+    step = interval * np.array([FREQUENCIES[frequency][1] for frequency in rules['frequency']], dtype='int64')
+
+    # טווח מספרי המופעים בחלון: בימים לפי הפרש הימים, בחודשים לפי הפרש החודשים.
+    # בחודשי הקצה עלול להיכנס מופע אחד מחוץ לחלון - הוא מסונן אחרי חישוב התאריכים
+    start_months = starts.astype('datetime64[M]').astype('int64')
+    day_first = _ceil_div((window_start - starts).astype('int64'), step)
+    day_last = (window_end - starts).astype('int64') // step
+    month_first = _ceil_div(window_start.astype('datetime64[M]').astype('int64') - start_months, step)
+    month_last = (window_end.astype('datetime64[M]').astype('int64') - start_months) // step
+    first = np.maximum(np.where(monthly, month_first, day_first), 0)
+    last = np.where(monthly, month_last, day_last)
+    counts = np.clip(last - first + 1, 0, None)
+
+    # פריסה: מספר הכלל ומספר המופע לכל עסקה
+    rule_positions = np.repeat(np.arange(len(rules)), counts)
+    offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    occurrence = np.repeat(first, counts) + offsets
+    step = step[rule_positions]
+
+    months = (start_months[rule_positions] + occurrence * step).astype('datetime64[M]')
+    month_starts = months.astype('datetime64[D]')
+    month_lengths = ((months + 1).astype('datetime64[D]') - month_starts).astype('int64')
+    day_of_month = (starts - starts.astype('datetime64[M]').astype('datetime64[D]')).astype('int64')[rule_positions]
+    dates = np.where(
+        monthly[rule_positions],
+        month_starts + np.minimum(day_of_month, month_lengths - 1),
+        starts[rule_positions] + occurrence * step
+    )
+
+    keep = (dates >= window_start[rule_positions]) & (dates <= window_end[rule_positions])
+    rule_positions = rule_positions[keep]
+    occurrences = pd.DataFrame({
+        'rule_id': rules['id'].to_numpy()[rule_positions],
+        'date': dates[keep].astype('datetime64[ns]'),
+        'amount': rules['amount'].to_numpy()[rule_positions],
+        'category': rules['category'].to_numpy()[rule_positions],
+        'description': rules['description'].to_numpy()[rule_positions],
+        'type': rules['type'].to_numpy()[rule_positions]
+    })
+    return occurrences.sort_values('date', kind='mergesort', ignore_index=True)
+
+
+# המופע הבא של כל כלל מתאריך נתון (NaT - כלל שהסתיים)
+def next_occurrences(rules, after):
+    horizon = pd.Timestamp(after) + pd.DateOffset(months=int(rules['interval'].max()) + 1) if len(rules) else after
+    upcoming = expand_rules(rules, after, horizon)
+    first = upcoming.groupby('rule_id')['date'].min()
+    return rules['id'].map(first)
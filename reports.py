@@ -0,0 +1,140 @@
+import numpy as np
+import pandas as pd
+from store import format_periods, to_shekels
+from forecast import history_matrix
+
+
+# סיכום חודשי של הכנסות, הוצאות, חיסכון ואחוז חיסכון לכל החודשים בחישוב אחד
+def monthly_trends(aggregates):
+    if len(aggregates) == 0:
+        return pd.DataFrame({
+            'year_month': pd.Series(dtype='object'),
+            'income': pd.Series(dtype='float64'),
+            'expenses': pd.Series(dtype='float64'),
+            'savings': pd.Series(dtype='float64'),
+            'savings_rate': pd.Series(dtype='float64')
+        })
+
+    by_type = aggregates.groupby(['period', 'type'])['total'].sum().unstack('type', fill_value=0)
+    by_type = by_type.reindex(columns=['income', 'expense'], fill_value=0).sort_index()
+
+    # סכומי הסיכומים באגורות
+    income = to_shekels(by_type['income'].to_numpy(dtype='float64'))
+    expenses = to_shekels(by_type['expense'].to_numpy(dtype='float64'))
+    savings = income - expenses
+
+    # אחוז חיסכון רק בחודשים עם הכנסה
+    savings_rate = np.zeros_like(savings)
+    np.divide(savings * 100, income, out=savings_rate, where=income > 0)
+
+    return pd.DataFrame({
+        'year_month': format_periods(by_type.index.to_numpy()).to_numpy(),
+        'income': income,
+        'expenses': expenses,
+        'savings': savings,
+        'savings_rate': savings_rate
+    })
+
+
+# הכנסות והוצאות (בשקלים) לכל יום או שבוע, כולל תקופות ללא עסקאות. freq: 'D' או 'W'.
+# daily: סכום יומי באגורות, שורה לכל יום ועמודה לכל סוג (TransactionStore.daily_by_type)
+def period_trends(daily, freq='D'):
+    if len(daily) == 0:
+        return pd.DataFrame({
+            'date': pd.Series(dtype='datetime64[ns]'),
+            'income': pd.Series(dtype='float64'),
+            'expenses': pd.Series(dtype='float64')
+        })
+
+    by_type = daily.reindex(columns=['income', 'expense'], fill_value=0).resample(freq).sum()
+
+    return pd.DataFrame({
+        'date': by_type.index,
+        'income': to_shekels(by_type['income'].to_numpy(dtype='float64')),
+        'expenses': to_shekels(by_type['expense'].to_numpy(dtype='float64'))
+    })
+
+
+# דילול סדרה ל-threshold נקודות בשיטת Largest-Triangle-Three-Buckets: בכל דלי נבחרת
+# הנקודה שיוצרת את המשולש הגדול ביותר עם הנקודה הקודמת וממוצע הדלי הבא, כך שהשיאים נשמרים.
+# מחזיר את מיקומי הנקודות שנבחרו
+def lttb(x, y, threshold):
+    x = np.asarray(x, dtype='float64')
+    y = np.asarray(y, dtype='float64')
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+
+    # גבולות הדליים (הנקודה הראשונה והאחרונה נשמרות תמיד)
+    edges = np.linspace(1, n - 1, threshold - 1).astype('int64')
+    selected = np.empty(threshold, dtype='int64')
+    selected[0] = 0
+    selected[-1] = n - 1
+
+    previous = 0
+    for bucket in range(threshold - 2):
+        start, end = edges[bucket], edges[bucket + 1]
+        next_start, next_end = end, edges[bucket + 2] if bucket + 2 < len(edges) else n
+        next_x = x[next_start:next_end].mean()
+        next_y = y[next_start:next_end].mean()
+
+        areas = np.abs(
+            (x[previous] - next_x) * (y[start:end] - y[previous]) -
+            (x[previous] - x[start:end]) * (next_y - y[previous])
+        )
+        previous = start + int(np.argmax(areas))
+        selected[bucket + 1] = previous
+    return selected
+
+
+# החלק של כל חודש שהטווח מכסה, מסוכם - למשל חודש וחצי לטווח 1.1-15.2 (לתקציב חודשי על טווח)
+def months_covered(start, end):
+    days = pd.date_range(pd.Timestamp(start).normalize(), pd.Timestamp(end).normalize(), freq='D')
+    return float(np.sum(1 / days.days_in_month.to_numpy()))
+
+
+# השוואות בין תקופות: חודש מול החודש הקודם, חודש מול אותו חודש בשנה שעברה,
+# ו-12 החודשים שמסתיימים בחודש מול 12 החודשים שלפניהם
+COMPARISONS = ['mom', 'same_month_last_year', 'yoy']
+
+
+# הזזת מטריצה (שורה לכל קטגוריה, עמודה לכל חודש) ב-months חודשים קדימה, NaN לחודשים ללא היסטוריה
+def _shift(matrix, months):
+    shifted = np.full(matrix.shape, np.nan)
+    if months < matrix.shape[1]:
+        shifted[:, months:] = matrix[:, :matrix.shape[1] - months]
+    return shifted
+
+
+# כל ההשוואות לכל (סוג, קטגוריה) ולכל חודש במעבר וקטורי אחד על מטריצת הסיכומים החודשיים.
+# מחזיר את מפתחות השורות, מפתחות החודשים ולכל השוואה: ערך נוכחי, ערך בסיס, הפרש ושינוי יחסי
+# (NaN כשאין היסטוריה או שהבסיס אפס). הסכומים באגורות
+def period_comparisons(aggregates):
+    if len(aggregates) == 0:
+        empty = np.zeros((0, 0))
+        return (
+            pd.MultiIndex.from_arrays([[], []], names=['type', 'category']),
+            np.zeros(0, dtype='int64'),
+            {name: (empty, empty, empty, empty) for name in COMPARISONS}
+        )
+
+    keys, first_period, matrix = history_matrix(aggregates, int(aggregates['period'].max()) + 1)
+    periods = np.arange(first_period, first_period + matrix.shape[1])
+
+    # סכום 12 החודשים שמסתיימים בכל חודש, רק כשיש 12 חודשי היסטוריה
+    cumulative = np.cumsum(matrix, axis=1)
+    trailing = cumulative - np.hstack([np.zeros((len(matrix), 12)), cumulative[:, :-12]])[:, :matrix.shape[1]]
+    trailing[:, :11] = np.nan
+
+    pairs = {
+        'mom': (matrix, _shift(matrix, 1)),
+        'same_month_last_year': (matrix, _shift(matrix, 12)),
+        'yoy': (trailing, _shift(trailing, 12))
+    }
+    comparisons = {}
+    for name, (current, base) in pairs.items():
+        delta = current - base
+        change = np.full(delta.shape, np.nan)
+        np.divide(delta, base, out=change, where=base > 0)
+        comparisons[name] = (current, base, delta, change)
+    return keys, periods, comparisons
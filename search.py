@@ -0,0 +1,116 @@
+import re
+import bisect
+import numpy as np
+import pandas as pd
+
+# ניקוד וטעמים - מוסרים לפני החיפוש
+NIQQUD = re.compile('[\u0591-\u05c7]')
+
+# אותיות סופיות מנורמלות לצורתן הרגילה, כדי ש"כספים" ו"כספ" יתאימו
+FINAL_LETTERS = str.maketrans('ךםןףץ', 'כמנפצ')
+
+# אותיות שימוש שנצמדות לתחילת מילה בעברית (ו, ה, ב, ל, מ, ש, כ)
+PREFIX_LETTERS = set('והבלמשכ')
+
+# אורך מינימלי של מילה אחרי הסרת אות שימוש
+MIN_STEM_LENGTH = 2
+
+TOKEN = r'\w+'
+
+
+# נרמול טקסט לחיפוש: אותיות קטנות, ללא ניקוד ועם אותיות סופיות רגילות
+def normalize_text(text):
+    return NIQQUD.sub('', str(text).lower()).translate(FINAL_LETTERS)
+
+
+# פירוק טקסט (שאילתה) למילים מנורמלות
+def tokenize(text):
+    return re.findall(TOKEN, normalize_text(text))
+
+
+# מילים לאינדקס: כל מילה, ובנוסף המילה ללא אות השימוש שבתחילתה ("בסופר" -> "סופר")
+def index_tokens(text):
+    tokens = set()
+    for token in tokenize(text):
+        tokens.add(token)
+        if token[0] in PREFIX_LETTERS and len(token) > MIN_STEM_LENGTH:
+            tokens.add(token[1:])
+    return tokens
+
+
+# מילה -> מזהי העסקאות שבהן היא מופיעה. תיאורי עסקאות חוזרים על עצמם (אותו בית עסק),
+# לכן כל טקסט שונה מפורק פעם אחת והמזהים משויכים אליו לפי קוד
+def token_postings(ids, descriptions, categories):
+    texts = (
+        pd.Series(descriptions, dtype='object').fillna('').astype(str).to_numpy() + ' ' +
+        pd.Series(categories, dtype='object').fillna('').astype(str).to_numpy()
+    )
+    codes, uniques = pd.factorize(texts)
+    order = np.argsort(codes, kind='stable')
+    ids_by_code = np.split(np.asarray(ids, dtype='int64')[order], np.cumsum(np.bincount(codes, minlength=len(uniques)))[:-1])
+
+    postings = {}
+    for code, text in enumerate(uniques):
+        for token in index_tokens(text):
+            postings.setdefault(token, []).append(ids_by_code[code])
+    return {token: np.concatenate(arrays) for token, arrays in postings.items()}
+
+
+# אינדקס הפוך: מילה -> מזהי העסקאות שבתיאור או בקטגוריה שלהן היא מופיעה.
+# מתעדכן בהוספה ובמחיקה, ומחפש לפי תחילית מילה בחיפוש בינארי על אוצר המילים הממוין
+class SearchIndex:
+    def __init__(self):
+        self._postings = {}
+        self._size = 0
+        # אוצר המילים הממוין נבנה מחדש רק אחרי שנוספו או נמחקו מילים
+        self._vocabulary = []
+        self._vocabulary_dirty = False
+
+    # הוספת עסקאות לאינדקס
+    def add(self, ids, descriptions, categories):
+        for token, token_ids in token_postings(ids, descriptions, categories).items():
+            postings = self._postings.get(token)
+            if postings is None:
+                self._postings[token] = set(token_ids.tolist())
+                self._vocabulary_dirty = True
+            else:
+                postings.update(token_ids.tolist())
+        self._size += len(ids)
+
+    # הסרת עסקאות מהאינדקס - המילים מחושבות מחדש מהתיאור והקטגוריה שנמחקו
+    def remove(self, ids, descriptions, categories):
+        for token, token_ids in token_postings(ids, descriptions, categories).items():
+            postings = self._postings.get(token)
+            if postings is None:
+                continue
+            postings.difference_update(token_ids.tolist())
+            if len(postings) == 0:
+                del self._postings[token]
+                self._vocabulary_dirty = True
+        self._size -= len(ids)
+
+    # מזהי העסקאות שמכילות מילה שמתחילה בתחילית
+    def _prefix_matches(self, prefix):
+        if self._vocabulary_dirty:
+            self._vocabulary = sorted(self._postings)
+            self._vocabulary_dirty = False
+
+        matches = set()
+        position = bisect.bisect_left(self._vocabulary, prefix)
+        while position < len(self._vocabulary) and self._vocabulary[position].startswith(prefix):
+            matches |= self._postings[self._vocabulary[position]]
+            position += 1
+        return matches
+
+    # חיפוש: כל מילה בשאילתה צריכה להופיע (כתחילית של מילה) בעסקה. מחזיר מערך מזהים
+    def search(self, query):
+        result = None
+        for token in tokenize(query):
+            matches = self._prefix_matches(token)
+            result = matches if result is None else result & matches
+            if len(result) == 0:
+                break
+        return np.fromiter(result or (), dtype='int64')
+
+    def __len__(self):
+        return self._size
@@ -0,0 +1,977 @@
+import json
+import math
+import os
+import sqlite3
+import threading
+import numpy as np
+import pandas as pd
+from pandas.api.types import CategoricalDtype
+from search import SearchIndex
+from recurring import FREQUENCIES, RULE_COLUMNS, empty_rules, expand_rules
+from prefix_sums import DailyPrefixSums
+from categorize import CATEGORY_RULE_COLUMNS, Categorizer, compile_rules, empty_category_rules
+
+# עמודות עסקה כפי שהן מתקבלות בהוספה
+COLUMNS = ['id', 'date', 'amount', 'category', 'description', 'type']
+
+# עמודות הטבלה בזיכרון: בנוסף, מפתח חודש מספרי שמחושב פעם אחת בהוספה
+FRAME_COLUMNS = COLUMNS + ['period']
+
+# מפתחות ועמודות טבלת הסיכומים החודשיים
+AGGREGATE_KEYS = ['period', 'type', 'category']
+AGGREGATE_COLUMNS = AGGREGATE_KEYS + ['total', 'count']
+DAILY_KEYS = ['date', 'type', 'category']
+DAILY_COLUMNS = DAILY_KEYS + ['total', 'count']
+
+# סוגי עסקה - קבוצה סגורה, נשמרת כעמודה קטגוריאלית
+TYPES = ['income', 'expense']
+TYPE_DTYPE = CategoricalDtype(TYPES)
+
+# שדות עסקה שניתן לערוך, ושמותיהם להודעות שגיאה
+EDITABLE_COLUMNS = ['date', 'amount', 'category', 'description']
+FIELD_NAMES = {'date': 'תאריך', 'amount': 'סכום', 'category': 'קטגוריה', 'description': 'תיאור'}
+
+# מספר המזהים בכל שאילתת שליפה (מגבלת הפרמטרים של SQLite)
+FETCH_BATCH_SIZE = 500
+
+# מספר ההוספות הבודדות בחוצץ שאחריו הוא נכתב לבסיס הנתונים גם בלי קריאה
+FLUSH_SIZE = 10_000
+
+# מבנה טבלת העסקאות בבסיס הנתונים
+TRANSACTIONS_TABLE = """
+    CREATE TABLE IF NOT EXISTS transactions (
+        id INTEGER NOT NULL,
+        date TEXT NOT NULL,
+        period INTEGER NOT NULL,
+        amount INTEGER NOT NULL,
+        category TEXT NOT NULL,
+        description TEXT NOT NULL,
+        type TEXT NOT NULL
+    )
+"""
+
+# כללי עסקאות קבועות. נשמרים רק הכללים - המופעים נפרסים בשאילתה, ומופעים שהגיע מועדם
+# נרשמים כעסקאות רגילות עד posted_until
+RULES_TABLE = """
+    CREATE TABLE IF NOT EXISTS recurring_rules (
+        id INTEGER PRIMARY KEY,
+        description TEXT NOT NULL,
+        amount INTEGER NOT NULL,
+        category TEXT NOT NULL,
+        type TEXT NOT NULL,
+        frequency TEXT NOT NULL,
+        interval INTEGER NOT NULL,
+        start_date TEXT NOT NULL,
+        end_date TEXT,
+        posted_until TEXT
+    )
+"""
+
+# כללי סיווג אוטומטי של עסקאות לפי התיאור (type ריק - לכל סוגי העסקאות)
+CATEGORY_RULES_TABLE = """
+    CREATE TABLE IF NOT EXISTS category_rules (
+        id INTEGER PRIMARY KEY,
+        kind TEXT NOT NULL,
+        pattern TEXT NOT NULL,
+        category TEXT NOT NULL,
+        type TEXT
+    )
+"""
+
+# תקציב חודשי לכל קטגוריית הוצאה (באגורות) - נשמר עם העסקאות, כך שהוא שורד הפעלה מחדש
+BUDGETS_TABLE = """
+    CREATE TABLE IF NOT EXISTS budgets (
+        category TEXT PRIMARY KEY,
+        amount INTEGER NOT NULL
+    )
+"""
+
+# הגדרות משק הבית (למשל ספי ההתראות), ערך JSON לכל מפתח
+SETTINGS_TABLE = """
+    CREATE TABLE IF NOT EXISTS settings (
+        key TEXT PRIMARY KEY,
+        value TEXT NOT NULL
+    )
+"""
+
+# יצירת טבלת עסקאות ריקה עם טיפוסים תקינים
+def empty_transactions(category_dtype=None):
+    return pd.DataFrame({
+        'id': pd.Series(dtype='int64'),
+        'date': pd.Series(dtype='datetime64[ns]'),
+        'amount': pd.Series(dtype='int64'),
+        'category': pd.Series(dtype=category_dtype or CategoricalDtype([])),
+        'description': pd.Series(dtype='object'),
+        'type': pd.Series(dtype=TYPE_DTYPE),
+        'period': pd.Series(dtype='int64')
+    })
+
+# טבלת סיכומים משורות (period, type, category, total, count), ממוינת לפי המפתחות
+def aggregates_frame(rows):
+    if len(rows) == 0:
+        return empty_aggregates()
+    df = pd.DataFrame(sorted(rows), columns=AGGREGATE_COLUMNS)
+    return df.astype({'period': 'int64', 'total': 'int64', 'count': 'int64'})
+
+# טבלת סיכומים ריקה
+def empty_aggregates():
+    return pd.DataFrame({
+        'period': pd.Series(dtype='int64'),
+        'type': pd.Series(dtype='object'),
+        'category': pd.Series(dtype='object'),
+        'total': pd.Series(dtype='int64'),
+        'count': pd.Series(dtype='int64')
+    })
+
+# סכומים נשמרים באגורות (int64) - בלי שגיאות עיגול של float בצבירה
+def to_agorot(amounts):
+    return np.round(np.asarray(amounts, dtype='float64') * 100).astype('int64')
+
+# המרת סכומים באגורות לשקלים (לתצוגה)
+def to_shekels(amounts):
+    return amounts / 100
+
+# סיכום יומי (יום, סוג, קטגוריה) של עסקאות: סכום ומספר, בסימן sign (1-, להסרה)
+def daily_totals(df, sign=1):
+    totals = df.groupby(DAILY_KEYS, observed=True)['amount'].agg(total='sum', count='count').reset_index()
+    return totals.astype({'type': str, 'category': str}).assign(
+        total=totals['total'] * sign,
+        count=totals['count'] * sign
+    )
+
+# עותק של טבלת עסקאות עם סכומים בשקלים (לתצוגה ולייצוא)
+def with_shekels(df):
+    return df.assign(amount=to_shekels(df['amount']))
+
+# זיכרון לשורה בבתים, כולל תוכן המחרוזות
+def bytes_per_row(df):
+    if len(df) == 0:
+        return 0.0
+    return df.memory_usage(index=False, deep=True).sum() / len(df)
+
+# מפתח חודש מספרי: שנה * 12 + (חודש - 1)
+def period_of(year, month):
+    return year * 12 + month - 1
+
+# המרת מחרוזת YYYY-MM למפתח חודש
+def parse_period(month_str):
+    year, month = map(int, month_str.split('-'))
+    return period_of(year, month)
+
+# המרת מפתח חודש למחרוזת YYYY-MM
+def format_period(period):
+    return f"{period // 12}-{period % 12 + 1:02d}"
+
+# המרה וקטורית של מפתחות חודש למחרוזות YYYY-MM (לתצוגה)
+def format_periods(periods):
+    periods = pd.Series(periods)
+    return (periods // 12).astype(str) + '-' + (periods % 12 + 1).astype(str).str.zfill(2)
+
+# מפתחות חודש לעמודת תאריכים - המרה וקטורית ללא עיבוד מחרוזות
+def periods_of(dates):
+    months_since_epoch = dates.to_numpy().astype('datetime64[M]').astype('int64')
+    return pd.Series(months_since_epoch + 1970 * 12, index=dates.index)
+
+# מפתח חודש מפרמטר שהוא מחרוזת YYYY-MM או מספר
+def to_period(month):
+    return parse_period(month) if isinstance(month, str) else int(month)
+
+# חיתוך טבלה ממוינת לפי תאריך לטווח [start, end] בחיפוש בינארי - O(log n + k)
+def slice_dates(df, start, end):
+    dates = df['date'].to_numpy()
+    lo = np.searchsorted(dates, np.datetime64(start), side='left')
+    hi = np.searchsorted(dates, np.datetime64(end), side='right')
+    return df.iloc[lo:hi]
+
+
+# מאגר עסקאות קבוע על הדיסק (SQLite) עם טעינה עצלה לפי חודש.
+# כל מחיצה חודשית נשמרת ממוינת לפי תאריך, ולכן גם שרשור המחיצות לפי סדר החודשים ממוין
+class TransactionStore:
+    def __init__(self, path, household=None):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self.path = path
+        # משק הבית שהמאגר שייך לו (None - מאגר עצמאי)
+        self.household = household
+        # Streamlit מריץ את הסקריפט בתהליכונים שונים, לכן החיבור משותף ומוגן בנעילה
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        # ביומן WAL עם synchronous=NORMAL טרנזקציה שהסתיימה שורדת קריסה של התהליך בלי סנכרון
+        # לדיסק בכל כתיבה
+        self._conn.execute("PRAGMA journal_mode = WAL")
+        self._conn.execute("PRAGMA synchronous = NORMAL")
+        self._lock = threading.RLock()
+
+        # מחיצות חודשיות שכבר נטענו לזיכרון
+        self._partitions = {}
+        self._all_loaded = False
+
+        # אינדקס hash ממזהה למיקום השורה בכל מחיצה - נבנה בשימוש ומתבטל בכל שינוי של המחיצה
+        self._row_indexes = {}
+
+        # מצבות: מיקומי שורות שנמחקו מכל מחיצה. המחיצה נדחסת (העתקה אחת) רק בקריאה הבאה,
+        # כך שמחיקת אלפי שורות לא מעתיקה את הטבלה אלפי פעמים
+        self._tombstones = {}
+
+        # חוצץ הוספות: עסקאות בודדות שנבדקו וקיבלו מזהה אך טרם נכתבו. כל החוצץ נכתב בטרנזקציה
+        # אחת ומתמזג למחיצות רק בקריאה הבאה (או כשהוא מתמלא), כך שהוספה בודדת היא O(1)
+        self._buffer = []
+        # סכום העסקאות שבחוצץ לכל (חודש, סוג, קטגוריה) - כדי שבדיקת תקציב תראה אותן בלי כתיבה
+        self._buffer_totals = {}
+
+        # טבלת סיכומים: חודש -> {(סוג, קטגוריה): [סכום, מספר עסקאות]}, נטענת בשימוש הראשון
+        # ומתעדכנת במקום בכל כתיבה - רק המפתחות שהשתנו. הטבלה המלאה כ-DataFrame נבנית רק בקריאה
+        self._aggregates = None
+        self._aggregates_frame = None
+
+        # סכומים מצטברים יומיים (לדוחות על טווחי תאריכים) - נבנים בשימוש הראשון ומתעדכנים בכל כתיבה
+        self._daily_sums = None
+
+        # אינדקס חיפוש על תיאורים וקטגוריות - נבנה בחיפוש הראשון ומתעדכן בכל כתיבה
+        self._search_index = None
+
+        # כללי העסקאות הקבועות - נטענים בשימוש הראשון ונטענים מחדש אחרי כל שינוי
+        self._rules = None
+
+        # מסווג מכללי הסיווג - נבנה בשימוש הראשון ומתבטל בכל שינוי בכללים
+        self._categorizer = None
+
+        # התקציבים וההגדרות - נטענים בשימוש הראשון ומתעדכנים בכל שמירה
+        self._budgets = None
+        self._settings = None
+
+        # גרסת הנתונים - עולה בכל שינוי, משמשת מפתח למטמוני חישובים
+        self.version = 0
+
+        self._create_schema()
+
+        # טיפוס קטגוריאלי משותף לכל המחיצות, כדי ששרשור מחיצות יישאר קטגוריאלי.
+        # קטגוריה חדשה מרחיבה את הטיפוס ואת המחיצות שכבר נטענו
+        rows = self._conn.execute("SELECT DISTINCT category FROM monthly_aggregates ORDER BY category").fetchall()
+        self._category_dtype = CategoricalDtype([row[0] for row in rows])
+
+        # מזהה העסקה הבא - עולה תמיד, ולכן ייחודי גם אחרי מחיקות. המונה נשמר בהגדרות עם כל כתיבה,
+        # כדי שמזהה של עסקה שנמחקה לא יחזור לשימוש אחרי פתיחה מחדש
+        row = self._conn.execute("SELECT value FROM settings WHERE key = 'next_id'").fetchone()
+        stored = json.loads(row[0]) if row else 1
+        self._next_id = max(stored, self._conn.execute("SELECT COALESCE(MAX(id), 0) + 1 FROM transactions").fetchone()[0])
+
+    # יצירת הטבלאות והאינדקסים אם אינם קיימים
+    def _create_schema(self):
+        with self._lock, self._conn:
+            self._conn.execute(TRANSACTIONS_TABLE)
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_transactions_period ON transactions (period)")
+            self._conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_transactions_id ON transactions (id)")
+            self._conn.execute(RULES_TABLE)
+            self._conn.execute(CATEGORY_RULES_TABLE)
+            self._conn.execute(BUDGETS_TABLE)
+            self._conn.execute(SETTINGS_TABLE)
+
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS monthly_aggregates (
+                    period INTEGER NOT NULL,
+                    type TEXT NOT NULL,
+                    category TEXT NOT NULL,
+                    total INTEGER NOT NULL,
+                    count INTEGER NOT NULL,
+                    PRIMARY KEY (period, type, category)
+                )
+            """)
+
+            # סיכומים יומיים, באותה שיטה
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS daily_aggregates (
+                    date TEXT NOT NULL,
+                    type TEXT NOT NULL,
+                    category TEXT NOT NULL,
+                    total INTEGER NOT NULL,
+                    count INTEGER NOT NULL,
+                    PRIMARY KEY (date, type, category)
+                )
+            """)
+
+    # הרחבת הטיפוס הקטגוריאלי בקטגוריות חדשות (גם במחיצות שכבר נטענו)
+    def _extend_categories(self, categories):
+        known = set(self._category_dtype.categories)
+        new = sorted(set(categories) - known)
+        if len(new) == 0:
+            return
+
+        self._category_dtype = CategoricalDtype(list(self._category_dtype.categories) + new)
+        for period, partition in list(self._partitions.items()):
+            self._set_partition(period, partition.assign(
+                category=partition['category'].cat.set_categories(self._category_dtype.categories)
+            ))
+
+    # המרת עמודות הטקסט לטיפוסים הקטגוריאליים של המאגר
+    def _apply_categories(self, df):
+        self._extend_categories(df['category'].unique())
+        df['category'] = df['category'].astype(self._category_dtype)
+        df['type'] = df['type'].astype(TYPE_DTYPE)
+        return df
+
+    # החלפת מחיצה בזיכרון (וביטול אינדקס המיקומים שלה)
+    def _set_partition(self, period, df):
+        self._partitions[period] = df
+        self._row_indexes.pop(period, None)
+
+    # אינדקס hash של מזהי המחיצה (כולל שורות שסומנו במצבה): get_indexer מחזיר מיקומים ב-O(1) למזהה
+    def _row_index(self, period):
+        index = self._row_indexes.get(period)
+        if index is None:
+            index = pd.Index(self._partitions[period]['id'])
+            self._row_indexes[period] = index
+        return index
+
+    # סימון שורות שנמחקו במחיצות שבזיכרון (rows: עמודות id ו-period)
+    def _tombstone(self, rows):
+        for period, ids in rows.groupby('period')['id']:
+            if period in self._partitions:
+                positions = self._row_index(period).get_indexer(ids.to_numpy())
+                self._tombstones.setdefault(period, []).extend(positions[positions >= 0].tolist())
+
+    # דחיסת מחיצה: הסרת כל השורות שסומנו במצבה בהעתקה אחת
+    def _compact(self, period):
+        positions = self._tombstones.pop(period, None)
+        if positions is None:
+            return
+
+        partition = self._partitions[period]
+        keep = np.ones(len(partition), dtype=bool)
+        keep[positions] = False
+        self._set_partition(period, partition[keep].reset_index(drop=True))
+
+    # הקצאת n מזהים רציפים
+    def _allocate_ids(self, n):
+        first = self._next_id
+        self._next_id += n
+        return np.arange(first, first + n, dtype='int64')
+
+    # טבלת עסקאות ריקה עם הטיפוס הקטגוריאלי של המאגר
+    def _empty(self):
+        return empty_transactions(self._category_dtype)
+
+    # המרת שורות מבסיס הנתונים לטבלת עסקאות
+    def _to_frame(self, rows):
+        if len(rows) == 0:
+            return self._empty()
+
+        df = pd.DataFrame(rows, columns=FRAME_COLUMNS)
+        df['id'] = df['id'].astype('int64')
+        df['date'] = pd.to_datetime(df['date'])
+        df['amount'] = df['amount'].astype('int64')
+        df['period'] = df['period'].astype('int64')
+        return self._apply_categories(df)
+
+    # טעינת מחיצה של חודש בודד (רק אם עוד לא נטענה)
+    def _load_period(self, period):
+        if period in self._partitions:
+            self._compact(period)
+            return self._partitions[period]
+
+        rows = self._conn.execute(
+            "SELECT id, date, amount, category, description, type, period FROM transactions WHERE period = ? ORDER BY date, rowid",
+            (period,)
+        ).fetchall()
+        self._set_partition(period, self._to_frame(rows))
+        return self._partitions[period]
+
+    # טעינת כל החודשים שעוד לא נטענו
+    def _load_all(self):
+        if self._all_loaded:
+            return
+
+        for period in self.periods():
+            self._load_period(period)
+        self._all_loaded = True
+
+    # טעינת טבלת הסיכומים לזיכרון (פעם אחת)
+    def _load_aggregates(self):
+        if self._aggregates is not None:
+            return self._aggregates
+
+        cube = {}
+        for period, type, category, total, count in self._conn.execute(
+            "SELECT period, type, category, total, count FROM monthly_aggregates"
+        ):
+            cube.setdefault(period, {})[(type, category)] = [total, count]
+        self._aggregates = cube
+        return cube
+
+    # עדכון מצטבר של טבלת הסיכומים (delta: אינדקס לפי המפתחות, עמודות total ו-count)
+    def _update_aggregates(self, delta):
+        if len(delta) == 0:
+            return
+
+        rows = [
+            (int(period), type, category, int(total), int(count))
+            for (period, type, category), total, count in zip(delta.index, delta['total'], delta['count'])
+        ]
+        self._conn.executemany("""
+            INSERT INTO monthly_aggregates (period, type, category, total, count)
+            VALUES (?, ?, ?, ?, ?)
+            ON CONFLICT (period, type, category)
+            DO UPDATE SET total = total + excluded.total, count = count + excluded.count
+        """, rows)
+        # רק מפתחות שירדו יכולים להתרוקן - מחיקה לפי המפתח הראשי, בלי סריקת הטבלה
+        self._conn.executemany(
+            "DELETE FROM monthly_aggregates WHERE period = ? AND type = ? AND category = ? AND count <= 0",
+            [row[:3] for row in rows if row[4] < 0]
+        )
+
+        self._aggregates_frame = None
+        if self._aggregates is not None:
+            for period, type, category, total, count in rows:
+                month = self._aggregates.setdefault(period, {})
+                entry = month.setdefault((type, category), [0, 0])
+                entry[0] += total
+                entry[1] += count
+                if entry[1] <= 0:
+                    del month[(type, category)]
+                    if len(month) == 0:
+                        del self._aggregates[period]
+
+    # עדכון מצטבר של הסיכומים היומיים (delta: עמודות date, type, category, total, count)
+    def _update_daily_aggregates(self, delta):
+        if len(delta) == 0:
+            return
+
+        rows = list(zip(
+            delta['date'].to_numpy().astype('datetime64[D]').astype(str).tolist(),
+            delta['type'].tolist(),
+            delta['category'].tolist(),
+            delta['total'].tolist(),
+            delta['count'].tolist()
+        ))
+        self._conn.executemany("""
+            INSERT INTO daily_aggregates (date, type, category, total, count)
+            VALUES (?, ?, ?, ?, ?)
+            ON CONFLICT (date, type, category)
+            DO UPDATE SET total = total + excluded.total, count = count + excluded.count
+        """, rows)
+        # רק המפתחות שהשתנו ורק בהסרה יכולים להתרוקן - מחיקה לפי המפתח הראשי, בלי סריקת הטבלה
+        self._conn.executemany(
+            "DELETE FROM daily_aggregates WHERE date = ? AND type = ? AND category = ? AND count <= 0",
+            [row[:3] for row in rows if row[4] < 0]
+        )
+
+        if self._daily_sums is not None:
+            self._daily_sums.add(delta)
+
+    # טעינת הסיכומים היומיים ובניית הסכומים המצטברים (פעם אחת)
+    def _load_daily_sums(self):
+        if self._daily_sums is None:
+            rows = self._conn.execute("SELECT date, type, category, total, count FROM daily_aggregates").fetchall()
+            daily = pd.DataFrame(rows, columns=DAILY_COLUMNS)
+            daily['date'] = pd.to_datetime(daily['date'], format='%Y-%m-%d')
+            self._daily_sums = DailyPrefixSums(daily)
+        return self._daily_sums
+
+    # בניית אינדקס החיפוש מכל העסקאות (פעם אחת), מהמחיצות שבזיכרון
+    def _load_search_index(self):
+        if self._search_index is None:
+            df = self.query()
+            index = SearchIndex()
+            index.add(df['id'], df['description'], df['category'])
+            self._search_index = index
+        return self._search_index
+
+    # רשימת מפתחות החודשים הקיימים במאגר
+    def periods(self):
+        with self._lock:
+            self.flush()
+            rows = self._conn.execute("SELECT DISTINCT period FROM transactions ORDER BY period").fetchall()
+        return [row[0] for row in rows]
+
+    # הוספת עסקאות (רשימת מילונים, סכום בשקלים). כל עסקה נבדקת ומקבלת מזהה מיד, ועסקה לא תקינה
+    # נדחית עם ValueError לפני שדבר נוסף. העסקאות נכנסות לחוצץ ונכתבות יחד בקריאה הבאה
+    def add(self, records):
+        rows = [self._normalize_record(record) for record in records]
+        with self._lock:
+            ids = self._allocate_ids(len(rows))
+            for id, row in zip(ids.tolist(), rows):
+                self._buffer.append((id,) + row)
+                key = (row[5], row[4], row[2])
+                self._buffer_totals[key] = self._buffer_totals.get(key, 0) + row[1]
+            self.version += 1
+            if len(self._buffer) >= FLUSH_SIZE:
+                self.flush()
+        return ids
+
+    # הוספת טבלת עסקאות שלמה (סכום בשקלים, למשל מייבוא), עם מזהים מהמאגר. הטבלה נכתבת מיד,
+    # יחד עם החוצץ, בטרנזקציה אחת. עסקה לא תקינה דוחה את כל הטבלה עם ValueError
+    def add_frame(self, df):
+        df = self._normalize(df[COLUMNS[1:]].copy())
+        if len(df) == 0:
+            return np.zeros(0, dtype='int64')
+
+        with self._lock:
+            df['id'] = self._allocate_ids(len(df))
+            self.flush(df)
+            self.version += 1
+        return df['id'].to_numpy()
+
+    # כתיבת החוצץ (ו-df, טבלה מנורמלת נוספת) לבסיס הנתונים בטרנזקציה אחת, ומיזוג למחיצות
+    # שכבר נטענו. נקרא לפני כל קריאה, כך שמחיצה שנטענת מבסיס הנתונים כבר כוללת את העסקאות.
+    # החוצץ מתרוקן רק אחרי שהכתיבה הצליחה
+    def flush(self, df=None):
+        with self._lock:
+            frames = [] if df is None else [df]
+            if len(self._buffer) > 0:
+                frames.insert(0, pd.DataFrame(self._buffer, columns=FRAME_COLUMNS))
+            if len(frames) == 0:
+                return
+
+            df = pd.concat(frames, ignore_index=True) if len(frames) > 1 else frames[0]
+            df = df.sort_values('date', kind='mergesort', ignore_index=True)
+            with self._conn:
+                self._write(df)
+            self._buffer = []
+            self._buffer_totals = {}
+            self._merge(df)
+
+    # בדיקה ונרמול של עסקה בודדת (סכום בשקלים), בלי pandas: (תאריך, אגורות, קטגוריה, תיאור,
+    # סוג, מפתח חודש). זורק ValueError לסוג, תאריך, סכום, קטגוריה או תיאור לא תקינים
+    def _normalize_record(self, record):
+        if record.get('type') not in TYPES:
+            raise ValueError(f"סוג עסקה לא חוקי: {record.get('type')}")
+        for column, name in [('category', 'קטגוריה'), ('description', 'תיאור')]:
+            if record.get(column) is None or pd.isna(record[column]):
+                raise ValueError(f"חסר שדה {name} בעסקה")
+        try:
+            date = pd.Timestamp(record.get('date'))
+            amount = float(record.get('amount'))
+        except (ValueError, TypeError) as e:
+            raise ValueError(f"תאריך או סכום לא תקינים: {e}") from e
+        if pd.isna(date):
+            raise ValueError("חסר תאריך בעסקה")
+        if not math.isfinite(amount):
+            raise ValueError("סכום עסקה לא תקין")
+
+        date = date.normalize()
+        return (
+            date, round(amount * 100), str(record['category']), str(record['description']),
+            record['type'], period_of(date.year, date.month)
+        )
+
+    # בדיקה ונרמול של עסקאות חדשות (סכום בשקלים) למבנה המאגר: אגורות, מפתח חודש ומיון לפי תאריך.
+    # זורק ValueError לסוג, תאריך, סכום, קטגוריה או תיאור לא תקינים
+    def _normalize(self, df):
+        invalid = ~df['type'].isin(TYPES)
+        if invalid.any():
+            raise ValueError(f"סוג עסקה לא חוקי: {df.loc[invalid, 'type'].iloc[0]}")
+        for column, name in [('category', 'קטגוריה'), ('description', 'תיאור')]:
+            if df[column].isna().any():
+                raise ValueError(f"חסר שדה {name} בעסקה")
+        try:
+            dates = pd.to_datetime(df['date'])
+            amounts = pd.to_numeric(df['amount'])
+        except (ValueError, TypeError) as e:
+            raise ValueError(f"תאריך או סכום לא תקינים: {e}") from e
+        if dates.isna().any():
+            raise ValueError("חסר תאריך בעסקה")
+        if not np.isfinite(amounts.to_numpy(dtype='float64')).all():
+            raise ValueError("סכום עסקה לא תקין")
+
+        df['date'] = dates.dt.normalize()
+        if 'id' in df:
+            df['id'] = df['id'].astype('int64')
+        df['amount'] = to_agorot(amounts)
+        df['category'] = df['category'].astype(str)
+        df['description'] = df['description'].astype(str)
+        df['type'] = df['type'].astype(str)
+        df['period'] = periods_of(df['date'])
+        return df.sort_values('date', kind='mergesort', ignore_index=True)
+
+    # כתיבת עסקאות מנורמלות לבסיס הנתונים ולטבלת הסיכומים (בתוך טרנזקציה של הקורא)
+    def _write(self, df):
+        rows = zip(
+            df['id'].tolist(),
+            df['date'].to_numpy().astype('datetime64[D]').astype(str).tolist(),
+            df['period'].tolist(),
+            df['amount'].tolist(),
+            df['category'].tolist(),
+            df['description'].tolist(),
+            df['type'].tolist()
+        )
+        self._conn.executemany(
+            "INSERT INTO transactions (id, date, period, amount, category, description, type) VALUES (?, ?, ?, ?, ?, ?, ?)",
+            rows
+        )
+        self._conn.execute(
+            "INSERT INTO settings (key, value) VALUES ('next_id', ?) ON CONFLICT (key) DO UPDATE SET value = excluded.value",
+            (json.dumps(self._next_id),)
+        )
+        self._update_aggregates(df.groupby(AGGREGATE_KEYS)['amount'].agg(total='sum', count='count'))
+        self._update_daily_aggregates(daily_totals(df))
+        if self._search_index is not None:
+            self._search_index.add(df['id'], df['description'], df['category'])
+
+    # מחיקת עסקאות מבסיס הנתונים ומטבלת הסיכומים (בתוך טרנזקציה של הקורא)
+    def _remove(self, df):
+        self._conn.executemany("DELETE FROM transactions WHERE id = ?", ((id,) for id in df['id'].tolist()))
+        self._update_aggregates(-df.groupby(AGGREGATE_KEYS)['amount'].agg(total='sum', count='count'))
+        self._update_daily_aggregates(daily_totals(df, sign=-1))
+        if self._search_index is not None:
+            self._search_index.remove(df['id'], df['description'], df['category'])
+
+    # עדכון מחיצות שכבר נטענו לזיכרון בלבד (שרשור אחד לכל מחיצה בכל כתיבה)
+    def _merge(self, df):
+        df = self._apply_categories(df)
+        for period, group in df.groupby('period', sort=False):
+            if period in self._partitions:
+                partition = self._load_period(period)
+                merged = pd.concat([partition, group], ignore_index=True)
+                # מיון מחדש רק אם נוספו עסקאות מוקדמות מהאחרונה במחיצה
+                if len(partition) > 0 and group['date'].iloc[0] < partition['date'].iloc[-1]:
+                    merged = merged.sort_values('date', kind='mergesort', ignore_index=True)
+                self._set_partition(period, merged)
+            elif self._all_loaded:
+                self._set_partition(period, group.reset_index(drop=True))
+
+    # שליפת עסקאות לפי רשימת מזהים ישירות מבסיס הנתונים (סכומים באגורות)
+    def _fetch(self, ids):
+        ids = [int(id) for id in ids]
+        rows = []
+        for start in range(0, len(ids), FETCH_BATCH_SIZE):
+            batch = ids[start:start + FETCH_BATCH_SIZE]
+            rows.extend(self._conn.execute(
+                f"SELECT id, date, amount, category, description, type, period FROM transactions WHERE id IN ({','.join('?' * len(batch))})",
+                batch
+            ).fetchall())
+        return pd.DataFrame(rows, columns=FRAME_COLUMNS)
+
+    # מחיקת עסקה אחת או רשימת עסקאות לפי מזהה כפעולה אחת: חיפוש באינדקס הייחודי בבסיס הנתונים,
+    # וסימון במצבות במחיצות שבזיכרון. מחזיר את מספר העסקאות שנמחקו
+    def delete(self, transaction_ids):
+        with self._lock:
+            self.flush()
+            deleted = self._fetch(np.atleast_1d(transaction_ids))
+            if len(deleted) == 0:
+                return 0
+
+            with self._conn:
+                self._remove(deleted)
+            self.version += 1
+            self._tombstone(deleted)
+        return len(deleted)
+
+    # עריכת עסקאות קיימות כפעולה אחת. records - מילונים עם id ואחד או יותר מהשדות
+    # date, amount (בשקלים), category, description. מחזיר את מספר העסקאות שעודכנו.
+    # כל השדות חובה, ולכן שדה שרוקן (ערך חסר או טקסט ריק) נדחה עם ValueError
+    def update(self, records):
+        changes = pd.DataFrame.from_records(records).set_index('id')
+        unknown = set(changes.columns) - set(EDITABLE_COLUMNS)
+        if unknown:
+            raise ValueError(f"שדות שאינם ניתנים לעריכה: {', '.join(sorted(unknown))}")
+        blank = changes.isna() | changes.applymap(lambda value: isinstance(value, str) and not value.strip())
+        if blank.to_numpy().any():
+            column = blank.any().idxmax()
+            raise ValueError(f"לא ניתן לרוקן את השדה {FIELD_NAMES[column]} (עסקה {blank[column].idxmax()})")
+
+        with self._lock:
+            self.flush()
+            old = self._fetch(changes.index)
+            if len(old) == 0:
+                return 0
+
+            new = old.drop(columns='period').set_index('id')
+            new['amount'] = to_shekels(new['amount'])
+            new = new.astype({column: 'object' for column in changes.columns})
+            new.update(changes)
+            new = self._normalize(new.reset_index())
+
+            with self._conn:
+                self._remove(old)
+                self._write(new)
+            self.version += 1
+            self._tombstone(old)
+            self._merge(new)
+        return len(new)
+
+    # כללי העסקאות הקבועות (סכום באגורות)
+    def rules(self):
+        with self._lock:
+            if self._rules is None:
+                rows = self._conn.execute(f"SELECT {', '.join(RULE_COLUMNS)} FROM recurring_rules ORDER BY id").fetchall()
+                if len(rows) == 0:
+                    self._rules = empty_rules()
+                else:
+                    df = pd.DataFrame.from_records(rows, columns=RULE_COLUMNS)
+                    for column in ['start_date', 'end_date', 'posted_until']:
+                        df[column] = pd.to_datetime(df[column])
+                    self._rules = df.astype({'id': 'int64', 'amount': 'int64', 'interval': 'int64'})
+            return self._rules
+
+    # הוספת כלל עסקה קבועה: description, amount (בשקלים), category, type, frequency
+    # (monthly/weekly/daily), interval, start_date ו-end_date (None - ללא סיום). מחזיר את מזהה הכלל
+    def add_rule(self, rule):
+        if rule['type'] not in TYPES:
+            raise ValueError(f"סוג עסקה לא חוקי: {rule['type']}")
+        if rule['frequency'] not in FREQUENCIES:
+            raise ValueError(f"תדירות לא חוקית: {rule['frequency']}")
+        if int(rule.get('interval', 1)) < 1:
+            raise ValueError("מרווח הכלל חייב להיות לפחות 1")
+
+        start_date = pd.Timestamp(rule['start_date']).normalize()
+        end_date = pd.Timestamp(rule['end_date']).normalize() if rule.get('end_date') is not None else None
+        if end_date is not None and end_date < start_date:
+            raise ValueError("תאריך הסיום מוקדם מתאריך ההתחלה")
+
+        with self._lock, self._conn:
+            cursor = self._conn.execute(
+                """
+                INSERT INTO recurring_rules (description, amount, category, type, frequency, interval, start_date, end_date)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                """,
+                (
+                    rule['description'], int(to_agorot([rule['amount']])[0]), rule['category'], rule['type'],
+                    rule['frequency'], int(rule.get('interval', 1)), start_date.isoformat(),
+                    end_date.isoformat() if end_date is not None else None
+                )
+            )
+            self._rules = None
+            self.version += 1
+        return cursor.lastrowid
+
+    # מחיקת כללים (עסקאות שכבר נרשמו מהם נשארות). מחזיר את מספר הכללים שנמחקו
+    def delete_rules(self, rule_ids):
+        rule_ids = np.atleast_1d(np.asarray(rule_ids, dtype='int64'))
+        with self._lock, self._conn:
+            cursor = self._conn.executemany("DELETE FROM recurring_rules WHERE id = ?", [(int(id),) for id in rule_ids])
+            self._rules = None
+            self.version += 1
+        return cursor.rowcount
+
+    # מופעי הכללים בטווח תאריכים (סכום באגורות), בלי לשמור אותם - למשל לתחזית
+    def recurring_occurrences(self, start, end):
+        return expand_rules(self.rules(), start, end)
+
+    # רישום המופעים שהגיע מועדם (עד until, כולל) כעסקאות. כל כלל נפרס רק מהיום שאחרי
+    # הרישום הקודם שלו, כך שאף מופע לא נרשם פעמיים. מחזיר את מספר העסקאות שנרשמו
+    def post_recurring(self, until):
+        until = pd.Timestamp(until).normalize()
+        with self._lock:
+            rules = self.rules()
+            pending = rules[~(rules['posted_until'] >= until)]
+            if len(pending) == 0:
+                return 0
+
+            after = (pending['posted_until'] + pd.Timedelta(days=1)).fillna(pending['start_date'])
+            due = expand_rules(pending, after.to_numpy(), until)
+            if len(due) > 0:
+                self.add_frame(with_shekels(due))
+
+            with self._conn:
+                self._conn.executemany(
+                    "UPDATE recurring_rules SET posted_until = ? WHERE id = ?",
+                    [(until.isoformat(), int(id)) for id in pending['id']]
+                )
+            self._rules = None
+        return len(due)
+
+    # כללי הסיווג, לפי סדר ההוספה
+    def category_rules(self):
+        with self._lock:
+            rows = self._conn.execute(f"SELECT {', '.join(CATEGORY_RULE_COLUMNS)} FROM category_rules ORDER BY id").fetchall()
+        if len(rows) == 0:
+            return empty_category_rules()
+        return pd.DataFrame.from_records(rows, columns=CATEGORY_RULE_COLUMNS).astype({'id': 'int64'})
+
+    # המסווג של כל הכללים (ביטוי משולב אחד לכל סוג עסקה)
+    def categorizer(self):
+        with self._lock:
+            if self._categorizer is None:
+                self._categorizer = Categorizer(self.category_rules())
+            return self._categorizer
+
+    # הוספת כלל סיווג: kind (keyword/alias/regex), pattern, category ו-type (None - לכל הסוגים).
+    # הכלל נבדק יחד עם הכללים הקיימים לפני השמירה. מחזיר את מזהה הכלל
+    def add_category_rule(self, rule):
+        type = rule.get('type')
+        if type is not None and type not in TYPES:
+            raise ValueError(f"סוג עסקה לא חוקי: {type}")
+
+        with self._lock:
+            rules = pd.concat([self.category_rules(), pd.DataFrame([dict(rule, id=0, type=type)])], ignore_index=True)
+            compile_rules(rules)
+            with self._conn:
+                cursor = self._conn.execute(
+                    "INSERT INTO category_rules (kind, pattern, category, type) VALUES (?, ?, ?, ?)",
+                    (rule['kind'], rule['pattern'], rule['category'], type)
+                )
+            self._categorizer = None
+        return cursor.lastrowid
+
+    # מחיקת כללי סיווג. מחזיר את מספר הכללים שנמחקו
+    def delete_category_rules(self, rule_ids):
+        rule_ids = np.atleast_1d(np.asarray(rule_ids, dtype='int64'))
+        with self._lock, self._conn:
+            cursor = self._conn.executemany("DELETE FROM category_rules WHERE id = ?", [(int(id),) for id in rule_ids])
+            self._categorizer = None
+        return cursor.rowcount
+
+    # התקציב לפי קטגוריה (בשקלים) - רק קטגוריות שנשמר להן תקציב
+    def budgets(self):
+        with self._lock:
+            if self._budgets is None:
+                rows = self._conn.execute("SELECT category, amount FROM budgets").fetchall()
+                self._budgets = {category: to_shekels(amount) for category, amount in rows}
+            return dict(self._budgets)
+
+    # החלפת כל התקציבים (מילון קטגוריה -> סכום בשקלים)
+    def set_budgets(self, budgets):
+        amounts = to_agorot(list(budgets.values())) if budgets else []
+        if (np.asarray(amounts) < 0).any():
+            raise ValueError("תקציב לא יכול להיות שלילי")
+
+        with self._lock:
+            with self._conn:
+                self._conn.execute("DELETE FROM budgets")
+                self._conn.executemany(
+                    "INSERT INTO budgets (category, amount) VALUES (?, ?)",
+                    [(category, int(amount)) for category, amount in zip(budgets, amounts)]
+                )
+            self._budgets = None
+            self.version += 1
+
+    # ערך הגדרה שנשמרה (default - אם לא נשמרה)
+    def setting(self, key, default=None):
+        with self._lock:
+            if self._settings is None:
+                rows = self._conn.execute("SELECT key, value FROM settings").fetchall()
+                self._settings = {name: json.loads(value) for name, value in rows}
+            return self._settings.get(key, default)
+
+    # שמירת הגדרה (כל ערך שניתן לייצג ב-JSON)
+    def set_setting(self, key, value):
+        with self._lock:
+            with self._conn:
+                self._conn.execute(
+                    "INSERT INTO settings (key, value) VALUES (?, ?) ON CONFLICT (key) DO UPDATE SET value = excluded.value",
+                    (key, json.dumps(value))
+                )
+            self._settings = None
+            self.version += 1
+
+    # שליפת עסקאות לפי חודש (YYYY-MM או מפתח חודש), קטגוריה וסוג
+    def query(self, month=None, category=None, type=None):
+        with self._lock:
+            self.flush()
+            if month is not None:
+                df = self._load_period(to_period(month))
+            else:
+                self._load_all()
+                partitions = [self._load_period(m) for m in sorted(self._partitions)]
+                partitions = [partition for partition in partitions if len(partition) > 0]
+                df = pd.concat(partitions, ignore_index=True) if partitions else self._empty()
+
+        if category is not None:
+            df = df[df['category'] == category]
+        if type is not None:
+            df = df[df['type'] == type]
+        return df
+
+    # שליפת עסקאות בטווח תאריכים (כולל שני הקצוות) - רק המחיצות שבטווח נטענות,
+    # ובמחיצות הקצה החיתוך נעשה בחיפוש בינארי
+    def query_range(self, start, end, category=None, type=None):
+        start = pd.Timestamp(start).normalize()
+        end = pd.Timestamp(end).normalize()
+        if end < start:
+            return self._empty()
+
+        first = period_of(start.year, start.month)
+        last = period_of(end.year, end.month)
+
+        with self._lock:
+            self.flush()
+            partitions = [self._load_period(period) for period in range(first, last + 1)]
+
+        partitions[0] = slice_dates(partitions[0], start, end)
+        partitions[-1] = slice_dates(partitions[-1], start, end)
+        partitions = [partition for partition in partitions if len(partition) > 0]
+        df = pd.concat(partitions, ignore_index=True) if partitions else self._empty()
+
+        if category is not None:
+            df = df[df['category'] == category]
+        if type is not None:
+            df = df[df['type'] == type]
+        return df
+
+    # חיפוש עסקאות לפי טקסט (תחיליות מילים בתיאור או בקטגוריה) בשילוב מסננים:
+    # טווח תאריכים, רשימת קטגוריות, סוג וטווח סכומים בשקלים. ללא טווח תאריכים - בכל התקופות
+    def search(self, text='', start=None, end=None, categories=None, type=None, min_amount=None, max_amount=None):
+        if start is not None and end is not None:
+            df = self.query_range(start, end, type=type)
+        else:
+            df = self.query(type=type)
+
+        if text and text.strip():
+            with self._lock:
+                self.flush()
+                ids = self._load_search_index().search(text)
+            df = df[df['id'].isin(ids)]
+        if categories:
+            df = df[df['category'].isin(categories)]
+        if min_amount is not None:
+            df = df[df['amount'] >= to_agorot(min_amount)]
+        if max_amount is not None:
+            df = df[df['amount'] <= to_agorot(max_amount)]
+        return df
+
+    # שליפת סיכומים חודשיים (חודש, סוג, קטגוריה) - בלי לגעת בעסקאות עצמן
+    def aggregates(self, month=None, type=None):
+        with self._lock:
+            self.flush()
+            cube = self._load_aggregates()
+            if month is not None:
+                period = to_period(month)
+                df = aggregates_frame([
+                    (period, key_type, category, total, count)
+                    for (key_type, category), (total, count) in cube.get(period, {}).items()
+                ])
+            else:
+                if self._aggregates_frame is None:
+                    self._aggregates_frame = aggregates_frame([
+                        (period, key_type, category, total, count)
+                        for period, month_cube in cube.items()
+                        for (key_type, category), (total, count) in month_cube.items()
+                    ])
+                df = self._aggregates_frame.copy()
+
+        if type is not None:
+            df = df[df['type'] == type]
+        return df
+
+    # סכום (באגורות) ומספר עסקאות לכל (סוג, קטגוריה) בין start ל-end (כולל), מהסכומים המצטברים
+    # היומיים - O(1) לכל קטגוריה, בלי לטעון עסקאות ובלי קשר לאורך ההיסטוריה
+    def range_aggregates(self, start, end, type=None):
+        with self._lock:
+            self.flush()
+            return self._load_daily_sums().range(start, end, type=type)
+
+    # סכום יומי (באגורות) לכל סוג, מהסכומים המצטברים היומיים - לתרשימי מגמה בלי לטעון עסקאות
+    def daily_by_type(self):
+        with self._lock:
+            self.flush()
+            return self._load_daily_sums().by_day()
+
+    # סכום (באגורות) של קטגוריה בחודש, ישירות מהמונה בטבלת הסיכומים ועוד העסקאות שבחוצץ -
+    # בלי סריקת עסקאות ובלי לכתוב את החוצץ
+    def category_total(self, month, category, type='expense'):
+        with self._lock:
+            period = to_period(month)
+            total, _ = self._load_aggregates().get(period, {}).get((type, category), (0, 0))
+            return total + self._buffer_totals.get((period, type, category), 0)
+
+    # מספר העסקאות במאגר, כולל החוצץ
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM transactions").fetchone()[0] + len(self._buffer)
+
+    # כתיבת החוצץ וסגירת החיבור לבסיס הנתונים
+    def close(self):
+        with self._lock:
+            self.flush()
+            self._conn.close()